@@ -140,6 +140,8 @@ export default function HousesPage() {
         source: filters.source !== 'all' ? filters.source : undefined,
         listing_type: filters.listing_type !== 'all' ? filters.listing_type : undefined,
         search: activeSearch || undefined,
+        // The list is slimmed by default; the cards show every photo and the nested locations, and edit the whole description
+        expand: 'photos,location,description',
       });
       setHouses(response.results);
       setTotalCount(response.count);
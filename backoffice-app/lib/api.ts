@@ -203,6 +203,7 @@ export interface HouseFilters {
   favorites?: boolean;
   contacted?: boolean;
   search?: string;
+  expand?: string;  // photos, location (nested parish/county/district), description (untruncated)
 }
 
 export interface HouseStats {
@@ -250,12 +251,27 @@ export const housesAPI = {
     await api.delete(`/api/houses/${id}/`);
   },
 
-  deleteAll: async (): Promise<{ status: string; deleted_count: number; deleted_objects: number; message: string }> => {
+  deleteAll: async (): Promise<{ status: string; job: PurgeJob; message: string }> => {
     const { data } = await api.post('/api/houses/delete_all/');
     return data;
   },
 };
 
+export interface PurgeJob {
+  id: number;
+  status: 'queued' | 'running' | 'completed' | 'failed';
+  filters: Record<string, string | number | boolean>;
+  batch_size: number;
+  total_houses: number;
+  deleted_houses: number;
+  progress: number;  // 0 to 1
+  created_at: string;
+  start_time: string | null;
+  end_time: string | null;
+  execution_time: number | null;
+  error_message: string | null;
+}
+
 export interface RunScrapersRequest {
   scrapers?: string[];  // Optional: specific scrapers to run (e.g., ['ImoVirtual', 'Idealista'])
   all?: boolean;        // Optional: run all scrapers
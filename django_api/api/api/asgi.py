@@ -2,6 +2,9 @@
 ASGI config for api project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The read endpoints are served by async views (api.settings_asgi), e.g.:
+
+    uvicorn --app-dir api api.asgi:application
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
@@ -11,6 +14,6 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api.settings_asgi')
 
 application = get_asgi_application()
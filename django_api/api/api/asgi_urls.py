@@ -0,0 +1,9 @@
+"""
+URL configuration of the ASGI deployment: api.urls, with the routes that have
+async implementations served by them (see houses.async_views).
+"""
+from houses.async_views import async_urlpatterns
+
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = async_urlpatterns(sync_urlpatterns)
@@ -0,0 +1,7 @@
+"""
+Settings of the ASGI deployment (api.asgi): the same as api.settings, with the
+read endpoints served by their async views (see houses.async_views).
+"""
+from .settings import *  # noqa: F401,F403
+
+ROOT_URLCONF = 'api.asgi_urls'
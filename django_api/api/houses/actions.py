@@ -0,0 +1,99 @@
+"""
+User actions on houses (favourite, contacted, discarded) and the per-user state they write.
+
+A user's flags on a house live in one UserHouseState row keyed by (user, house),
+each flag being the time it was set. set_house_flags writes any number of
+flags with set-based queries: one INSERT OR IGNORE of the missing rows, per
+flag one UPDATE setting it and one clearing it, and one DELETE of the rows left
+without flags, whatever the number of houses. The single-house toggles and the
+batch endpoint (apply_house_actions) both go through it.
+"""
+from django.db import transaction
+from django.db.models import Exists, FilteredRelation, OuterRef, Q
+from django.utils import timezone
+
+from .cache import bump_user_version
+from .models import House, UserHouseState
+
+# action -> UserHouseState column
+ACTION_FIELDS = {
+    'favorite': 'favorited_at',
+    'contacted': 'contacted_at',
+    'discarded': 'discarded_at',
+}
+NO_FLAGS = Q(**{f'{field}__isnull': True for field in ACTION_FIELDS.values()})
+
+
+def with_user_state(queryset, user, alias='user_state'):
+    """Join each house's UserHouseState row of the user (LEFT JOIN on the (user, house) key)"""
+    return queryset.annotate(**{alias: FilteredRelation('user_states', condition=Q(user_states__user=user))})
+
+
+def has_flag(user, action):
+    """Exists() condition for houses on which the user has set the flag"""
+    field = ACTION_FIELDS[action]
+    return Exists(UserHouseState.objects.filter(user=user, house=OuterRef('pk'), **{f'{field}__isnull': False}))
+
+
+def set_house_flags(user, states, now=None):
+    """
+    Set or clear flags of a user, in one transaction.
+
+    Args:
+        states: dict of house pk -> {action: bool}
+        now: time recorded for the flags set (defaults to timezone.now()); a flag
+            that was already set keeps its time
+    """
+    if not states:
+        return
+    now = now or timezone.now()
+    with transaction.atomic():
+        UserHouseState.objects.bulk_create(
+            [UserHouseState(user=user, house_id=pk) for pk in states], ignore_conflicts=True
+        )
+        rows = UserHouseState.objects.filter(user=user)
+        for action, field in ACTION_FIELDS.items():
+            added = [pk for pk, flags in states.items() if flags.get(action) is True]
+            cleared = [pk for pk, flags in states.items() if flags.get(action) is False]
+            if added:
+                rows.filter(house_id__in=added, **{f'{field}__isnull': True}).update(**{field: now})
+            if cleared:
+                rows.filter(house_id__in=cleared, **{f'{field}__isnull': False}).update(**{field: None})
+        rows.filter(NO_FLAGS, house_id__in=list(states)).delete()
+        bump_user_version(user)
+
+
+def toggle_house_flag(user, house, action):
+    """Flip one flag, returns its new state"""
+    state = not UserHouseState.objects.filter(
+        user=user, house=house, **{f'{ACTION_FIELDS[action]}__isnull': False}
+    ).exists()
+    set_house_flags(user, {house.pk: {action: state}})
+    return state
+
+
+def apply_house_actions(user, operations):
+    """
+    Set flags of a user on houses, identified by their house_id.
+
+    Args:
+        user: the user whose flags change
+        operations: iterable of (house_id, action, state); for the same house and
+            action the last operation wins
+
+    Returns:
+        tuple: (pks of the houses found, house_ids not found)
+    """
+    desired = {}
+    for house_id, action, state in operations:
+        desired[house_id, action] = state
+
+    house_ids = {house_id for house_id, _ in desired}
+    pks = dict(House.objects.filter(house_id__in=house_ids).order_by().values_list('house_id', 'pk'))
+    states = {}
+    for (house_id, action), state in desired.items():
+        if house_id in pks:
+            states.setdefault(pks[house_id], {})[action] = state
+    set_house_flags(user, states)
+
+    return set(pks.values()), sorted(house_ids - set(pks))
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class HousesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'houses'
+
+    def ready(self):
+        from .search import ensure_search_triggers
+        from .sync import ensure_change_log_triggers
+        post_migrate.connect(ensure_search_triggers, sender=self)
+        post_migrate.connect(ensure_change_log_triggers, sender=self)
@@ -0,0 +1,140 @@
+"""
+Hot/archive partitioning of the houses table.
+
+Listings that have been gone for a while (or are simply very old) are moved,
+with their photos, from ``houses``/``houses_photo`` to ``archived_houses``/
+``archived_photos`` in bounded batches. This keeps the hot table - and every
+feed query, stats aggregate and ``_load_existing_urls`` call - proportional to
+the live market instead of to the whole history.
+
+Houses that a user has favourited or contacted are never archived, so user
+lists keep working. The price history and price_dropped_at of a house are
+archived with it. Archived URLs are still checked by the scrapers, so a
+listing is not re-inserted when a portal shows it again.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .models import House, Photo, PriceHistory, ArchivedHouse, ArchivedPhoto, ArchivedPriceHistory, UserHouseState
+from .settings import ARCHIVE_INACTIVE_AFTER_DAYS, ARCHIVE_MAX_AGE_DAYS, ARCHIVE_BATCH_SIZE
+from .cache import bump_data_version
+
+ARCHIVED_FIELDS = [
+    'name', 'zone', 'price', 'url', 'bedrooms', 'area', 'floor', 'description', 'listing_type',
+    'parish_id', 'county_id', 'district_id', 'source', 'scraped_at', 'house_id', 'last_seen_at',
+    'price_dropped_at', 'listing_group',
+]
+ARCHIVED_HISTORY_FIELDS = ['name', 'price', 'previous_price', 'area', 'bedrooms', 'recorded_at']
+
+
+def archivable_houses(inactive_days=ARCHIVE_INACTIVE_AFTER_DAYS, max_age_days=ARCHIVE_MAX_AGE_DAYS, now=None):
+    """Houses that should leave the hot table"""
+    now = now or timezone.now()
+    criteria = Q(is_active=False, last_seen_at__lt=now - timedelta(days=inactive_days))
+    if max_age_days:
+        criteria |= Q(scraped_at__lt=now - timedelta(days=max_age_days))
+    return (
+        House.objects.filter(criteria)
+        .exclude(Exists(UserHouseState.objects.filter(
+            Q(favorited_at__isnull=False) | Q(contacted_at__isnull=False), house=OuterRef('pk')
+        )))
+    )
+
+
+def archive_batch(house_ids):
+    """
+    Move a batch of houses and their photos to the archive tables in one transaction.
+
+    Returns:
+        int: number of houses archived
+    """
+    if not house_ids:
+        return 0
+
+    with transaction.atomic():
+        rows = list(House.objects.filter(pk__in=house_ids).values('id', *ARCHIVED_FIELDS))
+        archived = ArchivedHouse.objects.bulk_create(
+            [ArchivedHouse(original_id=row.pop('id'), **row) for row in rows],
+            batch_size=ARCHIVE_BATCH_SIZE
+        )
+        archive_ids = {house.original_id: house.pk for house in archived}
+        if None in archive_ids.values():
+            # Backends that don't return primary keys from bulk_create
+            archive_ids = dict(
+                ArchivedHouse.objects.filter(original_id__in=archive_ids).values_list('original_id', 'id')
+            )
+
+        photos = Photo.objects.filter(house_id__in=house_ids).values_list('house_id', 'image_url', 'order')
+        ArchivedPhoto.objects.bulk_create(
+            [
+                ArchivedPhoto(house_id=archive_ids[house_id], image_url=image_url, order=order)
+                for house_id, image_url, order in photos
+            ],
+            batch_size=ARCHIVE_BATCH_SIZE
+        )
+
+        history = PriceHistory.objects.filter(house_id__in=house_ids).values('house_id', *ARCHIVED_HISTORY_FIELDS)
+        ArchivedPriceHistory.objects.bulk_create(
+            [ArchivedPriceHistory(house_id=archive_ids[row.pop('house_id')], **row) for row in history],
+            batch_size=ARCHIVE_BATCH_SIZE
+        )
+
+        # Deleting the houses cascades to photos, history, dedup data and user M2M rows
+        House.objects.filter(pk__in=house_ids).delete()
+
+    return len(rows)
+
+
+def archive_houses(inactive_days=ARCHIVE_INACTIVE_AFTER_DAYS, max_age_days=ARCHIVE_MAX_AGE_DAYS,
+                   batch_size=ARCHIVE_BATCH_SIZE, limit=None, progress=None):
+    """
+    Archive every archivable house, batch by batch.
+
+    Args:
+        progress: optional callable receiving the running total after each batch
+
+    Returns:
+        int: number of houses archived
+    """
+    total = 0
+    while limit is None or total < limit:
+        size = batch_size if limit is None else min(batch_size, limit - total)
+        house_ids = list(
+            archivable_houses(inactive_days, max_age_days)
+            .order_by('id')
+            .values_list('id', flat=True)[:size]
+        )
+        if not house_ids:
+            break
+        total += archive_batch(house_ids)
+        if progress:
+            progress(total)
+    if total:
+        bump_data_version()
+    return total
+
+
+def archived_urls(urls):
+    """
+    The given URLs that belong to archived houses, lowercased.
+
+    URLs are compared case-insensitively, like the url__iexact check of the houses table, through
+    the index on the lowercased URL: only the URLs the scrapers meet are looked up, never the
+    whole archive.
+    """
+    lowered = {str(url).lower() for url in urls if url}
+    if not lowered:
+        return set()
+    return set(
+        ArchivedHouse.objects.annotate(url_lower=Lower('url'))
+        .filter(url_lower__in=lowered)
+        .values_list('url_lower', flat=True)
+    )
+
+
+def is_archived_url(url):
+    return bool(archived_urls([url]))
@@ -0,0 +1,146 @@
+"""
+Async serving path for the read-heavy endpoints, under ASGI.
+
+Viewsets with AsyncViewSetMixin implement some actions a second time as
+coroutines named after them with an ``a`` prefix (``alist``, ``aretrieve``,
+``astats``...), reading through Django's async ORM. async_urlpatterns rebuilds
+a URLconf so that those routes are served by adispatch, the async twin of
+APIView.dispatch: authentication, negotiation, permissions, the ETag and 304
+of ConditionalGetMixin and the rendering are the same as the sync views',
+and so are the URLs and the responses. Anything else - other methods and
+actions, the browsable API - goes to the sync view in a thread.
+
+The ASGI entry point (api.asgi) uses these routes through
+api.settings_asgi, the WSGI one keeps the sync views.
+"""
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.http import Http404
+from django.urls import URLPattern, URLResolver
+from django.utils.cache import get_conditional_response
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.response import Response
+
+from .renderers import ORJSONRenderer
+
+
+class UseSyncView(Exception):
+    """Raised by adispatch for requests the async path doesn't serve"""
+
+
+class AsyncViewSetMixin:
+    """
+    Async dispatch for a viewset using ConditionalGetMixin.
+
+    Actions served asynchronously are those with an ``a<action>`` coroutine;
+    alist and aretrieve are provided for list and detail routes.
+    """
+    def has_async_action(self, action):
+        return action is not None and callable(getattr(self, f'a{action}', None))
+
+    async def adispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        if not self.has_async_action(self.action):
+            raise UseSyncView(self.action)
+
+        try:
+            self.format_kwarg = self.get_format_suffix(**kwargs)
+            try:
+                request.accepted_renderer, request.accepted_media_type = self.perform_content_negotiation(request)
+            except Exception:
+                raise UseSyncView('negotiation')
+            if not isinstance(request.accepted_renderer, ORJSONRenderer):
+                raise UseSyncView(request.accepted_renderer.format)  # The browsable API
+
+            # DRF authenticates on the first access to request.user; authenticators may query the database
+            await sync_to_async(lambda: request.user)()
+            self.check_permissions(request)
+            self.check_throttles(request)
+
+            self.etag = self.last_modified = None
+            if request.method in ('GET', 'HEAD'):
+                state, last_modified = await self.aget_validators(request)
+                self.etag = self.compute_etag(request, state)
+                self.last_modified = int(last_modified.timestamp()) if last_modified else None
+                response = get_conditional_response(request._request, etag=self.etag, last_modified=self.last_modified)
+                if response is None:
+                    response = await getattr(self, f'a{self.action}')(request, *args, **kwargs)
+            else:
+                response = await getattr(self, f'a{self.action}')(request, *args, **kwargs)
+        except UseSyncView:
+            raise
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        if isinstance(self.response, Response):
+            self.response.render()
+        return self.response
+
+    async def aget_object(self):
+        """get_object with the async ORM"""
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except (ObjectDoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.paginator is not None:
+            page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer([obj async for obj in queryset], many=True).data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return Response(self.get_serializer(await self.aget_object()).data)
+
+
+def async_view(callback):
+    """View serving the async actions of a viewset route with adispatch, and the rest with the sync `callback`"""
+    viewset = callback.cls
+
+    @csrf_exempt
+    async def view(request, *args, **kwargs):
+        self = viewset(**callback.initkwargs)
+        self.action_map = dict(callback.actions)
+        if 'get' in self.action_map:
+            self.action_map.setdefault('head', self.action_map['get'])
+        try:
+            return await self.adispatch(request, *args, **kwargs)
+        except UseSyncView:
+            return await sync_to_async(callback)(request, *args, **kwargs)
+
+    # Read by the schema generator like the sync view's
+    view.cls, view.initkwargs, view.actions = viewset, callback.initkwargs, callback.actions
+    return view
+
+
+def async_urlpatterns(patterns):
+    """Copy of URL patterns where the routes of viewsets with async actions are served by async_view"""
+    rebuilt = []
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            pattern = URLResolver(
+                pattern.pattern, async_urlpatterns(pattern.url_patterns), pattern.default_kwargs,
+                pattern.app_name, pattern.namespace,
+            )
+        elif isinstance(pattern, URLPattern) and _has_async_actions(pattern.callback):
+            pattern = URLPattern(pattern.pattern, async_view(pattern.callback), pattern.default_args, pattern.name)
+        rebuilt.append(pattern)
+    return rebuilt
+
+
+def _has_async_actions(callback):
+    viewset = getattr(callback, 'cls', None)
+    actions = getattr(callback, 'actions', None)
+    if viewset is None or not actions or not issubclass(viewset, AsyncViewSetMixin):
+        return False
+    return any(callable(getattr(viewset, f'a{action}', None)) for action in actions.values())
@@ -0,0 +1,192 @@
+"""
+Versioned response cache for the read endpoints.
+
+Between scrape runs the data only changes when a user toggles a flag, so
+responses can be cached without any expiry as long as the cache key changes
+whenever the data does. A key is made of:
+
+- the path and normalised query parameters (order and empty values ignored),
+- the scope: anonymous, or the user (flags and discarded houses differ per user),
+- the negotiated renderer, and
+- the data versions: a global ``houses`` counter bumped when a MainRun finishes
+  or a maintenance command changes listings, and a ``user:<id>`` counter bumped
+  when that user toggles a flag (``locations`` is bumped when the location
+  tables are populated, ``saved_searches`` when a saved search changes).
+
+Versions live in the DataVersion table so that bumps made by the scrapers'
+process are seen by every API worker; entries of old versions are never hit
+again and are evicted by the LRU ``responses`` cache (see CACHES).
+"""
+import functools
+import hashlib
+import json
+
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework.response import Response
+
+from .models import DataVersion
+
+DATA_SCOPE = 'houses'
+LOCATIONS_SCOPE = 'locations'
+SAVED_SEARCHES_SCOPE = 'saved_searches'
+
+response_cache = caches['responses']
+
+
+def user_scope(user):
+    return f'user:{user.pk}'
+
+
+def version_keys(user=None, scopes=(DATA_SCOPE,)):
+    keys = list(scopes)
+    if DATA_SCOPE in keys and user is not None and user.is_authenticated:
+        keys.append(user_scope(user))
+    return keys
+
+
+def version_state(keys):
+    """
+    Current versions of the given keys and when the last of them changed, in one query.
+
+    Returns:
+        tuple: (versions tuple, last change datetime or None)
+    """
+    rows = {key: (version, updated_at) for key, version, updated_at in
+            DataVersion.objects.filter(key__in=keys).values_list('key', 'version', 'updated_at')}
+    versions = tuple(rows.get(key, (0, None))[0] for key in keys)
+    changes = [updated_at for _, updated_at in rows.values()]
+    return versions, max(changes) if changes else None
+
+
+async def aversion_state(keys):
+    """version_state with the async ORM"""
+    rows = {key: (version, updated_at) async for key, version, updated_at in
+            DataVersion.objects.filter(key__in=keys).values_list('key', 'version', 'updated_at')}
+    versions = tuple(rows.get(key, (0, None))[0] for key in keys)
+    changes = [updated_at for _, updated_at in rows.values()]
+    return versions, max(changes) if changes else None
+
+
+def request_version_state(request, scopes=(DATA_SCOPE,)):
+    """version_state of the data a request reads, looked up once per request"""
+    keys = version_keys(request.user, scopes)
+    memo = request.__dict__.setdefault('_version_state', {})
+    if tuple(keys) not in memo:
+        memo[tuple(keys)] = version_state(keys)
+    return memo[tuple(keys)]
+
+
+async def arequest_version_state(request, scopes=(DATA_SCOPE,)):
+    """request_version_state with the async ORM"""
+    keys = version_keys(request.user, scopes)
+    memo = request.__dict__.setdefault('_version_state', {})
+    if tuple(keys) not in memo:
+        memo[tuple(keys)] = await aversion_state(keys)
+    return memo[tuple(keys)]
+
+
+def bump_version(key):
+    """Invalidate every cached response depending on the given version key"""
+    with transaction.atomic():
+        if DataVersion.objects.filter(key=key).update(version=F('version') + 1, updated_at=timezone.now()):
+            return
+        try:
+            with transaction.atomic():
+                DataVersion.objects.create(key=key, version=1)
+        except IntegrityError:
+            # Created concurrently
+            DataVersion.objects.filter(key=key).update(version=F('version') + 1, updated_at=timezone.now())
+
+
+def bump_data_version():
+    bump_version(DATA_SCOPE)
+
+
+def bump_user_version(user):
+    bump_version(user_scope(user))
+
+
+def bump_locations_version():
+    bump_version(LOCATIONS_SCOPE)
+
+
+def bump_saved_searches_version():
+    bump_version(SAVED_SEARCHES_SCOPE)
+
+
+def normalized_params(request):
+    """Query parameters as a sorted list of (name, value), without empty values"""
+    return sorted(
+        (name, value.strip())
+        for name in request.query_params
+        for value in request.query_params.getlist(name)
+        if value.strip()
+    )
+
+
+def response_cache_key(request, versions):
+    scope = user_scope(request.user) if request.user.is_authenticated else 'anonymous'
+    renderer = getattr(request, 'accepted_renderer', None)
+    raw = json.dumps([
+        request.get_host(),
+        request.path,
+        normalized_params(request),
+        scope,
+        renderer.format if renderer else None,
+        versions,
+    ])
+    return 'response:' + hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def cache_response(method):
+    """
+    Cache the rendered body of a GET view method until the data versions change.
+
+    Responses carry ``X-Cache: HIT`` or ``MISS``; only 200 responses are stored.
+    """
+    @functools.wraps(method)
+    def wrapper(view, request, *args, **kwargs):
+        key = response_cache_key(request, request_version_state(request)[0])
+        cached = response_cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = method(view, request, *args, **kwargs)
+        if isinstance(response, Response) and response.status_code == 200:
+            response['X-Cache'] = 'MISS'
+            response.add_post_render_callback(
+                lambda rendered: response_cache.set(key, (rendered.content, rendered['Content-Type']), timeout=None)
+            )
+        return response
+
+    return wrapper
+
+
+def acache_response(method):
+    """cache_response for the async twins of the view methods (see houses.async_views)"""
+    @functools.wraps(method)
+    async def wrapper(view, request, *args, **kwargs):
+        key = response_cache_key(request, (await arequest_version_state(request))[0])
+        cached = await response_cache.aget(key)
+        if cached is not None:
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = await method(view, request, *args, **kwargs)
+        if isinstance(response, Response) and response.status_code == 200:
+            response['X-Cache'] = 'MISS'
+            response.add_post_render_callback(
+                lambda rendered: response_cache.set(key, (rendered.content, rendered['Content-Type']), timeout=None)
+            )
+        return response
+
+    return wrapper
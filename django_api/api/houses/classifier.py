@@ -0,0 +1,95 @@
+"""
+Room-rental classification.
+
+A listing is a room rental when its title contains one of
+ROOM_RENTAL_TITLE_TERMS or its description contains one of
+ROOM_RENTAL_DESCRIPTION_TERMS (whole words, case and accent insensitive).
+
+Each text is scanned once with an Aho-Corasick automaton over all terms, so the
+cost does not grow with the number of terms. Classification runs at ingest and
+the result is stored in the indexed House.is_room_rental column; the
+classify_room_rentals command re-classifies rows whenever the term lists change.
+"""
+import hashlib
+from collections import deque
+
+from unidecode import unidecode
+
+from .settings import ROOM_RENTAL_TITLE_TERMS, ROOM_RENTAL_DESCRIPTION_TERMS
+
+
+def normalize(text):
+    return unidecode(str(text or '')).upper()
+
+
+class MultiPatternMatcher:
+    """Aho-Corasick automaton matching many patterns in a single pass over the text"""
+
+    def __init__(self, patterns):
+        self.patterns = sorted({normalize(p).strip() for p in patterns if p and p.strip()})
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        for pattern in self.patterns:
+            self._add(pattern)
+        self._build_failure_links()
+
+    def _add(self, pattern):
+        state = 0
+        for char in pattern:
+            if char not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = len(self._goto) - 1
+            state = self._goto[state][char]
+        self._output[state].append(len(pattern))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def finditer(self, text):
+        """Yield (start, end) of every pattern occurrence in the normalised text"""
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length in self._output[state]:
+                yield index - length + 1, index + 1
+
+    def search(self, text, whole_words=True):
+        """True if any pattern occurs in the text (as a whole word/phrase by default)"""
+        text = normalize(text)
+        for start, end in self.finditer(text):
+            if not whole_words:
+                return True
+            before = text[start - 1] if start > 0 else ' '
+            after = text[end] if end < len(text) else ' '
+            if not before.isalnum() and not after.isalnum():
+                return True
+        return False
+
+
+_title_matcher = MultiPatternMatcher(ROOM_RENTAL_TITLE_TERMS)
+_description_matcher = MultiPatternMatcher(ROOM_RENTAL_DESCRIPTION_TERMS)
+
+
+def is_room_rental(title, description=''):
+    """Whether a listing is a room in a shared flat rather than a whole home"""
+    return _title_matcher.search(title) or _description_matcher.search(description)
+
+
+def terms_version():
+    """Short digest of the term lists; rows classified with another version need a backfill"""
+    terms = '\n'.join(_title_matcher.patterns) + '\n--\n' + '\n'.join(_description_matcher.patterns)
+    return hashlib.sha1(terms.encode('utf-8')).hexdigest()[:12]
@@ -0,0 +1,89 @@
+"""
+Conditional GET (ETag / Last-Modified) for the read-only endpoints.
+
+Validators are computed before the view runs, from cheap state - the data
+versions of houses.cache or a small aggregate - never from the serialised
+body. A client sending a matching If-None-Match / If-Modified-Since gets a
+304 without the queryset being evaluated.
+"""
+import hashlib
+import json
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .cache import arequest_version_state, normalized_params, request_version_state, user_scope, DATA_SCOPE
+
+
+class ConditionalResponse(Exception):
+    """Raised from ConditionalGetMixin.initial to short-circuit the view with a 304/412"""
+
+    def __init__(self, response):
+        super().__init__(response.status_code)
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """
+    ViewSet mixin emitting strong ETags and Last-Modified on GET/HEAD and
+    answering conditional requests.
+
+    Views describe their data with ``version_scopes`` (keys of houses.cache,
+    the user's version is added for ``houses``), per action if needed with
+    ``action_version_scopes``, or override ``get_validators``.
+    """
+    version_scopes = (DATA_SCOPE,)
+    action_version_scopes = {}
+
+    def get_validators(self, request):
+        """
+        State the response depends on.
+
+        Returns:
+            tuple: (JSON-serialisable state, last modified datetime or None)
+        """
+        scopes = self.action_version_scopes.get(self.action, self.version_scopes)
+        return request_version_state(request, scopes)
+
+    async def aget_validators(self, request):
+        """get_validators for the async views (houses.async_views)"""
+        scopes = self.action_version_scopes.get(self.action, self.version_scopes)
+        return await arequest_version_state(request, scopes)
+
+    def compute_etag(self, request, state):
+        renderer = getattr(request, 'accepted_renderer', None)
+        raw = json.dumps([
+            request.path,
+            normalized_params(request),
+            user_scope(request.user) if request.user.is_authenticated else 'anonymous',
+            renderer.format if renderer else None,
+            state,
+        ], default=str)
+        return quote_etag(hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32])
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.etag = self.last_modified = None
+        if request.method not in ('GET', 'HEAD'):
+            return
+
+        state, last_modified = self.get_validators(request)
+        self.etag = self.compute_etag(request, state)
+        self.last_modified = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request._request, etag=self.etag, last_modified=self.last_modified)
+        if response is not None:
+            raise ConditionalResponse(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, ConditionalResponse):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, 'etag', None) and response.status_code in (200, 304):
+            response['ETag'] = self.etag
+            if self.last_modified:
+                response['Last-Modified'] = http_date(self.last_modified)
+        return response
@@ -0,0 +1,235 @@
+"""
+Cross-portal duplicate detection.
+
+The same flat is often listed on several portals. At ingest time every new
+house is reduced to:
+
+- a MinHash signature of its normalised title + description shingles, and
+- a set of bucket keys: one per LSH band, prefixed by a blocking key
+  (location, bedrooms, listing type, price band), plus one per photo URL.
+  A house located down to its parish gets the band keys of its county too.
+
+Keys are stored in the indexed ``dedup_buckets`` table, so finding candidates
+for a new listing is a handful of index lookups instead of a comparison
+against every other listing. Candidates are then scored and, when one is
+similar enough, the new house joins its ``listing_group``. The keys of a
+known listing are rebuilt when the scrapers record a change of its price or
+title.
+"""
+import hashlib
+import math
+import random
+import re
+from urllib.parse import urlsplit
+
+from unidecode import unidecode
+
+from .models import House, ListingSignature, DedupBucket, Photo
+from .settings import (
+    DEDUP_NUM_PERMUTATIONS,
+    DEDUP_BANDS,
+    DEDUP_SHINGLE_SIZE,
+    DEDUP_TEXT_THRESHOLD,
+    DEDUP_PRICE_BAND,
+    DEDUP_AREA_TOLERANCE,
+    DEDUP_MAX_CANDIDATES,
+)
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(5645)  # Fixed seed: signatures must be comparable across processes and runs
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(DEDUP_NUM_PERMUTATIONS)
+]
+_ROWS_PER_BAND = DEDUP_NUM_PERMUTATIONS // DEDUP_BANDS
+
+
+def _hash(token):
+    """Stable 64-bit hash of a string"""
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def normalize_text(text):
+    """Lowercase, strip accents and punctuation, collapse whitespace"""
+    text = unidecode(str(text or '')).lower()
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', text).split())
+
+
+def shingles(text, size=DEDUP_SHINGLE_SIZE):
+    """Set of word n-grams of the normalised text"""
+    words = normalize_text(text).split()
+    if len(words) <= size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash(tokens):
+    """MinHash signature of a set of tokens, or an empty list for an empty set"""
+    if not tokens:
+        return []
+    hashes = [_hash(token) for token in tokens]
+    return [
+        min((a * h + b) % _MERSENNE_PRIME for h in hashes)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def estimate_similarity(signature_a, signature_b):
+    """Estimated Jaccard similarity of the sets behind two signatures"""
+    if not signature_a or not signature_b or len(signature_a) != len(signature_b):
+        return 0.0
+    return sum(1 for a, b in zip(signature_a, signature_b) if a == b) / len(signature_a)
+
+
+def normalize_photo_url(url):
+    """Host + path of a photo URL, lowercased and without query string or fragment"""
+    parts = urlsplit(str(url).strip())
+    return f"{parts.netloc.lower()}{parts.path.lower()}"
+
+
+def _price_band(price):
+    """Logarithmic price band: prices within ~DEDUP_PRICE_BAND of each other share or neighbour a band"""
+    price = float(price or 0)
+    if price <= 0:
+        return 0
+    return int(math.log(price) / math.log(1 + DEDUP_PRICE_BAND))
+
+
+def _blocks(house):
+    """
+    Blocking keys: only listings in the same place, with the same layout and listing type are compared.
+
+    A listing resolved to a parish is blocked under its county too, so that the same flat resolved
+    at parish level on one portal and only at county level on another still meets.
+    """
+    if house.parish_id:
+        locations = [f"p{house.parish_id}"] + ([f"c{house.county_id}"] if house.county_id else [])
+    elif house.county_id:
+        locations = [f"c{house.county_id}"]
+    elif house.district_id:
+        locations = [f"d{house.district_id}"]
+    else:
+        locations = ['-']
+    return [f"{location}:{house.bedrooms_num or 0}:{house.listing_type}" for location in locations]
+
+
+def _band_keys(block, price_band, signature):
+    keys = []
+    for band in range(DEDUP_BANDS):
+        rows = signature[band * _ROWS_PER_BAND:(band + 1) * _ROWS_PER_BAND]
+        digest = hashlib.blake2b(repr(rows).encode('ascii'), digest_size=8).hexdigest()
+        keys.append(f"{block}:{price_band}:{band}:{digest}")
+    return keys
+
+
+def _text_keys(house, signature, price_bands):
+    keys = set()
+    if signature:
+        for block in _blocks(house):
+            for price_band in price_bands:
+                keys.update(_band_keys(block, price_band, signature))
+    return keys
+
+
+def _photo_keys(photo_urls):
+    return {
+        'photo:' + hashlib.blake2b(normalize_photo_url(url).encode('utf-8'), digest_size=12).hexdigest()
+        for url in photo_urls or [] if url
+    }
+
+
+def _is_close(a, b, tolerance):
+    a, b = float(a or 0), float(b or 0)
+    if a <= 0 or b <= 0:
+        return True  # Unknown values don't rule a candidate out
+    return abs(a - b) <= tolerance * max(a, b)
+
+
+def assign_listing_group(house, photo_urls=None):
+    """
+    Index a newly inserted house and assign its listing_group.
+
+    Args:
+        house: saved House instance
+        photo_urls: the house's photo URLs (defaults to its Photo rows)
+
+    Returns:
+        bool: True if the house joined the group of an existing listing
+    """
+    if photo_urls is None:
+        photo_urls = list(house.photos.values_list('image_url', flat=True))
+
+    signature = minhash(shingles(f"{house.name} {house.description}"))
+    price_band = _price_band(house.price)
+    photo_keys = _photo_keys(photo_urls)
+
+    # Look up our own band and both neighbours so prices near a band edge still meet
+    candidate_keys = photo_keys | _text_keys(house, signature, (price_band - 1, price_band, price_band + 1))
+
+    matches = (
+        DedupBucket.objects
+        .filter(key__in=candidate_keys)
+        .exclude(house_id=house.pk)
+        .values_list('house_id', 'key')
+    )
+    text_candidates, photo_candidates = set(), set()
+    for house_id, key in matches:
+        (photo_candidates if key.startswith('photo:') else text_candidates).add(house_id)
+
+    best_group, best_score = None, 0.0
+    candidate_ids = list(text_candidates | photo_candidates)[:DEDUP_MAX_CANDIDATES]
+    if candidate_ids:
+        candidates = (
+            House.objects
+            .filter(pk__in=candidate_ids, listing_type=house.listing_type)
+            .select_related('signature')
+            .only('id', 'price', 'area', 'listing_group', 'signature__minhash')
+        )
+        for candidate in candidates:
+            if not _is_close(house.area, candidate.area, DEDUP_AREA_TOLERANCE):
+                continue
+            candidate_signature = getattr(getattr(candidate, 'signature', None), 'minhash', None)
+            score = estimate_similarity(signature, candidate_signature)
+            if candidate.pk in photo_candidates and _is_close(house.price, candidate.price, DEDUP_PRICE_BAND):
+                score = max(score, 1.0)
+            if score >= DEDUP_TEXT_THRESHOLD and score > best_score:
+                best_group, best_score = candidate.listing_group or candidate.pk, score
+
+    house.listing_group = best_group or house.pk
+    House.objects.filter(pk=house.pk).update(listing_group=house.listing_group)
+
+    ListingSignature.objects.update_or_create(house=house, defaults={'minhash': signature})
+    keys = photo_keys | _text_keys(house, signature, (price_band,))
+    DedupBucket.objects.filter(house=house).delete()
+    DedupBucket.objects.bulk_create([DedupBucket(house=house, key=key) for key in keys])
+
+    return best_group is not None
+
+
+def reindex_listings(houses):
+    """
+    Rebuild the signature and bucket keys of indexed houses whose price or title changed, keeping
+    their listing_group.
+
+    The price band and the text are part of the keys: stale keys would hide a house from the
+    duplicates inserted after the change.
+    """
+    houses = [house for house in houses if house.listing_group]
+    if not houses:
+        return
+    house_ids = [house.pk for house in houses]
+    photo_urls = {}
+    for house_id, url in Photo.objects.filter(house_id__in=house_ids).values_list('house_id', 'image_url'):
+        photo_urls.setdefault(house_id, []).append(url)
+
+    signatures, buckets = [], []
+    for house in houses:
+        signature = minhash(shingles(f"{house.name} {house.description}"))
+        signatures.append(ListingSignature(house=house, minhash=signature))
+        keys = _photo_keys(photo_urls.get(house.pk)) | _text_keys(house, signature, (_price_band(house.price),))
+        buckets.extend(DedupBucket(house=house, key=key) for key in keys)
+
+    ListingSignature.objects.filter(house_id__in=house_ids).delete()
+    ListingSignature.objects.bulk_create(signatures, batch_size=500)
+    DedupBucket.objects.filter(house_id__in=house_ids).delete()
+    DedupBucket.objects.bulk_create(buckets, batch_size=1000)
@@ -0,0 +1,181 @@
+"""
+Bulk export of houses (CSV, NDJSON and Parquet).
+
+Rows are read with values_list().iterator(chunk_size=...), so only one chunk of
+rows is held in memory whatever the number of houses exported. CSV and NDJSON
+are produced as a stream of byte chunks (for a StreamingHttpResponse or a
+file), Parquet snapshots are written one row group at a time. Parquet needs
+pyarrow, which is optional.
+
+Under ASGI, Django reads a synchronous streaming response to the end before
+sending it, so the export view wraps the chunks in aiterate to stream them.
+"""
+import csv
+import io
+import os
+
+from asgiref.sync import sync_to_async
+
+from .renderers import ORJSONRenderer
+from .settings import EXPORT_CHUNK_SIZE, EXPORT_BUFFER_SIZE, EXPORT_PARQUET_ROW_GROUP_SIZE
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pyarrow is optional, Parquet exports are unavailable without it
+    pyarrow = None
+
+# (column, lookup, type): the exported columns, location names through LEFT JOINs
+EXPORT_COLUMNS = [
+    ('house_id', 'house_id', 'string'),
+    ('source', 'source', 'string'),
+    ('name', 'name', 'string'),
+    ('url', 'url', 'string'),
+    ('listing_type', 'listing_type', 'string'),
+    ('property_type', 'property_type', 'string'),
+    ('price', 'price', 'float'),
+    ('area', 'area', 'float'),
+    ('bedrooms', 'bedrooms', 'string'),
+    ('floor', 'floor', 'string'),
+    ('bedrooms_num', 'bedrooms_num', 'int'),
+    ('area_m2', 'area_m2', 'float'),
+    ('floor_num', 'floor_num', 'int'),
+    ('price_per_m2', 'price_per_m2', 'float'),
+    ('zone', 'zone', 'string'),
+    ('parish_id', 'parish_id', 'int'),
+    ('parish_name', 'parish__name', 'string'),
+    ('county_id', 'county_id', 'int'),
+    ('county_name', 'county__name', 'string'),
+    ('district_id', 'district_id', 'int'),
+    ('district_name', 'district__name', 'string'),
+    ('description', 'description', 'string'),
+    ('scraped_at', 'scraped_at', 'timestamp'),
+    ('last_seen_at', 'last_seen_at', 'timestamp'),
+    ('price_dropped_at', 'price_dropped_at', 'timestamp'),
+    ('is_active', 'is_active', 'bool'),
+    ('listing_group', 'listing_group', 'int'),
+]
+COLUMN_NAMES = [column for column, _, _ in EXPORT_COLUMNS]
+
+# format -> (content type, file extension)
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+STREAMED_FORMATS = ['csv', 'ndjson']
+
+
+class ExportUnavailable(Exception):
+    pass
+
+
+def export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Rows (tuples in EXPORT_COLUMNS order) of the houses of a queryset, in primary key order, read chunk by chunk"""
+    rows = queryset.order_by('pk').values_list(*[lookup for _, lookup, _ in EXPORT_COLUMNS])
+    return rows.iterator(chunk_size=chunk_size)
+
+
+def buffered(pieces, size=EXPORT_BUFFER_SIZE):
+    """Join small byte strings into chunks of about `size` bytes"""
+    buffer, length = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        length += len(piece)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+async def aiterate(chunks):
+    """
+    Async iterator over the byte chunks of a stream, each read in a worker thread.
+
+    Thread-sensitive, so every chunk is read in the thread that opened the database cursor.
+    """
+    chunks = iter(chunks)
+    read = sync_to_async(next)
+    while (chunk := await read(chunks, None)) is not None:
+        yield chunk
+
+
+def csv_stream(rows):
+    """CSV of export rows (header first, datetimes in ISO 8601, NULLs empty), as byte chunks"""
+    timestamps = [index for index, (_, _, kind) in enumerate(EXPORT_COLUMNS) if kind == 'timestamp']
+    line = io.StringIO()
+    writer = csv.writer(line)
+
+    def lines():
+        writer.writerow(COLUMN_NAMES)
+        for row in rows:
+            if timestamps:
+                row = list(row)
+                for index in timestamps:
+                    if row[index] is not None:
+                        row[index] = row[index].isoformat()
+            writer.writerow(row)
+            yield line.getvalue().encode('utf-8')
+            line.seek(0)
+            line.truncate()
+
+    return buffered(lines())
+
+
+def ndjson_stream(rows):
+    """One JSON object per export row and line (rendered like the API's JSON), as byte chunks"""
+    renderer = ORJSONRenderer()
+    return buffered(renderer.render(dict(zip(COLUMN_NAMES, row))) + b'\n' for row in rows)
+
+
+def parquet_schema():
+    types = {
+        'string': pyarrow.string(),
+        'float': pyarrow.float64(),
+        'int': pyarrow.int64(),
+        'bool': pyarrow.bool_(),
+        'timestamp': pyarrow.timestamp('us', tz='UTC'),
+    }
+    return pyarrow.schema([(column, types[kind]) for column, _, kind in EXPORT_COLUMNS])
+
+
+def write_parquet(rows, path, row_group_size=EXPORT_PARQUET_ROW_GROUP_SIZE):
+    """
+    Write export rows to a Parquet file, one row group per `row_group_size` rows.
+    The file is written next to `path` and moved into place once complete, so a
+    snapshot is never read half-written.
+
+    Returns:
+        int: number of rows written
+    """
+    if pyarrow is None:
+        raise ExportUnavailable('Parquet exports need pyarrow (pip install pyarrow)')
+    schema = parquet_schema()
+    floats = [index for index, (_, _, kind) in enumerate(EXPORT_COLUMNS) if kind == 'float']
+    temporary = f'{path}.tmp'
+    written = 0
+    try:
+        with pyarrow.parquet.ParquetWriter(temporary, schema, compression='zstd') as writer:
+            group = []
+            for row in rows:
+                group.append(row)
+                if len(group) >= row_group_size:
+                    writer.write_table(_row_group(group, schema, floats))
+                    written += len(group)
+                    group = []
+            if group or not written:
+                writer.write_table(_row_group(group, schema, floats))
+                written += len(group)
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+    return written
+
+
+def _row_group(rows, schema, floats):
+    columns = [list(values) for values in zip(*rows)] or [[] for _ in EXPORT_COLUMNS]
+    for index in floats:
+        columns[index] = [None if value is None else float(value) for value in columns[index]]
+    return pyarrow.Table.from_arrays(columns, schema=schema)
@@ -0,0 +1,182 @@
+"""
+Page-level bulk writes used by the scrapers.
+
+Scrapers buffer what they learn about listings that already exist while they
+walk a results page, and flush it here once per page so that the database
+sees a handful of set-based statements instead of one query per card.
+"""
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import House, PriceHistory
+from .normalization import normalize_listing, NORMALIZED_FIELDS
+from .classifier import is_room_rental, terms_version
+from .settings import LISTING_EXPIRY_DAYS
+from .cache import bump_data_version
+from .dedup import reindex_listings
+
+CENTS = Decimal('0.01')
+
+
+def _to_decimal(value):
+    """Convert a cleaned price/area value to a 2-decimal Decimal, or None if it can't be parsed"""
+    if value is None or value == '':
+        return None
+    try:
+        return Decimal(str(value)).quantize(CENTS)
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def listing_fingerprint(name, price, area, bedrooms):
+    """
+    Cheap fingerprint of the fields we track for changes.
+
+    Values are normalised so that what the portal shows ("850", "T2 ") compares
+    equal to what is stored in the database (Decimal('850.00'), "T2").
+    """
+    return (
+        _to_decimal(price),
+        _to_decimal(area),
+        (bedrooms or '').strip(),
+        (name or '').strip(),
+    )
+
+
+def load_listing_states(queryset):
+    """
+    Load the last known state of every listing in the queryset.
+
+    Returns:
+        dict: url -> (house pk, fingerprint)
+    """
+    states = {}
+    rows = queryset.values_list('id', 'url', 'name', 'price', 'area', 'bedrooms')
+    for pk, url, name, price, area, bedrooms in rows.iterator(chunk_size=2000):
+        states[url] = (pk, listing_fingerprint(name, price, area, bedrooms))
+    return states
+
+
+def merge_fingerprint(known, scraped):
+    """Fill fields the portal did not show (None / empty) with the last known value"""
+    return tuple(new if new not in (None, '') else old for old, new in zip(known, scraped))
+
+
+def flush_listing_changes(changes, now=None):
+    """
+    Persist changed listings in bulk.
+
+    Args:
+        changes: dict of house pk -> (old fingerprint, new fingerprint)
+        now: timestamp for the history rows (defaults to timezone.now())
+
+    Returns:
+        int: number of history rows written
+    """
+    if not changes:
+        return 0
+
+    now = now or timezone.now()
+    houses = House.objects.in_bulk(list(changes.keys()))
+    history = []
+    updated = []
+
+    for pk, (old, new) in changes.items():
+        house = houses.get(pk)
+        if house is None:
+            continue
+        price, area, bedrooms, name = new
+        old_price = old[0]
+
+        history.append(PriceHistory(
+            house=house,
+            name=name,
+            price=price,
+            previous_price=old_price,
+            area=area,
+            bedrooms=bedrooms,
+            recorded_at=now,
+        ))
+
+        house.name = name
+        house.price = price
+        house.area = area
+        house.bedrooms = bedrooms
+        for field, value in normalize_listing(name, price, bedrooms, area, house.floor).items():
+            setattr(house, field, value)
+        house.is_room_rental = is_room_rental(name, house.description)
+        house.room_rental_version = terms_version()
+        if old_price is not None and price is not None and price < old_price:
+            house.price_dropped_at = now
+        updated.append(house)
+
+    with transaction.atomic():
+        PriceHistory.objects.bulk_create(history, batch_size=500)
+        House.objects.bulk_update(
+            updated,
+            ['name', 'price', 'area', 'bedrooms', 'price_dropped_at', 'is_room_rental', 'room_rental_version',
+             *NORMALIZED_FIELDS],
+            batch_size=500
+        )
+        # The price band and the title are part of the duplicate detection keys
+        reindex_listings(updated)
+
+    return len(history)
+
+
+def mark_listings_seen(house_ids, now=None):
+    """
+    Record that the given listings are still online, in a single UPDATE.
+
+    Listings that had been expired come back to life when they are seen again.
+
+    Returns:
+        int: number of houses updated
+    """
+    if not house_ids:
+        return 0
+    now = now or timezone.now()
+    return House.objects.filter(pk__in=list(house_ids)).update(last_seen_at=now, is_active=True)
+
+
+def fully_seen_sources(main_run):
+    """
+    The (source, listing type) pairs whose run, within a main run, completed and paged every search URL
+    to its last page.
+
+    Only those runs saw every listing of their source still online. Scrapers stop paging early (on a page
+    without new listings, after the first pages) and swallow blocked or failed pages, so the listings the
+    other runs didn't see may well be online.
+    """
+    return set(
+        main_run.scraper_runs.filter(status='completed', saw_all_listings=True, listing_type__isnull=False)
+        .values_list('scraper', 'listing_type')
+    )
+
+
+def expire_stale_listings(sources, days=LISTING_EXPIRY_DAYS, now=None):
+    """
+    Mark the active listings of the given sources that haven't been seen for `days` days as inactive.
+
+    Args:
+        sources: (source, listing type) pairs, see fully_seen_sources(); the listings of other
+            sources are left alone
+
+    Returns:
+        int: number of houses marked inactive
+    """
+    if not sources:
+        return 0
+    now = now or timezone.now()
+    cutoff = now - timedelta(days=days)
+    of_sources = Q()
+    for source, listing_type in sources:
+        of_sources |= Q(source=source, listing_type=listing_type)
+    expired = House.objects.filter(of_sources, is_active=True, last_seen_at__lt=cutoff).update(is_active=False)
+    if expired:
+        bump_data_version()
+    return expired
@@ -0,0 +1,208 @@
+"""
+Live feed of new listings, for Server-Sent Events.
+
+LiveFeed is an in-process pub/sub. Every subscriber (an open SSE connection)
+has a queue and its filters; a single follower task per process loads the
+houses inserted since the last one it published, serialises each once and
+puts the frame in the queues whose filters match. Idle connections cost a
+queue, never a query.
+
+The follower wakes up every LIVE_FEED_POLL_SECONDS to look for houses
+inserted since the last it published: one primary key range query per
+process, whatever the number of subscribers. notify_new_houses (called by
+the scrapers after every page) wakes it at once, but only in the process
+that wrote the houses. The scrapers run in their own process (from cron, or
+the subprocess started by /api/run-scrapers/), so in practice new listings
+reach subscribers within LIVE_FEED_POLL_SECONDS; SQLite has no cross-process
+notification to do better than polling. Event ids are house primary keys,
+which only grow, so a client reconnecting with Last-Event-ID gets what it
+missed from a primary key range query as well.
+"""
+import asyncio
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from .models import House, FEED_CONDITION
+from .renderers import ORJSONRenderer
+from .serializers import HouseSerializer
+from .settings import LIVE_FEED_BATCH_SIZE, LIVE_FEED_POLL_SECONDS, LIVE_FEED_QUEUE_SIZE
+
+# The list representation, without the flags of a user
+LIVE_FIELDS = [name for name in HouseSerializer.Meta.list_fields if name not in HouseSerializer.USER_FLAGS]
+
+# query parameter -> (House field, comparison)
+LIVE_FILTERS = {
+    'listing_type': ('listing_type', 'exact'),
+    'property_type': ('property_type', 'exact'),
+    'source': ('source', 'exact'),
+    'district': ('district_id', 'exact'),
+    'county': ('county_id', 'exact'),
+    'parish': ('parish_id', 'exact'),
+    'min_price': ('price', 'gte'),
+    'max_price': ('price', 'lte'),
+    'min_bedrooms': ('bedrooms_num', 'gte'),
+    'max_bedrooms': ('bedrooms_num', 'lte'),
+    'min_area': ('area_m2', 'gte'),
+    'max_area': ('area_m2', 'lte'),
+}
+MATCH_FIELDS = sorted({field for field, _ in LIVE_FILTERS.values()})
+NUMERIC_FIELDS = {'district_id', 'county_id', 'parish_id', 'price', 'bedrooms_num', 'area_m2'}
+
+
+class LiveFilter:
+    """A subscriber's filters, the feed parameters of the house list (see LIVE_FILTERS)"""
+
+    def __init__(self, conditions):
+        self.conditions = conditions  # [(field, comparison, value)]
+
+    @classmethod
+    def from_params(cls, params):
+        conditions = []
+        for param, (field, comparison) in LIVE_FILTERS.items():
+            value = params.get(param, '').strip()
+            if not value:
+                continue
+            if field in NUMERIC_FIELDS:
+                try:
+                    value = Decimal(value)
+                except InvalidOperation:
+                    continue
+            conditions.append((field, comparison, value))
+        return cls(conditions)
+
+    def apply(self, queryset):
+        return queryset.filter(**{f'{field}__{comparison}': value for field, comparison, value in self.conditions})
+
+    def matches(self, values):
+        """Whether a house, given by its MATCH_FIELDS values, passes the filters"""
+        for field, comparison, value in self.conditions:
+            actual = values[field]
+            if actual is None:
+                return False
+            if comparison == 'exact' and actual != value:
+                return False
+            if comparison == 'gte' and actual < value:
+                return False
+            if comparison == 'lte' and actual > value:
+                return False
+        return True
+
+
+class Subscription:
+    def __init__(self, live_filter):
+        self.filter = live_filter
+        self.queue = asyncio.Queue(maxsize=LIVE_FEED_QUEUE_SIZE)
+        self.overflowed = False
+
+    def put(self, event_id, frame):
+        try:
+            self.queue.put_nowait((event_id, frame))
+        except asyncio.QueueFull:
+            # Too slow to keep up: closed, the client comes back with its Last-Event-ID
+            self.overflowed = True
+            self.queue = None
+
+
+HEARTBEAT_FRAME = b': keepalive\n\n'
+
+
+def event_frame(event_id, data):
+    return b'id: %d\nevent: house\ndata: %s\n\n' % (event_id, ORJSONRenderer().render(data))
+
+
+async def load_events(queryset, limit=None):
+    """(id, frame, match values) of the feed houses of a queryset, in primary key order"""
+    queryset = HouseSerializer.setup_eager_loading(
+        queryset.filter(FEED_CONDITION).order_by('pk'), None, LIVE_FIELDS, full_description=False
+    )
+    houses = [house async for house in (queryset[:limit] if limit else queryset)]
+    data = HouseSerializer(houses, many=True, context={'fields': LIVE_FIELDS, 'full_description': False}).data
+    return [
+        (house.pk, event_frame(house.pk, item), {field: getattr(house, field) for field in MATCH_FIELDS})
+        for house, item in zip(houses, data)
+    ]
+
+
+class LiveFeed:
+    def __init__(self):
+        self.subscriptions = set()
+        self.loop = None
+        self.wake = None
+        self.follower = None
+        self.ready = None
+        self.last_id = None  # Primary key of the last house published
+
+    async def subscribe(self, live_filter):
+        loop = asyncio.get_running_loop()
+        if loop is not self.loop:
+            # First subscriber, or a new event loop (tests): the previous one's state is gone
+            self.loop, self.wake, self.follower = loop, asyncio.Event(), None
+            self.subscriptions = set()
+        subscription = Subscription(live_filter)
+        self.subscriptions.add(subscription)
+        if self.follower is None or self.follower.done():
+            self.ready = asyncio.Event()
+            self.follower = loop.create_task(self.follow())
+        await self.ready.wait()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.subscriptions.discard(subscription)
+
+    def notify(self):
+        """Wake the follower up, from any thread (the writer publishing new houses)"""
+        loop, wake = self.loop, self.wake
+        if loop is not None and not loop.is_closed() and self.subscriptions:
+            loop.call_soon_threadsafe(wake.set)
+
+    async def follow(self):
+        try:
+            self.last_id = await House.objects.order_by('-pk').values_list('pk', flat=True).afirst() or 0
+        finally:
+            self.ready.set()
+        while self.subscriptions:
+            try:
+                await asyncio.wait_for(self.wake.wait(), LIVE_FEED_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self.wake.clear()
+            await self.publish_new()
+
+    async def publish_new(self):
+        """Publish the houses inserted since the last one published"""
+        while True:
+            events = await load_events(House.objects.filter(pk__gt=self.last_id), LIVE_FEED_BATCH_SIZE)
+            for event_id, frame, values in events:
+                for subscription in list(self.subscriptions):
+                    if subscription.queue is not None and subscription.filter.matches(values):
+                        subscription.put(event_id, frame)
+                self.last_id = event_id
+            if len(events) < LIVE_FEED_BATCH_SIZE:
+                return
+
+    async def replay(self, live_filter, after):
+        """
+        The events after a Last-Event-ID matching the filters, at most LIVE_FEED_BATCH_SIZE
+        (the oldest ones are dropped).
+        """
+        queryset = live_filter.apply(House.objects.filter(pk__gt=after)).filter(FEED_CONDITION)
+        pks = [pk async for pk in queryset.order_by('-pk').values_list('pk', flat=True)[:LIVE_FEED_BATCH_SIZE]]
+        if not pks:
+            return []
+        return [(event_id, frame) for event_id, frame, _ in await load_events(House.objects.filter(pk__in=pks))]
+
+
+live_feed = LiveFeed()
+
+
+def notify_new_houses():
+    """Tell this process's live feed that houses were inserted, once the current transaction commits"""
+    transaction.on_commit(live_feed.notify)
+
+
+def parse_last_event_id(value):
+    try:
+        return max(int(value), 0)
+    except (TypeError, ValueError):
+        return None
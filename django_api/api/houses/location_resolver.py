@@ -0,0 +1,179 @@
+"""
+Resolution of the free-text zone of a listing ("Arroios, Lisboa") to parish and county ids.
+
+A zone is split on commas (parts starting with "rua" are street names and
+skipped); the parish is the first parish matched by a part, left to right,
+and the county the first county matched. A part matches a name when their
+partial_ratio is above LOCATION_MATCH_THRESHOLD, and when several names do,
+the first one in name order wins.
+
+Scrapers resolve the zone of every card, so scoring every part against every
+name does not scale. Instead:
+
+- names are normalised (lowercase, without accents) once;
+- the names are shortlisted before any scoring: partial_ratio is at most
+  2I/(L+I), with L the length of the shorter string and I the number of its
+  characters (as a multiset) found in the best L-long window of the longer
+  one. A character index gives the bound over the whole name for every name
+  at once. Without rapidfuzz, the tighter bound of the windows is then checked
+  name by name, in Python. With it, the names that pass are scored in C by
+  rapidfuzz's partial_ratio, one call per part: it takes the best alignment
+  over every window, where fuzzywuzzy only tries the windows its matching
+  blocks point to, so it is never below fuzzywuzzy's score and is a bound as
+  well. In both cases the names left are scored by fuzzywuzzy in name order
+  until one matches; only names that can't reach the threshold are dropped,
+  so the results are those of scoring every name with fuzzywuzzy;
+- results are memoised by normalised part: the same zones come back on every
+  card of a neighbourhood and on every run.
+"""
+from collections import Counter
+
+from fuzzywuzzy import fuzz
+from unidecode import unidecode
+
+from .settings import LOCATION_MATCH_THRESHOLD, LOCATION_MEMO_SIZE
+
+try:
+    from rapidfuzz import fuzz as rapid_fuzz, process
+except ImportError:  # Optional: the shortlist is narrowed in Python
+    rapid_fuzz = process = None
+
+# Integer form of 2I / (L + I) >= (threshold + 0.5) / 100, the lowest ratio rounded above the threshold
+_SHARED_WEIGHT = 399 - 2 * LOCATION_MATCH_THRESHOLD
+_LENGTH_WEIGHT = 2 * LOCATION_MATCH_THRESHOLD + 1
+
+
+def _reaches_threshold(shared, length):
+    return _SHARED_WEIGHT * shared >= _LENGTH_WEIGHT * length
+
+
+def _window_overlap(needed, length, longer):
+    """Whether an L-long window of `longer` holds enough of the `needed` character counts (L = length)"""
+    window = Counter(longer[:length])
+    shared = sum(min(count, window[character]) for character, count in needed.items())
+    if _reaches_threshold(shared, length):
+        return True
+    for position in range(length, len(longer)):
+        leaving, entering = longer[position - length], longer[position]
+        if leaving == entering:
+            continue
+        if window[leaving] <= needed.get(leaving, 0):
+            shared -= 1
+        window[leaving] -= 1
+        window[entering] += 1
+        if window[entering] <= needed.get(entering, 0):
+            shared += 1
+            if _reaches_threshold(shared, length):
+                return True
+    return False
+
+
+def normalize_name(name):
+    return unidecode(str(name).lower())
+
+
+def zone_parts(zone):
+    """The normalised comma-separated parts of a zone, without street names"""
+    return [
+        part.strip()
+        for part in normalize_name(zone).split(',')
+        if not part.strip().startswith('rua')
+    ]
+
+
+class NameIndex:
+    """Location names, in priority order, indexed by the characters they contain"""
+
+    def __init__(self, names):
+        """
+        Args:
+            names: (id, name) pairs, the first matching name wins
+        """
+        self.ids = []
+        self.names = []
+        self.lengths = []
+        self.counts = []
+        self.postings = {}  # character -> [(name index, occurrences)]
+        for name_id, name in names:
+            name = normalize_name(name)
+            if not name:
+                continue
+            index = len(self.names)
+            self.ids.append(name_id)
+            self.names.append(name)
+            self.lengths.append(len(name))
+            self.counts.append(Counter(name))
+            for character, count in self.counts[-1].items():
+                self.postings.setdefault(character, []).append((index, count))
+
+    def candidates(self, part, windows=True):
+        """Indexes of the names that could match the part, in priority order (lazily)"""
+        part_counts = Counter(part)
+        shared = [0] * len(self.names)
+        for character, count in part_counts.items():
+            for index, occurrences in self.postings.get(character, ()):
+                shared[index] += count if count < occurrences else occurrences
+        length = len(part)
+        for index, name_length in enumerate(self.lengths):
+            if not _reaches_threshold(shared[index], min(length, name_length)):
+                continue
+            if windows and length < name_length and not _window_overlap(part_counts, length, self.names[index]):
+                continue
+            if windows and name_length < length and not _window_overlap(self.counts[index], name_length, part):
+                continue
+            yield index
+
+    def first_match(self, part):
+        """Id of the first name matching a normalised part, or None"""
+        if not part:
+            return None
+        if process is None:
+            candidates = self.candidates(part)
+        else:
+            shortlist = list(self.candidates(part, windows=False))
+            # A bound, not the decision: a match rounds above the threshold, so its unrounded score is above it too
+            bounded = process.extract(
+                part, [self.names[index] for index in shortlist], scorer=rapid_fuzz.partial_ratio,
+                score_cutoff=LOCATION_MATCH_THRESHOLD, limit=None
+            )
+            candidates = sorted(shortlist[position] for _, _, position in bounded)
+        for index in candidates:
+            if fuzz.partial_ratio(part, self.names[index]) > LOCATION_MATCH_THRESHOLD:
+                return self.ids[index]
+        return None
+
+
+class LocationResolver:
+    """Parish and county of zones, among the given parishes and counties"""
+
+    def __init__(self, parishes, counties):
+        """
+        Args:
+            parishes, counties: (id, name) pairs in priority order (by name)
+        """
+        self.parishes = NameIndex(parishes)
+        self.counties = NameIndex(counties)
+        self.memo = {}  # normalised part -> (parish id, county id)
+
+    def resolve(self, zone):
+        """
+        Returns:
+            tuple: (parish id, county id), None for what isn't found
+        """
+        parish_id = county_id = None
+        for part in zone_parts(zone):
+            part_parish_id, part_county_id = self.match_part(part)
+            parish_id = parish_id or part_parish_id
+            county_id = county_id or part_county_id
+            if parish_id and county_id:
+                break
+        return parish_id, county_id
+
+    def match_part(self, part):
+        match = self.memo.get(part)
+        if match is None:
+            match = (self.parishes.first_match(part), self.counties.first_match(part))
+            if len(self.memo) >= LOCATION_MEMO_SIZE:
+                self.memo.clear()
+            self.memo[part] = match
+        return match
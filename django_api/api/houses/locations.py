@@ -0,0 +1,61 @@
+"""
+The district -> county -> parish hierarchy, for the location pickers.
+
+The tree is built in three queries (one per table) and kept in process memory
+with the ``locations`` data version it was built from: it only changes when
+populate_location_data bumps that version, so a request costs the version
+lookup the ETag needs anyway.
+"""
+import threading
+
+from asgiref.sync import sync_to_async
+
+from .models import District, County, Parish
+
+_lock = threading.Lock()
+_tree = (None, None)  # (version, tree)
+
+
+def build_location_tree():
+    """
+    The whole hierarchy, ordered by name at every level.
+
+    Returns:
+        list: [{"id", "name", "counties": [{"id", "name", "parishes": [{"id", "name"}]}]}]
+    """
+    parishes = {}
+    for parish_id, name, county_id in Parish.objects.order_by('name', 'id').values_list('id', 'name', 'county_id'):
+        parishes.setdefault(county_id, []).append({'id': parish_id, 'name': name})
+    counties = {}
+    for county_id, name, district_id in County.objects.order_by('name', 'id').values_list('id', 'name', 'district_id'):
+        county = {'id': county_id, 'name': name, 'parishes': parishes.get(county_id, [])}
+        counties.setdefault(district_id, []).append(county)
+    return [
+        {'id': district_id, 'name': name, 'counties': counties.get(district_id, [])}
+        for district_id, name in District.objects.order_by('name', 'id').values_list('id', 'name')
+    ]
+
+
+def location_tree(version):
+    """The hierarchy at the given locations version, built once per version and process"""
+    global _tree
+    cached_version, tree = _tree
+    if cached_version == version:
+        return tree
+    with _lock:
+        if _tree[0] != version:
+            _tree = (version, build_location_tree())
+        return _tree[1]
+
+
+async def alocation_tree(version):
+    """location_tree for the async views: only building the tree leaves the event loop"""
+    cached_version, tree = _tree
+    if cached_version == version:
+        return tree
+    return await sync_to_async(location_tree)(version)
+
+
+def clear_location_tree():
+    global _tree
+    _tree = (None, None)
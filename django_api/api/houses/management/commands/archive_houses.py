@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from houses.archive import archivable_houses, archive_houses
+from houses.settings import ARCHIVE_INACTIVE_AFTER_DAYS, ARCHIVE_MAX_AGE_DAYS, ARCHIVE_BATCH_SIZE
+
+class Command(BaseCommand):
+    help = (
+        'Move inactive and old houses, with their photos, to the archive tables. '
+        'Meant to run on a schedule, e.g. nightly from cron: '
+        '0 4 * * * cd /app && python api/manage.py archive_houses'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--inactive-days',
+            type=int,
+            default=ARCHIVE_INACTIVE_AFTER_DAYS,
+            help=f'Archive listings inactive and unseen for this many days (default: {ARCHIVE_INACTIVE_AFTER_DAYS})'
+        )
+        parser.add_argument(
+            '--max-age-days',
+            type=int,
+            default=ARCHIVE_MAX_AGE_DAYS,
+            help=f'Archive any listing scraped longer ago than this, 0 to disable (default: {ARCHIVE_MAX_AGE_DAYS})'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=ARCHIVE_BATCH_SIZE,
+            help=f'Number of houses moved per transaction (default: {ARCHIVE_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Maximum number of houses to archive in this run'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many houses would be archived'
+        )
+
+    def handle(self, *args, **options):
+        inactive_days = options['inactive_days']
+        max_age_days = options['max_age_days'] or None
+
+        if options['dry_run']:
+            count = archivable_houses(inactive_days, max_age_days).count()
+            self.stdout.write(f"{count} house(s) would be archived")
+            return
+
+        archived = archive_houses(
+            inactive_days=inactive_days,
+            max_age_days=max_age_days,
+            batch_size=options['batch_size'],
+            limit=options['limit'],
+            progress=lambda total: self.stdout.write(f"Archived {total} house(s)...")
+        )
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} house(s)"))
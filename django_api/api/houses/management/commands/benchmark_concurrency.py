@@ -0,0 +1,158 @@
+import asyncio
+import socket
+import ssl
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+RECEIVE_BUFFER = 4096  # Bytes: a small window, like a phone on a slow network
+READ_SIZE = 1024
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure how a running API server copes with many concurrent slow clients: every client opens a '
+        'connection with a small receive window and reads the response at --read-rate KiB/s. Run it against '
+        'the WSGI server (python api/manage.py runserver) and the ASGI one (uvicorn --app-dir api '
+        'api.asgi:application) with the same arguments to compare them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'url',
+            help='URL to request, e.g. http://127.0.0.1:8000/api/houses/?page_size=100'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            nargs='+',
+            default=[10, 50, 200],
+            help='Numbers of concurrent clients to measure (default: 10 50 200)'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=400,
+            help='Requests per concurrency level (default: 400)'
+        )
+        parser.add_argument(
+            '--read-rate',
+            type=float,
+            default=32,
+            help='KiB/s each client reads the response at, 0 for as fast as possible (default: 32)'
+        )
+        parser.add_argument(
+            '--header',
+            action='append',
+            default=[],
+            help='Extra request header ("Name: value"), e.g. an Authorization header; repeatable'
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=60,
+            help='Seconds after which a request counts as failed (default: 60)'
+        )
+        parser.add_argument(
+            '--insecure',
+            action='store_true',
+            help='Do not verify the certificate of an https URL (runserver_plus\' self-signed one)'
+        )
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        if url.scheme not in ('http', 'https') or not url.hostname:
+            raise CommandError(f"Not an http(s) URL: {options['url']}")
+        self.host = url.hostname
+        self.port = url.port or (443 if url.scheme == 'https' else 80)
+        self.ssl = None
+        if url.scheme == 'https':
+            self.ssl = ssl.create_default_context()
+            if options['insecure']:
+                self.ssl.check_hostname = False
+                self.ssl.verify_mode = ssl.CERT_NONE
+        path = (url.path or '/') + (f'?{url.query}' if url.query else '')
+        headers = ''.join(f'{header.strip()}\r\n' for header in options['header'])
+        self.request = (
+            f'GET {path} HTTP/1.1\r\nHost: {url.netloc}\r\nAccept: application/json\r\n'
+            f'Accept-Encoding: identity\r\n{headers}Connection: close\r\n\r\n'
+        ).encode('latin-1')
+        self.read_rate = options['read_rate'] * 1024
+        self.timeout = options['timeout']
+
+        self.stdout.write(
+            f"{'clients':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'ttfb p50':>10}{'ttfb p95':>10}"
+            f"{'KiB':>8}{'errors':>8}"
+        )
+        for concurrency in options['concurrency']:
+            results, elapsed = asyncio.run(self._level(concurrency, options['requests']))
+            self._report(concurrency, results, elapsed)
+        self.stdout.write(self.style.SUCCESS('Benchmark finished'))
+
+    async def _level(self, concurrency, total):
+        """Run `total` requests with `concurrency` clients, returns (results, seconds)"""
+        queue = iter(range(total))
+        results = []
+
+        async def client():
+            for _ in queue:
+                try:
+                    results.append(await asyncio.wait_for(self._fetch(), self.timeout))
+                except (OSError, asyncio.TimeoutError, ValueError) as e:
+                    results.append(e)
+
+        started = time.perf_counter()
+        await asyncio.gather(*[client() for _ in range(concurrency)])
+        return results, time.perf_counter() - started
+
+    async def _fetch(self):
+        """One request over a new connection: (status, seconds to the first byte, seconds in all, bytes)"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # Set before connecting so that the advertised window stays small
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER)
+        sock.setblocking(False)
+        started = time.perf_counter()
+        try:
+            await asyncio.get_running_loop().sock_connect(sock, (socket.gethostbyname(self.host), self.port))
+        except OSError:
+            sock.close()
+            raise
+        reader, writer = await asyncio.open_connection(
+            sock=sock, ssl=self.ssl, server_hostname=self.host if self.ssl else None
+        )
+        try:
+            writer.write(self.request)
+            await writer.drain()
+            data = await reader.read(READ_SIZE)
+            first_byte = time.perf_counter() - started
+            status = int(data.split(b' ', 2)[1]) if data.startswith(b'HTTP/') else 0
+            size = len(data)
+            while True:
+                if self.read_rate:
+                    await asyncio.sleep(len(data) / self.read_rate)
+                data = await reader.read(READ_SIZE)
+                if not data:
+                    break
+                size += len(data)
+            return status, first_byte, time.perf_counter() - started, size
+        finally:
+            writer.close()
+
+    def _report(self, concurrency, results, elapsed):
+        done = [result for result in results if isinstance(result, tuple) and 200 <= result[0] < 400]
+        errors = len(results) - len(done)
+        if not done:
+            self.stdout.write(f"{concurrency:>8}{'-':>10}{'-':>10}{'-':>10}{'-':>10}{'-':>10}{'-':>8}{errors:>8}")
+            return
+        latencies = sorted(result[2] * 1000 for result in done)
+        first_bytes = sorted(result[1] * 1000 for result in done)
+        self.stdout.write(
+            f"{concurrency:>8}{len(done) / elapsed:>10.1f}{statistics.median(latencies):>10.0f}"
+            f"{self._p95(latencies):>10.0f}{statistics.median(first_bytes):>10.0f}{self._p95(first_bytes):>10.0f}"
+            f"{statistics.median(result[3] for result in done) / 1024:>8.1f}{errors:>8}"
+        )
+
+    def _p95(self, values):
+        return values[max(0, int(len(values) * 0.95) - 1)]
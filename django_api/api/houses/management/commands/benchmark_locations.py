@@ -0,0 +1,115 @@
+import io
+import random
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from fuzzywuzzy import fuzz as legacy_fuzz
+
+from houses.location_resolver import LocationResolver, normalize_name, process
+from houses.models import County, House, Parish
+
+DISTRICT = 'Lisboa'
+# Zones as the portals show them, used when the houses table is empty
+SAMPLE_ZONES = [
+    'Arroios, Lisboa', 'Avenidas Novas, Lisboa', 'Rua Morais Soares, Arroios, Lisboa', 'Penha de França, Lisboa',
+    'Santa Maria Maior, Lisboa', 'Misericórdia, Lisboa', 'Parque das Nações, Lisboa', 'Alvalade, Lisboa',
+    'Estrela, Lisboa', 'Campo de Ourique, Lisboa', 'Benfica, Lisboa', 'Lumiar, Lisboa', 'Olivais, Lisboa',
+    'Cascais e Estoril, Cascais', 'Carcavelos e Parede, Cascais', 'São Domingos de Rana, Cascais',
+    'Alcabideche, Cascais', 'Oeiras e São Julião da Barra, Paço de Arcos e Caxias, Oeiras',
+    'Algés, Linda-a-Velha e Cruz Quebrada-Dafundo, Oeiras', 'Odivelas', 'Sintra', 'Amadora', 'Loures',
+    'Mina de Água, Amadora', 'Venteira, Amadora', 'Sacavém e Prior Velho, Loures', 'Queluz e Belas, Sintra',
+    'Agualva e Mira-Sintra, Sintra', 'Vila Franca de Xira', 'Póvoa de Santa Iria e Forte da Casa, Vila Franca de Xira',
+    'Mafra', 'Ericeira, Mafra', 'Torres Vedras', 'Lisboa', 'Centro, Lisboa', 'Rua Augusta, Baixa, Lisboa',
+    'Marvila, Lisboa', 'Areeiro, Lisboa', 'Campolide, Lisboa', 'Ajuda, Lisboa', 'Belém, Lisboa',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark zone resolution (house zone -> parish and county) on the zones of the houses table '
+        '(or sample zones when it is empty): the previous linear scan of every name against the indexed '
+        'resolver, cold and memoised, checking that they agree. Runs in a rolled back transaction.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=2000,
+            help='Zones of the most recent houses to resolve (default: 2000)'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if not Parish.objects.filter(county__district__name=DISTRICT).exists():
+                call_command('populate_location_data', stdout=io.StringIO())
+            parishes = list(Parish.objects.filter(county__district__name=DISTRICT).values_list('id', 'name'))
+            counties = list(County.objects.filter(district__name=DISTRICT).values_list('id', 'name'))
+            zones = list(House.objects.order_by('-scraped_at').values_list('zone', flat=True)[:options['limit']])
+            transaction.set_rollback(True)
+
+        source = 'houses table'
+        if not zones:
+            source = 'sample zones'
+            rng = random.Random(50)
+            zones = [rng.choice(SAMPLE_ZONES) for _ in range(options['limit'])]
+        self.stdout.write(
+            f"{len(zones)} zones ({len(set(zones))} distinct) from the {source}, {len(parishes)} parishes, "
+            f"{len(counties)} counties; shortlist bound: {'rapidfuzz' if process is not None else 'python'}"
+        )
+
+        legacy_parishes = [(name_id, normalize_name(name)) for name_id, name in parishes]
+        legacy_counties = [(name_id, normalize_name(name)) for name_id, name in counties]
+        legacy, legacy_time = self._time(lambda zone: self._legacy(zone, legacy_parishes, legacy_counties), zones)
+
+        # Built once like the scrapers' LocationManager; the cold run scores every zone
+        cold_resolver = LocationResolver(parishes, counties)
+        cold_resolver.memo = _NoMemo()
+        indexed, indexed_time = self._time(cold_resolver.resolve, zones)
+        memoised, memoised_time = self._time(LocationResolver(parishes, counties).resolve, zones)
+
+        self.stdout.write(f"{'resolver':<24}{'total ms':>10}{'us/zone':>10}{'speedup':>10}{'differences':>13}")
+        for name, results, elapsed in [
+            ('linear scan', legacy, legacy_time), ('indexed', indexed, indexed_time),
+            ('indexed + memo', memoised, memoised_time),
+        ]:
+            differences = sum(result != expected for result, expected in zip(results, legacy))
+            self.stdout.write(
+                f"{name:<24}{elapsed * 1000:>10.1f}{elapsed / len(zones) * 1e6:>10.1f}"
+                f"{legacy_time / elapsed:>9.1f}x{differences:>13}"
+            )
+        self.stdout.write(self.style.SUCCESS('Benchmark finished'))
+
+    def _time(self, resolve, zones):
+        started = time.perf_counter()
+        results = [resolve(zone) for zone in zones]
+        return results, time.perf_counter() - started
+
+    @staticmethod
+    def _legacy(zone, parishes, counties):
+        """The previous LocationManager.extract_location: every part against every name"""
+        parts = [part.strip() for part in normalize_name(zone).split(',') if not part.strip().startswith('rua')]
+        parish_id = county_id = None
+        for part in parts:
+            if not parish_id:
+                for name_id, name in parishes:
+                    if legacy_fuzz.partial_ratio(part, name) > 85:
+                        parish_id = name_id
+                        break
+            if not county_id:
+                for name_id, name in counties:
+                    if legacy_fuzz.partial_ratio(part, name) > 85:
+                        county_id = name_id
+                        break
+            if parish_id and county_id:
+                break
+        return parish_id, county_id
+
+
+class _NoMemo(dict):
+    """Memo that remembers nothing, to time the index alone"""
+
+    def __setitem__(self, key, value):
+        pass
@@ -0,0 +1,126 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import compress_string
+from rest_framework.renderers import JSONRenderer
+
+from houses.middleware import brotli
+from houses.models import House, Photo, District, County, Parish
+from houses.renderers import ORJSONRenderer
+from houses.serializers import HouseSerializer
+from houses.settings import COMPRESSION_BROTLI_QUALITY
+
+PLACES = [
+    ('Lisboa', 'Lisboa', 'Arroios'), ('Lisboa', 'Cascais', 'Estoril'), ('Porto', 'Porto', 'Bonfim'),
+    ('Setúbal', 'Almada', 'Caparica e Trafaria'), ('Faro', 'Loulé', 'Quarteira'),
+]
+WORDS = [
+    'apartamento', 'moradia', 'luminoso', 'remodelado', 'varanda', 'terraço', 'garagem', 'vista', 'rio',
+    'metro', 'cozinha', 'equipada', 'sala', 'suite', 'jardim', 'condomínio', 'centro', 'praia', 'escolas',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the JSON rendering time (stdlib vs orjson) and the response size (raw, gzip, brotli) of '
+        'pages of houses in the default list representation, on synthetic data. Everything runs in a '
+        'transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--page-sizes',
+            type=int,
+            nargs='+',
+            default=[10, 100, 1000],
+            help='Page sizes to measure (default: 10 100 1000)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Runs per measurement (default: 20)'
+        )
+
+    def handle(self, *args, **options):
+        renderers = [('json', JSONRenderer()), ('orjson', ORJSONRenderer())]
+        with transaction.atomic():
+            self._populate(max(options['page_sizes']))
+            self.stdout.write(
+                f"{'page':>6}{'json ms':>14}{'orjson ms':>14}{'bytes':>10}"
+                f"{'gzip':>9}{'gzip ms':>12}{'brotli':>9}{'brotli ms':>12}  (p50/p95)"
+            )
+            for page_size in options['page_sizes']:
+                data = self._page(page_size)
+                timings = [self._time(lambda: renderer.render(data), options['repeat']) for _, renderer in renderers]
+                content = ORJSONRenderer().render(data)
+                if JSONRenderer().render(data) != content:
+                    self.stdout.write(self.style.WARNING(f'{page_size}: orjson output differs from json'))
+
+                gzipped = compress_string(content)
+                gzip_time = self._time(lambda: compress_string(content), options['repeat'])
+                if brotli is not None:
+                    brotli_size = len(brotli.compress(content, quality=COMPRESSION_BROTLI_QUALITY))
+                    brotli_time = self._time(
+                        lambda: brotli.compress(content, quality=COMPRESSION_BROTLI_QUALITY), options['repeat']
+                    )
+                else:
+                    brotli_size, brotli_time = '-', 'n/a'
+                self.stdout.write(
+                    f"{page_size:>6}{timings[0]:>14}{timings[1]:>14}{len(content):>10}"
+                    f"{len(gzipped):>9}{gzip_time:>12}{brotli_size:>9}{brotli_time:>12}"
+                )
+            transaction.set_rollback(True)
+
+        if brotli is None:
+            self.stdout.write('Brotli is not installed, brotli columns skipped')
+        self.stdout.write(self.style.SUCCESS('Benchmark finished, synthetic data rolled back'))
+
+    def _populate(self, count):
+        rng = random.Random(40)
+        parishes = []
+        for district_name, county_name, parish_name in PLACES:
+            district, _ = District.objects.get_or_create(name=district_name)
+            county, _ = County.objects.get_or_create(name=county_name, district=district)
+            parish, _ = Parish.objects.get_or_create(name=parish_name, county=county)
+            parishes.append(parish)
+
+        now = timezone.now()
+        houses = []
+        for i in range(count):
+            parish = rng.choice(parishes)
+            houses.append(House(
+                name=f"Apartamento T{rng.randint(0, 5)} {rng.choice(WORDS)}", zone=parish.name,
+                price=rng.randint(400, 5000), url=f'https://example.com/benchmark/{i}',
+                bedrooms=f'T{rng.randint(0, 5)}', area=rng.randint(25, 300),
+                description=' '.join(rng.choices(WORDS, k=200)),
+                parish=parish, county=parish.county, district_id=parish.county.district_id,
+                source='benchmark', scraped_at=now - timezone.timedelta(seconds=i), house_id=f'benchmark-{i}',
+            ))
+        houses = House.objects.bulk_create(houses)
+        Photo.objects.bulk_create([
+            Photo(house=house, image_url=f'https://img.example.com/benchmark/{house.house_id}/{order}.jpg', order=order)
+            for house in houses for order in range(5)
+        ])
+
+    def _page(self, page_size):
+        """Serialised page in the default list representation, as the feed returns it"""
+        names, full_description = HouseSerializer.representation(default=HouseSerializer.Meta.list_fields)
+        queryset = House.objects.filter(source='benchmark').order_by('-scraped_at', '-id')
+        queryset = HouseSerializer.setup_eager_loading(queryset, None, names, full_description)[:page_size]
+        serializer = HouseSerializer(queryset, many=True, context={'fields': names, 'full_description': full_description})
+        return {'next': None, 'results': serializer.data}
+
+    def _time(self, run, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+        return f"{statistics.median(timings):.2f}/{p95:.2f}"
@@ -0,0 +1,122 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from houses.models import House, District, County, Parish
+from houses.search import filter_search, rank_search, search_index_available
+
+PLACES = [
+    ('Lisboa', 'Lisboa', 'Arroios'), ('Lisboa', 'Lisboa', 'Santa Maria Maior'), ('Lisboa', 'Cascais', 'Estoril'),
+    ('Lisboa', 'Sintra', 'São João das Lampas'), ('Porto', 'Porto', 'Bonfim'), ('Porto', 'Gaia', 'Canidelo'),
+    ('Setúbal', 'Almada', 'Caparica e Trafaria'), ('Faro', 'Loulé', 'Quarteira'), ('Braga', 'Braga', 'São Vítor'),
+]
+WORDS = [
+    'apartamento', 'moradia', 'estúdio', 'luminoso', 'remodelado', 'varanda', 'terraço', 'garagem', 'vista',
+    'rio', 'mar', 'metro', 'cozinha', 'equipada', 'sala', 'suite', 'jardim', 'piscina', 'condomínio', 'centro',
+    'histórico', 'praia', 'comércio', 'escolas', 'sossegado', 'mobilado', 'arrendamento', 'elevador', 'sótão',
+]
+QUERIES = ['lisboa', 'sao joao', 'terraco', 'apartamento varanda', 'caparica', 'piscina praia', 'estud', 'porto metro']
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the search parameter (full-text index vs icontains) on a synthetic houses table. '
+        'Everything runs in a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--houses',
+            type=int,
+            default=50000,
+            help='Number of synthetic houses to insert (default: 50000)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Runs per query (default: 20)'
+        )
+
+    def handle(self, *args, **options):
+        if not search_index_available():
+            self.stdout.write(self.style.ERROR('The full-text index is only available on SQLite'))
+            return
+
+        with transaction.atomic():
+            self._populate(options['houses'])
+            self.stdout.write(
+                f"{'query':<22}{'icontains':>11}{'matches':>9}{'fts by date':>13}{'fts ranked':>12}{'matches':>9}"
+                "  (p50 / p95 ms)"
+            )
+            for query in QUERIES:
+                legacy = self._time(lambda: list(self._legacy(query).order_by('-scraped_at')[:10]), options['repeat'])
+                by_date = self._time(
+                    lambda: list(filter_search(self._feed(), query).order_by('-scraped_at', '-id')[:10]),
+                    options['repeat']
+                )
+                ranked = self._time(lambda: self._ranked(query), options['repeat'])
+                self.stdout.write(
+                    f"{query:<22}{legacy:>11}{self._legacy(query).count():>9}{by_date:>13}{ranked:>12}"
+                    f"{filter_search(self._feed(), query).count():>9}"
+                )
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('Benchmark finished, synthetic data rolled back'))
+
+    def _populate(self, count):
+        rng = random.Random(35)
+        parishes = []
+        for district_name, county_name, parish_name in PLACES:
+            district, _ = District.objects.get_or_create(name=district_name)
+            county, _ = County.objects.get_or_create(name=county_name, district=district)
+            parish, _ = Parish.objects.get_or_create(name=parish_name, county=county)
+            parishes.append(parish)
+
+        now = timezone.now()
+        started = time.perf_counter()
+        batch = []
+        for i in range(count):
+            parish = rng.choice(parishes)
+            batch.append(House(
+                name=f"{rng.choice(['Apartamento', 'Moradia', 'Estúdio'])} T{rng.randint(0, 5)} {rng.choice(WORDS)}",
+                zone=parish.name, price=rng.randint(400, 5000), url=f'https://example.com/benchmark/{i}',
+                bedrooms=f'T{rng.randint(0, 5)}', area=rng.randint(25, 300),
+                description=' '.join(rng.choices(WORDS, k=60)),
+                parish=parish, county=parish.county, district_id=parish.county.district_id,
+                source='benchmark', scraped_at=now, house_id=f'benchmark-{i}',
+            ))
+            if len(batch) == 2000:
+                House.objects.bulk_create(batch)
+                batch = []
+        House.objects.bulk_create(batch)
+        self.stdout.write(f"Inserted {count} houses in {time.perf_counter() - started:.1f}s (index kept by triggers)")
+
+    def _feed(self):
+        return House.objects.filter(is_active=True, is_room_rental=False)
+
+    def _legacy(self, query):
+        """The icontains search the full-text index replaced"""
+        return self._feed().filter(
+            Q(name__icontains=query) | Q(zone__icontains=query) | Q(description__icontains=query) |
+            Q(parish__name__icontains=query) | Q(county__name__icontains=query) | Q(district__name__icontains=query)
+        )
+
+    def _ranked(self, query):
+        queryset = rank_search(filter_search(self._feed(), query), query)
+        return list(queryset.order_by('search_rank', '-scraped_at', '-id')[:10])
+
+    def _time(self, run, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+        return f"{statistics.median(timings):.1f}/{p95:.1f}"
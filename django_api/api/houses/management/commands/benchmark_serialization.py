@@ -0,0 +1,119 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from houses.models import House, Photo, District, County, Parish
+from houses.serializers import HouseSerializer
+
+PLACES = [
+    ('Lisboa', 'Lisboa', 'Arroios'), ('Lisboa', 'Cascais', 'Estoril'), ('Porto', 'Porto', 'Bonfim'),
+    ('Setúbal', 'Almada', 'Caparica e Trafaria'), ('Faro', 'Loulé', 'Quarteira'),
+]
+WORDS = [
+    'apartamento', 'moradia', 'luminoso', 'remodelado', 'varanda', 'terraço', 'garagem', 'vista', 'rio',
+    'metro', 'cozinha', 'equipada', 'sala', 'suite', 'jardim', 'condomínio', 'centro', 'praia', 'escolas',
+]
+# (label, fields=, expand=, default) - 'full' is the list representation before sparse fieldsets
+REPRESENTATIONS = [
+    ('full', None, None, None),
+    ('list (default)', None, None, HouseSerializer.Meta.list_fields),
+    ('list expand=photos', None, 'photos', HouseSerializer.Meta.list_fields),
+    ('fields=house_id,name,price,url,photo', 'house_id,name,price,url,photo', None, HouseSerializer.Meta.list_fields),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the query, serialisation and JSON rendering time and the payload size of a page of houses '
+        'for each representation, on synthetic data. Everything runs in a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--page-sizes',
+            type=int,
+            nargs='+',
+            default=[10, 100],
+            help='Page sizes to measure (default: 10 100)'
+        )
+        parser.add_argument(
+            '--photos',
+            type=int,
+            default=15,
+            help='Photos per synthetic house (default: 15)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Runs per measurement (default: 20)'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._populate(max(options['page_sizes']), options['photos'])
+            self.stdout.write(f"{'representation':<40}{'page':>6}{'queries':>9}{'ms p50/p95':>14}{'bytes':>10}")
+            for label, fields, expand, default in REPRESENTATIONS:
+                names, full_description = HouseSerializer.representation(fields, expand, default=default)
+                for page_size in options['page_sizes']:
+                    run = lambda: self._render(names, full_description, page_size)
+                    with CaptureQueriesContext(connection) as queries:
+                        payload = run()
+                    timing = self._time(run, options['repeat'])
+                    self.stdout.write(
+                        f"{label:<40}{page_size:>6}{len(queries):>9}{timing:>14}{len(payload):>10}"
+                    )
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('Benchmark finished, synthetic data rolled back'))
+
+    def _populate(self, count, photos):
+        rng = random.Random(39)
+        parishes = []
+        for district_name, county_name, parish_name in PLACES:
+            district, _ = District.objects.get_or_create(name=district_name)
+            county, _ = County.objects.get_or_create(name=county_name, district=district)
+            parish, _ = Parish.objects.get_or_create(name=parish_name, county=county)
+            parishes.append(parish)
+
+        now = timezone.now()
+        houses = []
+        for i in range(count):
+            parish = rng.choice(parishes)
+            houses.append(House(
+                name=f"Apartamento T{rng.randint(0, 5)} {rng.choice(WORDS)}", zone=parish.name,
+                price=rng.randint(400, 5000), url=f'https://example.com/benchmark/{i}',
+                bedrooms=f'T{rng.randint(0, 5)}', area=rng.randint(25, 300),
+                description=' '.join(rng.choices(WORDS, k=200)),
+                parish=parish, county=parish.county, district_id=parish.county.district_id,
+                source='benchmark', scraped_at=now, house_id=f'benchmark-{i}',
+            ))
+        houses = House.objects.bulk_create(houses)
+        Photo.objects.bulk_create([
+            Photo(house=house, image_url=f'https://img.example.com/benchmark/{house.house_id}/{order}.jpg', order=order)
+            for house in houses for order in range(photos)
+        ])
+
+    def _render(self, names, full_description, page_size):
+        queryset = House.objects.filter(source='benchmark').order_by('-scraped_at', '-id')
+        queryset = HouseSerializer.setup_eager_loading(queryset, None, names, full_description)[:page_size]
+        serializer = HouseSerializer(
+            queryset, many=True, context={'fields': names, 'full_description': full_description}
+        )
+        return JSONRenderer().render({'next': None, 'results': serializer.data})
+
+    def _time(self, run, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+        return f"{statistics.median(timings):.1f}/{p95:.1f}"
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from houses.models import House
+from houses.classifier import is_room_rental, terms_version
+from houses.cache import bump_data_version
+
+class Command(BaseCommand):
+    help = (
+        'Re-classify houses as room rentals after ROOM_RENTAL_TITLE_TERMS or ROOM_RENTAL_DESCRIPTION_TERMS change. '
+        'Only houses classified with an older version of the term lists are processed, unless --all is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Re-classify every house, not only the stale ones'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of houses updated per transaction (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        version = terms_version()
+        queryset = House.objects.all() if options['all'] else House.objects.exclude(room_rental_version=version)
+        batch_size = options['batch_size']
+        updated = rentals = 0
+        last_id = 0
+
+        while True:
+            batch = list(
+                queryset.filter(id__gt=last_id)
+                .order_by('id')
+                .only('id', 'name', 'description', 'is_room_rental', 'room_rental_version')[:batch_size]
+            )
+            if not batch:
+                break
+            for house in batch:
+                house.is_room_rental = is_room_rental(house.name, house.description)
+                house.room_rental_version = version
+                rentals += house.is_room_rental
+            with transaction.atomic():
+                House.objects.bulk_update(batch, ['is_room_rental', 'room_rental_version'])
+            updated += len(batch)
+            last_id = batch[-1].id
+
+        if updated:
+            bump_data_version()
+            self.stdout.write(self.style.SUCCESS(
+                f"Classified {updated} house(s) with term list version {version}: {rentals} room rental(s)"
+            ))
+        else:
+            self.stdout.write(f"Room rental classification is up to date (version {version})")
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from houses.models import House, ListingSignature, DedupBucket
+from houses.dedup import assign_listing_group
+from houses.cache import bump_data_version
+
+class Command(BaseCommand):
+    help = 'Assign cross-portal listing groups to houses that have not been indexed for duplicate detection yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Drop all signatures, buckets and groups and re-index every house'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of houses indexed per transaction (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            DedupBucket.objects.all().delete()
+            ListingSignature.objects.all().delete()
+            House.objects.update(listing_group=None)
+            self.stdout.write("Cleared existing duplicate detection data")
+
+        batch_size = options['batch_size']
+        indexed = grouped = 0
+        last_id = 0
+
+        # Oldest first, so the earliest listing of a flat becomes its group id
+        while True:
+            batch = list(
+                House.objects.filter(listing_group__isnull=True, id__gt=last_id)
+                .order_by('id')
+                .prefetch_related('photos')[:batch_size]
+            )
+            if not batch:
+                break
+            with transaction.atomic():
+                for house in batch:
+                    photo_urls = [photo.image_url for photo in house.photos.all()]
+                    if assign_listing_group(house, photo_urls):
+                        grouped += 1
+                    indexed += 1
+            last_id = batch[-1].id
+            self.stdout.write(f"Indexed {indexed} houses ({grouped} duplicates so far)")
+
+        bump_data_version()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} houses, {grouped} joined an existing listing group"))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from houses.ingest import expire_stale_listings, fully_seen_sources
+from houses.models import MainRun
+from houses.settings import LISTING_EXPIRY_DAYS
+
+class Command(BaseCommand):
+    help = (
+        'Mark listings that have not been seen for a while as inactive, among the sources the last completed '
+        'run paged through to the end (the others may not have seen listings that are still online)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=LISTING_EXPIRY_DAYS,
+            help=f'Number of days without being seen before a listing expires (default: {LISTING_EXPIRY_DAYS})'
+        )
+
+    def handle(self, *args, **options):
+        days = options['days']
+        main_run = MainRun.objects.filter(status='completed').order_by('-start_time', '-pk').first()
+        sources = fully_seen_sources(main_run) if main_run else set()
+        if not sources:
+            self.stdout.write("No source was paged through to the end by the last completed run, nothing expired")
+            return
+        expired = expire_stale_listings(sources, days=days)
+        names = ', '.join(f"{source} ({listing_type})" for source, listing_type in sorted(sources))
+        self.stdout.write(self.style.SUCCESS(
+            f"Marked {expired} listing(s) of {names} not seen in {days} days as inactive"
+        ))
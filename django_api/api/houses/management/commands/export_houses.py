@@ -0,0 +1,98 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from houses.export import EXPORT_FORMATS, ExportUnavailable, csv_stream, export_rows, ndjson_stream, write_parquet
+from houses.models import House, FEED_CONDITION
+from houses.settings import EXPORT_CHUNK_SIZE, EXPORT_PARQUET_ROW_GROUP_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        'Export houses to a CSV, NDJSON or Parquet file (by default the listings of the feed: active and not '
+        'room rentals). Rows are read and written chunk by chunk, so memory use stays flat whatever the number '
+        'of houses. Parquet needs pyarrow.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output',
+            help='File to write; its extension (.csv, .ndjson, .parquet) gives the format unless --format is set'
+        )
+        parser.add_argument(
+            '--format',
+            choices=list(EXPORT_FORMATS),
+            help='Output format'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Export every house, including inactive listings and room rentals'
+        )
+        parser.add_argument(
+            '--source',
+            help='Only export the houses of this source'
+        )
+        parser.add_argument(
+            '--district',
+            type=int,
+            help='Only export the houses of this district id'
+        )
+        parser.add_argument(
+            '--listing-type',
+            choices=['rent', 'buy'],
+            help='Only export the houses of this listing type'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=EXPORT_CHUNK_SIZE,
+            help=f'Rows fetched from the database at a time (default: {EXPORT_CHUNK_SIZE})'
+        )
+        parser.add_argument(
+            '--row-group-size',
+            type=int,
+            default=EXPORT_PARQUET_ROW_GROUP_SIZE,
+            help=f'Rows per Parquet row group (default: {EXPORT_PARQUET_ROW_GROUP_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        output = options['output']
+        export_format = options['format'] or os.path.splitext(output)[1].lstrip('.').lower()
+        if export_format not in EXPORT_FORMATS:
+            raise CommandError(f"Unknown format for {output}, use --format ({', '.join(EXPORT_FORMATS)})")
+
+        queryset = House.objects.all() if options['all'] else House.objects.filter(FEED_CONDITION)
+        if options['source']:
+            queryset = queryset.filter(source=options['source'])
+        if options['district']:
+            queryset = queryset.filter(district_id=options['district'])
+        if options['listing_type']:
+            queryset = queryset.filter(listing_type=options['listing_type'])
+        self.exported = 0
+        rows = self._counted(export_rows(queryset, chunk_size=options['chunk_size']))
+
+        if export_format == 'parquet':
+            try:
+                write_parquet(rows, output, row_group_size=options['row_group_size'])
+            except ExportUnavailable as e:
+                raise CommandError(str(e))
+        else:
+            stream = csv_stream if export_format == 'csv' else ndjson_stream
+            # Written next to the output and moved into place once complete, like the Parquet snapshots
+            temporary = f'{output}.tmp'
+            try:
+                with open(temporary, 'wb') as f:
+                    for chunk in stream(rows):
+                        f.write(chunk)
+                os.replace(temporary, output)
+            finally:
+                if os.path.exists(temporary):
+                    os.remove(temporary)
+
+        self.stdout.write(self.style.SUCCESS(f"Exported {self.exported} houses to {output} ({export_format})"))
+
+    def _counted(self, rows):
+        for row in rows:
+            self.exported += 1
+            yield row
@@ -4,6 +4,7 @@ from datetime import datetime
 from pathlib import Path
 from django.core.management.base import BaseCommand
 from houses.models import House, Photo
+from houses.cache import bump_data_version
 from decimal import Decimal, InvalidOperation
 
 class Command(BaseCommand):
@@ -157,6 +158,8 @@ class Command(BaseCommand):
                     errors += 1
                     continue
 
+            bump_data_version()
+
             # Final summary
             self.stdout.write(self.style.SUCCESS(
                 f'\nImport Summary:\n'
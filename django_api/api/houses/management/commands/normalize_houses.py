@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from houses.models import House
+from houses.normalization import normalize_listing, NORMALIZED_FIELDS
+from houses.cache import bump_data_version
+
+class Command(BaseCommand):
+    help = 'Fill the typed columns (bedrooms_num, area_m2, floor_num, price_per_m2, property_type) of existing houses'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of houses updated per transaction (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        updated = 0
+        last_id = 0
+
+        while True:
+            batch = list(
+                House.objects.filter(id__gt=last_id)
+                .order_by('id')
+                .only('id', 'name', 'price', 'bedrooms', 'area', 'floor', *NORMALIZED_FIELDS)[:batch_size]
+            )
+            if not batch:
+                break
+            for house in batch:
+                for field, value in normalize_listing(house.name, house.price, house.bedrooms, house.area, house.floor).items():
+                    setattr(house, field, value)
+            with transaction.atomic():
+                House.objects.bulk_update(batch, NORMALIZED_FIELDS)
+            updated += len(batch)
+            last_id = batch[-1].id
+            self.stdout.write(f"Normalized {updated} houses...")
+
+        bump_data_version()
+        self.stdout.write(self.style.SUCCESS(f"Normalized {updated} houses"))
@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from houses.models import District, County, Parish
+from houses.cache import bump_locations_version
 
 class Command(BaseCommand):
     help = 'Populate districts, counties and parishes with hardcoded data'
@@ -293,6 +294,8 @@ class Command(BaseCommand):
                 if created:
                     self.stdout.write(f'Created parish: {parish_name} in {county.name}')
 
+        bump_locations_version()
+
         self.stdout.write(
             self.style.SUCCESS(
                 f'Successfully populated {len(districts)} districts, {len(counties_data)} counties, and {len(parishes_data)} parishes'
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from houses.settings import CHANGE_LOG_RETENTION_DAYS
+from houses.sync import prune_change_log
+
+class Command(BaseCommand):
+    help = (
+        'Delete the sync change log entries older than the retention period (also runs after every '
+        'run_scrapers). Clients whose token is older get a reset and refetch everything.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=CHANGE_LOG_RETENTION_DAYS,
+            help=f'Keep the changes of the last DAYS days (default: {CHANGE_LOG_RETENTION_DAYS})'
+        )
+
+    def handle(self, *args, **options):
+        pruned = prune_change_log(days=options['days'])
+        self.stdout.write(self.style.SUCCESS(f"Pruned {pruned} changes"))
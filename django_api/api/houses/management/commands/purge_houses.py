@@ -0,0 +1,78 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from houses.models import House, PurgeJob
+from houses.purge import purge_queryset, run_purge_job
+from houses.settings import PURGE_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete houses, with their photos, history and users\' flags, in batches of --batch-size per '
+        'transaction, reporting the progress. Same as the API\'s delete_all and purge, but in the foreground, '
+        'e.g. from cron: 0 5 * * 0 cd /app && python api/manage.py purge_houses --inactive --older-than-days 365'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Delete every house (required when no filter is given)'
+        )
+        parser.add_argument(
+            '--source',
+            help='Only delete the houses of this source'
+        )
+        parser.add_argument(
+            '--district',
+            type=int,
+            help='Only delete the houses of this district id'
+        )
+        parser.add_argument(
+            '--listing-type',
+            choices=[choice for choice, _ in House.LISTING_TYPE_CHOICES],
+            help='Only delete the houses of this listing type'
+        )
+        parser.add_argument(
+            '--older-than-days',
+            type=int,
+            help='Only delete the houses scraped longer ago than this many days'
+        )
+        parser.add_argument(
+            '--inactive',
+            action='store_true',
+            help='Only delete the listings that went offline'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=PURGE_BATCH_SIZE,
+            help=f'Number of houses deleted per transaction (default: {PURGE_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many houses would be deleted'
+        )
+
+    def handle(self, *args, **options):
+        filters = {
+            name: options[name]
+            for name in ('source', 'district', 'listing_type', 'older_than_days', 'inactive')
+            if options[name] is not None and options[name] is not False
+        }
+        if not filters and not options['all']:
+            raise CommandError('Give at least one filter, or --all to delete every house')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        if options['dry_run']:
+            self.stdout.write(f"{purge_queryset(filters).count()} house(s) would be deleted")
+            return
+
+        job = PurgeJob.objects.create(filters=filters, batch_size=options['batch_size'])
+        job = run_purge_job(job.pk, progress=lambda job: self.stdout.write(
+            f"Deleted {job.deleted_houses}/{job.total_houses} house(s)..."
+        ))
+        if job.status == 'failed':
+            raise CommandError(f"Purge job {job.pk} failed: {job.error_message}")
+        self.stdout.write(self.style.SUCCESS(f"Deleted {job.deleted_houses} house(s)"))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from houses.search import rebuild_search_index, search_index_available
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of houses from scratch'
+
+    def handle(self, *args, **options):
+        if not search_index_available():
+            self.stdout.write(self.style.ERROR('The full-text index is only available on SQLite'))
+            return
+        indexed = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} houses"))
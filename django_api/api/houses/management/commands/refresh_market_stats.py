@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from houses.cache import bump_data_version
+from houses.market_stats import refresh_market_stats
+from houses.settings import MARKET_STATS_SNAPSHOTS
+
+class Command(BaseCommand):
+    help = 'Recompute the market statistics from the active listings (also runs after every run_scrapers)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--no-snapshot',
+            action='store_true',
+            help='Replace the current statistics instead of keeping them as history'
+        )
+
+    def handle(self, *args, **options):
+        snapshots = MARKET_STATS_SNAPSHOTS and not options['no_snapshot']
+        groups = refresh_market_stats(snapshots=snapshots)
+        bump_data_version()
+        self.stdout.write(self.style.SUCCESS(f"Stored statistics for {groups} groups"))
@@ -1,9 +1,14 @@
 import sys
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from houses.models import House, MainRun, ScraperRun
+from houses.ingest import expire_stale_listings, fully_seen_sources
+from houses.cache import bump_data_version
+from houses.market_stats import refresh_market_stats
+from houses.sync import prune_change_log
 from decimal import Decimal, InvalidOperation
 import hashlib
 import logging
@@ -250,6 +255,9 @@ class Command(BaseCommand):
         try:
             main_start_time = timezone.now()
             
+            # Re-classify room rentals if the term lists changed since the last run
+            call_command('classify_room_rentals', stdout=self.stdout)
+            
             # Get listing type from options
             listing_type = options.get('type', 'rent')
             self.stdout.write(f"Scraping for listing type: {listing_type}")
@@ -358,6 +366,21 @@ class Command(BaseCommand):
                 main_run.save()
             
             self.stdout.write(self.style.SUCCESS(f"\nTotal execution time: {main_execution_time:.2f} seconds"))
+
+            # Expire the listings not seen for a while, of the sources this run paged through to the end
+            with db_lock:
+                expired = expire_stale_listings(fully_seen_sources(main_run))
+            self.stdout.write(f"Listings marked inactive: {expired}")
+
+            # Refresh the market statistics from the listings as they are after this run
+            with db_lock:
+                groups = refresh_market_stats(main_run)
+            self.stdout.write(f"Market statistics refreshed: {groups} groups")
+
+            # Drop the sync changes older than the retention period
+            with db_lock:
+                pruned = prune_change_log()
+            self.stdout.write(f"Sync changes pruned: {pruned}")
             
         except Exception as e:
             self.stdout.write(self.style.ERROR(f"Error running scrapers: {str(e)}"))
@@ -371,4 +394,8 @@ class Command(BaseCommand):
                 main_run.error_message = str(e)
                 main_run.end_time = main_end_time
                 main_run.execution_time = main_execution_time
-                main_run.save()
\ No newline at end of file
+                main_run.save()
+
+        finally:
+            # Cached API responses were computed from the data as it was before this run
+            bump_data_version()
@@ -0,0 +1,139 @@
+"""
+Materialised market statistics.
+
+After each run, the active listings are aggregated in one pass into the
+``market_stats`` table: for every location (the country, each district,
+county and parish) x listing type x bedrooms x source, the number of
+listings, mean / median / p10 / p90 price and mean / median price per m².
+Groups are also rolled up over all bedrooms and all sources, since medians
+and percentiles can't be combined from sub-groups.
+
+The stats endpoint then reads O(groups) summary rows instead of aggregating
+O(houses) rows per request. With MARKET_STATS_SNAPSHOTS, the rows of
+previous runs are kept (is_current=False) as a time series, pruned after
+MARKET_STATS_RETENTION_DAYS.
+
+Listings are read in price order (and in price per m² order for the per m²
+statistics), so every group's values are appended already sorted and the
+percentiles are read off them without sorting each group.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import House, District, County, Parish, MarketStat
+from .settings import MARKET_STATS_RETENTION_DAYS, MARKET_STATS_SNAPSHOTS
+
+CENTS = Decimal('0.01')
+
+
+def percentile(values, fraction):
+    """Linearly interpolated percentile of a sorted, non-empty list"""
+    position = (len(values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * Decimal(position - lower)
+
+
+def _money(value):
+    return value.quantize(CENTS) if value is not None else None
+
+
+def _group_keys(district_id, county_id, parish_id, listing_type, bedrooms, source):
+    """Every group a listing counts towards"""
+    locations = [('country', None)]
+    locations += [(level, location_id) for level, location_id in
+                  (('district', district_id), ('county', county_id), ('parish', parish_id)) if location_id]
+    for level, location_id in locations:
+        for bedrooms_key in {None, bedrooms}:
+            for source_key in ('', source):
+                yield level, location_id, listing_type, bedrooms_key, source_key
+
+
+def _sorted_groups(rows):
+    """Values of (group columns..., value) rows read in value order, by group: every list is sorted"""
+    groups = defaultdict(list)
+    for *columns, value in rows.iterator(chunk_size=5000):
+        for key in _group_keys(*columns):
+            groups[key].append(value)
+    return groups
+
+
+def compute_market_stats():
+    """
+    Aggregate the active listings.
+
+    Returns:
+        dict: (level, location_id, listing_type, bedrooms, source) -> statistics
+    """
+    listings = House.objects.filter(is_active=True, is_room_rental=False, price__gt=0)
+    group_columns = ['district_id', 'county_id', 'parish_id', 'listing_type', 'bedrooms_num', 'source']
+    prices = _sorted_groups(listings.values_list(*group_columns, 'price').order_by('price'))
+    prices_per_m2 = _sorted_groups(
+        listings.filter(price_per_m2__gt=0).values_list(*group_columns, 'price_per_m2').order_by('price_per_m2')
+    )
+
+    stats = {}
+    for key, values in prices.items():
+        per_m2 = prices_per_m2.get(key, [])
+        stats[key] = {
+            'count': len(values),
+            'price_mean': _money(sum(values) / len(values)),
+            'price_median': _money(percentile(values, 0.5)),
+            'price_p10': _money(percentile(values, 0.1)),
+            'price_p90': _money(percentile(values, 0.9)),
+            'price_per_m2_mean': _money(sum(per_m2) / len(per_m2)) if per_m2 else None,
+            'price_per_m2_median': _money(percentile(per_m2, 0.5)) if per_m2 else None,
+        }
+    return stats
+
+
+def refresh_market_stats(main_run=None, snapshots=MARKET_STATS_SNAPSHOTS, now=None,
+                         retention_days=MARKET_STATS_RETENTION_DAYS):
+    """
+    Recompute the statistics and make them the current ones.
+
+    Args:
+        main_run: the run the statistics belong to, if any
+        snapshots: keep the previous statistics as history instead of deleting them
+        retention_days: age after which snapshots are deleted, None to keep them all
+
+    Returns:
+        int: number of groups stored
+    """
+    now = now or timezone.now()
+    stats = compute_market_stats()
+    names = {
+        'district': dict(District.objects.values_list('id', 'name')),
+        'county': dict(County.objects.values_list('id', 'name')),
+        'parish': dict(Parish.objects.values_list('id', 'name')),
+    }
+    rows = [
+        MarketStat(
+            level=level,
+            location_id=location_id,
+            location_name=names.get(level, {}).get(location_id, ''),
+            listing_type=listing_type,
+            bedrooms=bedrooms,
+            source=source,
+            main_run=main_run,
+            computed_at=now,
+            is_current=True,
+            **values
+        )
+        for (level, location_id, listing_type, bedrooms, source), values in stats.items()
+    ]
+
+    with transaction.atomic():
+        current = MarketStat.objects.filter(is_current=True)
+        if snapshots:
+            current.update(is_current=False)
+        else:
+            current.delete()
+        if retention_days is not None:
+            MarketStat.objects.filter(is_current=False, computed_at__lt=now - timedelta(days=retention_days)).delete()
+        MarketStat.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
@@ -0,0 +1,104 @@
+"""
+Negotiated response compression.
+
+CompressionMiddleware extends Django's GZipMiddleware with brotli (when the
+Brotli package is installed), a minimum size below which responses are sent
+as is, and a list of compressible content types, so that JSON house lists
+reach the phones compressed while small or already compressed responses
+aren't touched. Server-sent events are never compressed, so that every event
+is flushed to the client as soon as it is written.
+"""
+import re
+
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+from .settings import COMPRESSION_MIN_SIZE, COMPRESSION_BROTLI_QUALITY, COMPRESSIBLE_CONTENT_TYPES
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional, gzip only without it
+    brotli = None
+
+ENCODING_RE = re.compile(r'\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*')
+
+
+def accepted_encodings(header):
+    """
+    Parse an Accept-Encoding header.
+
+    Returns:
+        dict: encoding -> quality (encodings with q=0 are refused)
+    """
+    encodings = {}
+    for item in header.split(','):
+        match = ENCODING_RE.fullmatch(item)
+        if not match:
+            continue
+        try:
+            quality = float(match.group(2)) if match.group(2) else 1.0
+        except ValueError:
+            continue
+        encodings[match.group(1).lower()] = quality
+    return encodings
+
+
+def negotiate_encoding(header):
+    """Preferred available encoding ('br', 'gzip') for an Accept-Encoding header, or None"""
+    encodings = accepted_encodings(header)
+    available = ['br', 'gzip'] if brotli is not None else ['gzip']
+    candidates = [
+        (encodings.get(encoding, encodings.get('*', 0)), -rank, encoding)
+        for rank, encoding in enumerate(available)
+    ]
+    quality, _, encoding = max(candidates)
+    return encoding if quality > 0 else None
+
+
+def brotli_sequence(sequence):
+    """Compress a streamed body chunk by chunk, flushing after each one"""
+    compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+    for chunk in sequence:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(GZipMiddleware):
+    min_size = COMPRESSION_MIN_SIZE
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or not self._compressible(response):
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding == 'gzip':
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if encoding != 'br' or (response.streaming and response.is_async):
+            return response
+
+        if response.streaming:
+            response.streaming_content = brotli_sequence(response.streaming_content)
+            del response.headers['Content-Length']
+        else:
+            compressed = brotli.compress(response.content, quality=COMPRESSION_BROTLI_QUALITY)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # A compressed representation has a weak ETag (RFC 9110 8.8.1), like GZipMiddleware's
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
+
+    def _compressible(self, response):
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        return content_type in COMPRESSIBLE_CONTENT_TYPES
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.2 on 2026-10-19 00:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('houses', '0005_house_listing_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='house',
+            name='price_dropped_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='PriceHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('previous_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('area', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('bedrooms', models.CharField(max_length=50)),
+                ('recorded_at', models.DateTimeField()),
+                ('house', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_history', to='houses.house')),
+            ],
+            options={
+                'db_table': 'price_history',
+                'ordering': ['-recorded_at'],
+                'indexes': [models.Index(fields=['house', '-recorded_at'], name='price_history_house_idx')],
+            },
+        ),
+    ]
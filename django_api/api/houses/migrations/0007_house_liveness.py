@@ -0,0 +1,40 @@
+# Generated by Django 5.0.2 on 2026-10-19 00:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_last_seen(apps, schema_editor):
+    # Existing houses were last seen when they were scraped
+    House = apps.get_model('houses', 'House')
+    House.objects.update(last_seen_at=models.F('scraped_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('houses', '0006_price_history'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='house',
+            name='is_active',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='house',
+            name='last_seen_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_last_seen, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['is_active', '-scraped_at'], name='houses_active_scraped_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['is_active', 'last_seen_at'], name='houses_active_seen_idx'),
+        ),
+    ]
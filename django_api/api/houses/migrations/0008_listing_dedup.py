@@ -0,0 +1,41 @@
+# Generated by Django 5.0.2 on 2026-10-19 00:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('houses', '0007_house_liveness'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='house',
+            name='listing_group',
+            field=models.BigIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='DedupBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(db_index=True, max_length=100)),
+                ('house', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dedup_buckets', to='houses.house')),
+            ],
+            options={
+                'db_table': 'dedup_buckets',
+            },
+        ),
+        migrations.CreateModel(
+            name='ListingSignature',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('minhash', models.JSONField(default=list)),
+                ('house', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='signature', to='houses.house')),
+            ],
+            options={
+                'db_table': 'listing_signatures',
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.0.2 on 2026-10-19 00:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('houses', '0008_listing_dedup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedHouse',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.BigIntegerField(unique=True)),
+                ('name', models.CharField(max_length=255)),
+                ('zone', models.CharField(max_length=100)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('url', models.URLField(max_length=500)),
+                ('bedrooms', models.CharField(max_length=50)),
+                ('area', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('floor', models.CharField(blank=True, max_length=50, null=True)),
+                ('description', models.TextField()),
+                ('listing_type', models.CharField(choices=[('rent', 'For Rent'), ('buy', 'For Sale')], default='rent', max_length=10)),
+                ('source', models.CharField(max_length=50)),
+                ('scraped_at', models.DateTimeField()),
+                ('house_id', models.CharField(max_length=100, unique=True)),
+                ('last_seen_at', models.DateTimeField(blank=True, null=True)),
+                ('listing_group', models.BigIntegerField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('county', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='houses.county')),
+                ('district', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='houses.district')),
+                ('parish', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='houses.parish')),
+            ],
+            options={
+                'db_table': 'archived_houses',
+                'ordering': ['-scraped_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedPhoto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image_url', models.URLField(max_length=500)),
+                ('order', models.PositiveIntegerField(default=0)),
+                ('house', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='photos', to='houses.archivedhouse')),
+            ],
+            options={
+                'db_table': 'archived_photos',
+                'ordering': ['order'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedhouse',
+            index=models.Index(fields=['source', 'url'], name='archived_source_url_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedhouse',
+            index=models.Index(fields=['url'], name='archived_url_idx'),
+        ),
+    ]
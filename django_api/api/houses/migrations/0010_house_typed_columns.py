@@ -0,0 +1,38 @@
+# Generated by Django 5.0.2 on 2026-10-19 00:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('houses', '0009_house_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='house',
+            name='area_m2',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, max_digits=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='house',
+            name='bedrooms_num',
+            field=models.PositiveSmallIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='house',
+            name='floor_num',
+            field=models.SmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='house',
+            name='price_per_m2',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='house',
+            name='property_type',
+            field=models.CharField(choices=[('apartment', 'Apartment'), ('house', 'House'), ('studio', 'Studio'), ('room', 'Room'), ('other', 'Other')], db_index=True, default='other', max_length=20),
+        ),
+    ]
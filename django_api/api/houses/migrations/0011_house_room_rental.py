@@ -0,0 +1,23 @@
+# Generated by Django 5.0.2 on 2026-10-19 00:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('houses', '0010_house_typed_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='house',
+            name='is_room_rental',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.AddField(
+            model_name='house',
+            name='room_rental_version',
+            field=models.CharField(blank=True, default='', max_length=12),
+        ),
+    ]
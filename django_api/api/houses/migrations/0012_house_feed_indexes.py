@@ -0,0 +1,75 @@
+# Generated by Django 5.0.2 on 2026-10-19 00:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('houses', '0011_house_room_rental'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='house',
+            name='houses_active_scraped_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='house',
+            name='houses_active_seen_idx',
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_room_rental', False)), fields=['-scraped_at'], name='feed_scraped_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_room_rental', False)), fields=['price'], name='feed_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_room_rental', False)), fields=['listing_type', '-scraped_at'], name='feed_type_scraped_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_room_rental', False)), fields=['listing_type', 'price'], name='feed_type_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_room_rental', False)), fields=['district', '-scraped_at'], name='feed_district_scraped_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_room_rental', False)), fields=['district', 'price'], name='feed_district_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_room_rental', False)), fields=['county', '-scraped_at'], name='feed_county_scraped_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_room_rental', False)), fields=['county', 'price'], name='feed_county_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_room_rental', False)), fields=['parish', '-scraped_at'], name='feed_parish_scraped_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_room_rental', False)), fields=['parish', 'price'], name='feed_parish_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_room_rental', False)), fields=['source', '-scraped_at'], name='feed_source_scraped_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_room_rental', False)), fields=['source', 'price'], name='feed_source_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['last_seen_at'], name='houses_active_seen_idx'),
+        ),
+    ]
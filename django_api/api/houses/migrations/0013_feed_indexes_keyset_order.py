@@ -0,0 +1,63 @@
+# Generated by Django 5.0.2 on 2026-10-19 00:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('houses', '0012_house_feed_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='house',
+            name='feed_scraped_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='house',
+            name='feed_type_scraped_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='house',
+            name='feed_district_scraped_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='house',
+            name='feed_county_scraped_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='house',
+            name='feed_parish_scraped_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='house',
+            name='feed_source_scraped_idx',
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_room_rental', False)), fields=['scraped_at'], name='feed_scraped_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_room_rental', False)), fields=['listing_type', 'scraped_at'], name='feed_type_scraped_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_room_rental', False)), fields=['district', 'scraped_at'], name='feed_district_scraped_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_room_rental', False)), fields=['county', 'scraped_at'], name='feed_county_scraped_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_room_rental', False)), fields=['parish', 'scraped_at'], name='feed_parish_scraped_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_room_rental', False)), fields=['source', 'scraped_at'], name='feed_source_scraped_idx'),
+        ),
+    ]
@@ -0,0 +1,72 @@
+from django.db import migrations
+
+LOCATION = (
+    "COALESCE((SELECT name FROM parishes WHERE id = {row}.parish_id), '') || ' ' || "
+    "COALESCE((SELECT name FROM counties WHERE id = {row}.county_id), '') || ' ' || "
+    "COALESCE((SELECT name FROM districts WHERE id = {row}.district_id), '')"
+)
+
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE houses_search USING fts5(
+        name, zone, description, location,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER houses_search_insert AFTER INSERT ON houses BEGIN
+        INSERT INTO houses_search(rowid, name, zone, description, location)
+        VALUES (new.id, new.name, new.zone, new.description, {LOCATION.format(row='new')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER houses_search_update
+    AFTER UPDATE OF name, zone, description, parish_id, county_id, district_id ON houses BEGIN
+        DELETE FROM houses_search WHERE rowid = old.id;
+        INSERT INTO houses_search(rowid, name, zone, description, location)
+        VALUES (new.id, new.name, new.zone, new.description, {LOCATION.format(row='new')});
+    END
+    """,
+    """
+    CREATE TRIGGER houses_search_delete AFTER DELETE ON houses BEGIN
+        DELETE FROM houses_search WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    INSERT INTO houses_search(rowid, name, zone, description, location)
+    SELECT h.id, h.name, h.zone, h.description, {LOCATION.format(row='h')} FROM houses h
+    """,
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS houses_search_insert',
+    'DROP TRIGGER IF EXISTS houses_search_update',
+    'DROP TRIGGER IF EXISTS houses_search_delete',
+    'DROP TABLE IF EXISTS houses_search',
+]
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 is SQLite only; other backends keep the icontains search (see houses.search)
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in CREATE_SQL:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('houses', '0013_feed_indexes_keyset_order'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
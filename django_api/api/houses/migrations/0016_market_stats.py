@@ -0,0 +1,40 @@
+# Generated by Django 5.0.2 on 2026-10-19 00:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('houses', '0015_data_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarketStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.CharField(choices=[('country', 'Country'), ('district', 'District'), ('county', 'County'), ('parish', 'Parish')], max_length=10)),
+                ('location_id', models.IntegerField(blank=True, null=True)),
+                ('location_name', models.CharField(blank=True, max_length=100)),
+                ('listing_type', models.CharField(choices=[('rent', 'For Rent'), ('buy', 'For Sale')], max_length=10)),
+                ('bedrooms', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('source', models.CharField(blank=True, max_length=50)),
+                ('count', models.PositiveIntegerField()),
+                ('price_mean', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('price_median', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('price_p10', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('price_p90', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('price_per_m2_mean', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('price_per_m2_median', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('computed_at', models.DateTimeField()),
+                ('is_current', models.BooleanField(default=True)),
+                ('main_run', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='market_stats', to='houses.mainrun')),
+            ],
+            options={
+                'db_table': 'market_stats',
+                'indexes': [models.Index(fields=['is_current', 'level', 'listing_type'], name='market_stats_current_idx'), models.Index(fields=['level', 'location_id', 'listing_type', 'computed_at'], name='market_stats_history_idx')],
+            },
+        ),
+    ]
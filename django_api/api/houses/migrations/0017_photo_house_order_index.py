@@ -0,0 +1,17 @@
+# Generated by Django 5.0.2 on 2026-10-19 00:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('houses', '0016_market_stats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(fields=['house', 'order'], name='photos_house_order_idx'),
+        ),
+    ]
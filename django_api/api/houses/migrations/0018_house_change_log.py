@@ -0,0 +1,30 @@
+# Generated by Django 5.0.2 on 2026-10-19 00:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('houses', '0017_photo_house_order_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HouseChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('house_pk', models.BigIntegerField()),
+                ('house_id', models.CharField(max_length=100)),
+                ('changed_at', models.DateTimeField()),
+                ('user', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'house_changes',
+                'indexes': [models.Index(fields=['user', 'id'], name='house_changes_user_seq_idx'), models.Index(fields=['changed_at'], name='house_changes_changed_at_idx')],
+            },
+        ),
+    ]
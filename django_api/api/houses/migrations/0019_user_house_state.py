@@ -0,0 +1,83 @@
+# Generated by Django 5.0.2 on 2026-10-19 00:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+# UserHouseState column of each former M2M relation
+FLAG_RELATIONS = {
+    'favorited_by': 'favorited_at',
+    'contacted_by': 'contacted_at',
+    'discarded_by': 'discarded_at',
+}
+
+
+def copy_flags_to_states(apps, schema_editor):
+    House = apps.get_model('houses', 'House')
+    UserHouseState = apps.get_model('houses', 'UserHouseState')
+    # When the flags were set wasn't recorded, so they all date from the migration
+    now = timezone.now()
+    states = {}
+    for relation, column in FLAG_RELATIONS.items():
+        through = House._meta.get_field(relation).remote_field.through
+        for user_id, house_id in through.objects.values_list('user_id', 'house_id').iterator(chunk_size=5000):
+            states.setdefault((user_id, house_id), {})[column] = now
+    UserHouseState.objects.bulk_create(
+        [UserHouseState(user_id=user_id, house_id=house_id, **flags) for (user_id, house_id), flags in states.items()],
+        batch_size=1000
+    )
+
+
+def copy_states_to_flags(apps, schema_editor):
+    House = apps.get_model('houses', 'House')
+    UserHouseState = apps.get_model('houses', 'UserHouseState')
+    for relation, column in FLAG_RELATIONS.items():
+        through = House._meta.get_field(relation).remote_field.through
+        rows = UserHouseState.objects.filter(**{f'{column}__isnull': False}).values_list('user_id', 'house_id')
+        through.objects.bulk_create(
+            [through(user_id=user_id, house_id=house_id) for user_id, house_id in rows.iterator(chunk_size=5000)],
+            batch_size=1000
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('houses', '0018_house_change_log'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserHouseState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('favorited_at', models.DateTimeField(blank=True, null=True)),
+                ('contacted_at', models.DateTimeField(blank=True, null=True)),
+                ('discarded_at', models.DateTimeField(blank=True, null=True)),
+                ('house', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_states', to='houses.house')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='house_states', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'user_house_states',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='userhousestate',
+            constraint=models.UniqueConstraint(fields=('user', 'house'), name='user_house_states_key'),
+        ),
+        migrations.RunPython(copy_flags_to_states, copy_states_to_flags),
+        migrations.RemoveField(
+            model_name='house',
+            name='contacted_by',
+        ),
+        migrations.RemoveField(
+            model_name='house',
+            name='discarded_by',
+        ),
+        migrations.RemoveField(
+            model_name='house',
+            name='favorited_by',
+        ),
+    ]
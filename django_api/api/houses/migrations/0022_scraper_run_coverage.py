@@ -0,0 +1,23 @@
+# Generated by Django 5.0.2 on 2026-10-19 01:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('houses', '0021_saved_searches'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scraperrun',
+            name='listing_type',
+            field=models.CharField(blank=True, max_length=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='scraperrun',
+            name='saw_all_listings',
+            field=models.BooleanField(default=False),
+        ),
+    ]
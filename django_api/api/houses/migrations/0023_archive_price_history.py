@@ -0,0 +1,45 @@
+# Generated by Django 5.0.2 on 2026-10-19 01:33
+
+import django.db.models.deletion
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('houses', '0022_scraper_run_coverage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedPriceHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('previous_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('area', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('bedrooms', models.CharField(max_length=50)),
+                ('recorded_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'archived_price_history',
+                'ordering': ['-recorded_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='archivedhouse',
+            name='price_dropped_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='archivedhouse',
+            index=models.Index(django.db.models.functions.text.Lower('url'), name='archived_url_lower_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedpricehistory',
+            name='house',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_history', to='houses.archivedhouse'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+import hashlib
+import re
+
+from django.db import migrations
+from unidecode import unidecode
+
+# Frozen copy of houses.settings' term lists and houses.classifier's matching as of this
+# migration, so that replaying it classifies rows the way they were classified when deployed
+TITLE_TERMS = ["QUARTO", "ROOM", "ALUGA-SE QUARTO", "ALUGO QUARTO", "QUARTO PARA ALUGAR", "Dividir apartamento"]
+DESCRIPTION_TERMS = [
+    "QUARTO EM APARTAMENTO", "QUARTO PARTILHADO", "SHARED ROOM", "ROOM IN APARTMENT", "ALUGAM-SE QUARTOS",
+]
+
+
+def normalize(text):
+    return unidecode(str(text or '')).upper()
+
+
+def normalized_terms(terms):
+    return sorted({normalize(term).strip() for term in terms if term and term.strip()})
+
+
+def whole_words_pattern(terms):
+    """Any of the terms, not preceded nor followed by a letter or digit"""
+    alternatives = '|'.join(re.escape(term) for term in normalized_terms(terms))
+    return re.compile(rf'(?<![^\W_])(?:{alternatives})(?![^\W_])')
+
+
+TITLE_PATTERN = whole_words_pattern(TITLE_TERMS)
+DESCRIPTION_PATTERN = whole_words_pattern(DESCRIPTION_TERMS)
+TERMS = '\n'.join(normalized_terms(TITLE_TERMS)) + '\n--\n' + '\n'.join(normalized_terms(DESCRIPTION_TERMS))
+TERMS_VERSION = hashlib.sha1(TERMS.encode('utf-8')).hexdigest()[:12]  # houses.classifier.terms_version()
+
+
+def is_room_rental(title, description):
+    return bool(TITLE_PATTERN.search(normalize(title)) or DESCRIPTION_PATTERN.search(normalize(description)))
+
+
+def classify_existing_houses(apps, schema_editor):
+    # Houses inserted before 0011 were left with is_room_rental=False; classify them once
+    # here instead of waiting for the next run_scrapers (classify_room_rentals)
+    House = apps.get_model('houses', 'House')
+    last_id = 0
+    while True:
+        batch = list(
+            House.objects.exclude(room_rental_version=TERMS_VERSION)
+            .filter(id__gt=last_id)
+            .order_by('id')
+            .only('id', 'name', 'description', 'is_room_rental', 'room_rental_version')[:1000]
+        )
+        if not batch:
+            break
+        for house in batch:
+            house.is_room_rental = is_room_rental(house.name, house.description)
+            house.room_rental_version = TERMS_VERSION
+        House.objects.bulk_update(batch, ['is_room_rental', 'room_rental_version'])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('houses', '0023_archive_price_history'),
+    ]
+
+    operations = [
+        migrations.RunPython(classify_existing_houses, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.2 on 2026-10-19 01:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('houses', '0024_classify_existing_room_rentals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HouseSearchEntry',
+            fields=[
+                ('house', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='houses.house')),
+                ('document', models.TextField(db_column='houses_search')),
+            ],
+            options={
+                'db_table': 'houses_search',
+                'managed': False,
+            },
+        ),
+    ]
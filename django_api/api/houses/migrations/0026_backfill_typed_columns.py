@@ -0,0 +1,99 @@
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.db import migrations
+from unidecode import unidecode
+
+# Frozen copy of houses.normalization as of this migration, so that replaying it
+# fills the columns the same way whatever the module becomes
+CENTS = Decimal('0.01')
+PROPERTY_TYPE_PATTERNS = [
+    ('room', re.compile(r'^(quarto|room)\b|\b(aluga-se|alugo|arrendo) quarto\b|\b(quarto|room) (em|in|para)\b')),
+    ('house', re.compile(r'\b(moradia|vivenda|chalet|quinta|townhouse)\b')),
+    ('studio', re.compile(r'\b(estudio|studio|loft|t0)\b')),
+    ('apartment', re.compile(r'\b(apartamento|apartment|flat|duplex|penthouse|t\d+)\b')),
+]
+GROUND_FLOOR_PATTERN = re.compile(r'\b(r/?c|res[ -]do[ -]chao|res-do-chao|ground)\b')
+BASEMENT_PATTERN = re.compile(r'\b(cave|sub[ -]?cave|basement)\b')
+THOUSANDS_PATTERN = re.compile(r'\d{1,3}(\.\d{3})+')
+DIGITS = '0123456789'
+NORMALIZED_FIELDS = ['bedrooms_num', 'area_m2', 'floor_num', 'price_per_m2', 'property_type']
+
+
+def parse_bedrooms(bedrooms):
+    match = re.search(r'(\d+)', str(bedrooms or ''))
+    return int(match.group(1)) if match else None
+
+
+def parse_area(area):
+    if area is None:
+        return None
+    if not isinstance(area, Decimal):
+        cleaned = ''.join(c for c in str(area).replace('m²', '') if c in DIGITS or c in '.,')
+        if ',' in cleaned and '.' in cleaned:
+            cleaned = cleaned.replace('.', '').replace(',', '.')
+        elif THOUSANDS_PATTERN.fullmatch(cleaned):
+            cleaned = cleaned.replace('.', '')
+        else:
+            cleaned = cleaned.replace(',', '.')
+        try:
+            area = Decimal(cleaned)
+        except (InvalidOperation, ValueError):
+            return None
+    return area.quantize(CENTS) if area > 0 else None
+
+
+def parse_floor(floor):
+    text = unidecode(str(floor or '')).lower().strip()
+    if not text or text in ('n/a', '-'):
+        return None
+    if GROUND_FLOOR_PATTERN.search(text):
+        return 0
+    if BASEMENT_PATTERN.search(text):
+        return -1
+    match = re.search(r'-?\d+', text)
+    return int(match.group(0)) if match else None
+
+
+def classify_property_type(name):
+    text = unidecode(str(name or '')).lower()
+    for property_type, pattern in PROPERTY_TYPE_PATTERNS:
+        if pattern.search(text):
+            return property_type
+    return 'other'
+
+
+def backfill_typed_columns(apps, schema_editor):
+    # 0010 only added the columns; rows inserted before it were left empty
+    House = apps.get_model('houses', 'House')
+    last_id = 0
+    while True:
+        batch = list(
+            House.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .only('id', 'name', 'price', 'bedrooms', 'area', 'floor', *NORMALIZED_FIELDS)[:1000]
+        )
+        if not batch:
+            break
+        for house in batch:
+            house.area_m2 = area_m2 = parse_area(house.area)
+            house.bedrooms_num = parse_bedrooms(house.bedrooms)
+            house.floor_num = parse_floor(house.floor)
+            if house.price and house.price > 0 and area_m2:
+                house.price_per_m2 = (house.price / area_m2).quantize(CENTS)
+            else:
+                house.price_per_m2 = None
+            house.property_type = classify_property_type(house.name)
+        House.objects.bulk_update(batch, NORMALIZED_FIELDS)
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('houses', '0025_house_search_entry'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_typed_columns, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.conf import settings
 
 class District(models.Model):
@@ -35,11 +36,28 @@ class Parish(models.Model):
     def __str__(self):
         return f"{self.name} ({self.county.name})"
 
+# Rows served by the house feed, and the columns it filters on (column, index name prefix)
+FEED_CONDITION = models.Q(is_active=True, is_room_rental=False)
+FEED_FILTER_COLUMNS = [
+    ('listing_type', 'type'),
+    ('district', 'district'),
+    ('county', 'county'),
+    ('parish', 'parish'),
+    ('source', 'source'),
+]
+
 class House(models.Model):
     LISTING_TYPE_CHOICES = [
         ('rent', 'For Rent'),
         ('buy', 'For Sale'),
     ]
+    PROPERTY_TYPE_CHOICES = [
+        ('apartment', 'Apartment'),
+        ('house', 'House'),
+        ('studio', 'Studio'),
+        ('room', 'Room'),
+        ('other', 'Other'),
+    ]
     
     name = models.CharField(max_length=255)
     zone = models.CharField(max_length=100)
@@ -57,31 +75,172 @@ class House(models.Model):
     source = models.CharField(max_length=50)
     scraped_at = models.DateTimeField()
     house_id = models.CharField(max_length=100, unique=True)
-    
-    # User relationships
-    favorited_by = models.ManyToManyField(
-        settings.AUTH_USER_MODEL,
-        related_name='favorite_houses',
-        blank=True
-    )
-    contacted_by = models.ManyToManyField(
-        settings.AUTH_USER_MODEL,
-        related_name='contacted_houses',
-        blank=True
-    )
-    discarded_by = models.ManyToManyField(
-        settings.AUTH_USER_MODEL,
-        related_name='discarded_houses',
-        blank=True
-    )
+    price_dropped_at = models.DateTimeField(null=True, blank=True, db_index=True)  # Last time the price went down
+    last_seen_at = models.DateTimeField(null=True, blank=True)  # Last run in which the listing was still online
+    is_active = models.BooleanField(default=True)  # False once the listing hasn't been seen for a while
+    listing_group = models.BigIntegerField(null=True, blank=True, db_index=True)  # Same flat across portals
+    # Typed columns parsed from the free-text fields at ingest (see houses.normalization)
+    bedrooms_num = models.PositiveSmallIntegerField(null=True, blank=True, db_index=True)
+    area_m2 = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True, db_index=True)
+    floor_num = models.SmallIntegerField(null=True, blank=True)
+    price_per_m2 = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, db_index=True)
+    property_type = models.CharField(max_length=20, choices=PROPERTY_TYPE_CHOICES, default='other', db_index=True)
+    # Room rental classification (see houses.classifier) and the version of the term lists that produced it
+    is_room_rental = models.BooleanField(default=False, db_index=True)
+    room_rental_version = models.CharField(max_length=12, blank=True, default='')
+    # Users' favourite/contacted/discarded flags are in UserHouseState
 
     class Meta:
         db_table = 'houses'
         ordering = ['-scraped_at']
+        # Partial indexes over the rows the feed actually serves (active, not a room rental),
+        # one per filter column x ordering used by HouseViewSet. See houses/tests.py for the
+        # query plans they are expected to produce. Columns are ascending so that, scanned
+        # backwards, they also give the (scraped_at DESC, id DESC) keyset order.
+        indexes = [
+            models.Index(fields=['scraped_at'], name='feed_scraped_idx', condition=FEED_CONDITION),
+            models.Index(fields=['price'], name='feed_price_idx', condition=FEED_CONDITION),
+            *[
+                models.Index(fields=[column, order], name=f'feed_{prefix}_{suffix}_idx', condition=FEED_CONDITION)
+                for column, prefix in FEED_FILTER_COLUMNS
+                for order, suffix in [('scraped_at', 'scraped'), ('price', 'price')]
+            ],
+            models.Index(fields=['last_seen_at'], name='houses_active_seen_idx', condition=models.Q(is_active=True)),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.zone} ({self.price}€)"
 
+class HouseSearchEntry(models.Model):
+    """
+    Row of the houses_search full-text index, maintained by triggers (see houses.search). Not
+    managed by Django: it is only joined to rank the matches of a search.
+    """
+    house = models.OneToOneField(
+        House, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid', db_constraint=False,
+        related_name='search_entry'
+    )
+    # FTS5 hidden column named after the table, the left-hand side of MATCH
+    document = models.TextField(db_column='houses_search')
+
+    class Meta:
+        managed = False
+        db_table = 'houses_search'
+
+class UserHouseState(models.Model):
+    """
+    A user's flags on a house, one row per (user, house). Each flag is the time it was set,
+    NULL when it isn't; rows without any flag are deleted (see houses.actions).
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='house_states', db_index=False
+    )  # Covered by the (user, house) key
+    house = models.ForeignKey(House, on_delete=models.CASCADE, related_name='user_states')
+    favorited_at = models.DateTimeField(null=True, blank=True)
+    contacted_at = models.DateTimeField(null=True, blank=True)
+    discarded_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'user_house_states'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'house'], name='user_house_states_key'),
+        ]
+
+    def __str__(self):
+        flags = [name for name in ('favorited', 'contacted', 'discarded') if getattr(self, f'{name}_at')]
+        return f"{self.user_id} - {self.house_id}: {', '.join(flags) or 'no flags'}"
+
+class SavedSearch(models.Model):
+    """
+    A user's search for new listings; houses inserted by the scrapers are matched against
+    every active one at ingest (see houses.saved_searches). Empty criteria match anything.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='saved_searches')
+    name = models.CharField(max_length=100)
+    listing_type = models.CharField(max_length=10, choices=House.LISTING_TYPE_CHOICES, blank=True)
+    property_type = models.CharField(max_length=20, choices=House.PROPERTY_TYPE_CHOICES, blank=True)
+    district = models.ForeignKey(District, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    county = models.ForeignKey(County, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    parish = models.ForeignKey(Parish, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    price_min = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    price_max = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    min_bedrooms = models.PositiveSmallIntegerField(null=True, blank=True)
+    max_bedrooms = models.PositiveSmallIntegerField(null=True, blank=True)
+    min_area = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+    notify = models.BooleanField(default=True)  # Matches are queued for notification
+    is_active = models.BooleanField(default=True)  # Paused searches are not matched
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'saved_searches'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.user_id} - {self.name}"
+
+class SavedSearchMatch(models.Model):
+    """A new house matching a saved search, for the user's feed and notifications"""
+    saved_search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name='matches')
+    house = models.ForeignKey(House, on_delete=models.CASCADE, related_name='saved_search_matches')
+    matched_at = models.DateTimeField()
+    notified_at = models.DateTimeField(null=True, blank=True)  # NULL until a notification was sent
+
+    class Meta:
+        db_table = 'saved_search_matches'
+        constraints = [
+            models.UniqueConstraint(fields=['saved_search', 'house'], name='saved_search_matches_key'),
+        ]
+        indexes = [
+            # Matches waiting for a notification
+            models.Index(fields=['matched_at'], name='saved_search_pending_idx', condition=models.Q(notified_at=None)),
+        ]
+
+    def __str__(self):
+        return f"{self.saved_search_id} -> {self.house_id}"
+
+class PriceHistory(models.Model):
+    """Snapshot of a listing, recorded only when its fingerprint changes between runs"""
+    house = models.ForeignKey(House, on_delete=models.CASCADE, related_name='price_history')
+    name = models.CharField(max_length=255)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    previous_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    area = models.DecimalField(max_digits=8, decimal_places=2)
+    bedrooms = models.CharField(max_length=50)
+    recorded_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'price_history'
+        ordering = ['-recorded_at']
+        indexes = [
+            models.Index(fields=['house', '-recorded_at'], name='price_history_house_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.house.name}: {self.previous_price}€ -> {self.price}€ ({self.recorded_at})"
+
+class ListingSignature(models.Model):
+    """MinHash signature of a listing's normalised title and description, used for duplicate detection"""
+    house = models.OneToOneField(House, on_delete=models.CASCADE, related_name='signature')
+    minhash = models.JSONField(default=list)
+
+    class Meta:
+        db_table = 'listing_signatures'
+
+    def __str__(self):
+        return f"Signature for {self.house.name}"
+
+class DedupBucket(models.Model):
+    """LSH band or photo key of a listing; listings sharing a key are duplicate candidates"""
+    house = models.ForeignKey(House, on_delete=models.CASCADE, related_name='dedup_buckets')
+    key = models.CharField(max_length=100, db_index=True)
+
+    class Meta:
+        db_table = 'dedup_buckets'
+
+    def __str__(self):
+        return f"{self.key} -> {self.house_id}"
+
 class Photo(models.Model):
     house = models.ForeignKey('House', on_delete=models.CASCADE, related_name='photos')
     image_url = models.URLField(max_length=500)
@@ -89,10 +248,79 @@ class Photo(models.Model):
 
     class Meta:
         ordering = ['order']
+        indexes = [
+            # First photo of a house (the list representation) without a sort
+            models.Index(fields=['house', 'order'], name='photos_house_order_idx'),
+        ]
 
     def __str__(self):
         return f"Photo for {self.house.name} ({self.image_url})"
 
+class ArchivedHouse(models.Model):
+    """Inactive or old house moved out of the hot houses table by the archive_houses command"""
+    original_id = models.BigIntegerField(unique=True)  # Primary key the house had in the houses table
+    name = models.CharField(max_length=255)
+    zone = models.CharField(max_length=100)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    url = models.URLField(max_length=500)
+    bedrooms = models.CharField(max_length=50)
+    area = models.DecimalField(max_digits=8, decimal_places=2)
+    floor = models.CharField(max_length=50, null=True, blank=True)
+    description = models.TextField()
+    listing_type = models.CharField(max_length=10, choices=House.LISTING_TYPE_CHOICES, default='rent')
+    parish = models.ForeignKey(Parish, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    county = models.ForeignKey(County, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    district = models.ForeignKey(District, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    source = models.CharField(max_length=50)
+    scraped_at = models.DateTimeField()
+    house_id = models.CharField(max_length=100, unique=True)
+    last_seen_at = models.DateTimeField(null=True, blank=True)
+    price_dropped_at = models.DateTimeField(null=True, blank=True)
+    listing_group = models.BigIntegerField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'archived_houses'
+        ordering = ['-scraped_at']
+        indexes = [
+            models.Index(fields=['source', 'url'], name='archived_source_url_idx'),
+            models.Index(fields=['url'], name='archived_url_idx'),
+            # Case-insensitive URL lookups of the scrapers (see houses.archive.archived_urls)
+            models.Index(Lower('url'), name='archived_url_lower_idx'),
+        ]
+
+    def __str__(self):
+        return f"[archived] {self.name} - {self.zone} ({self.price}€)"
+
+class ArchivedPhoto(models.Model):
+    house = models.ForeignKey(ArchivedHouse, on_delete=models.CASCADE, related_name='photos')
+    image_url = models.URLField(max_length=500)
+    order = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'archived_photos'
+        ordering = ['order']
+
+    def __str__(self):
+        return f"Archived photo for {self.house.name} ({self.image_url})"
+
+class ArchivedPriceHistory(models.Model):
+    """PriceHistory row of an archived house"""
+    house = models.ForeignKey(ArchivedHouse, on_delete=models.CASCADE, related_name='price_history')
+    name = models.CharField(max_length=255)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    previous_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    area = models.DecimalField(max_digits=8, decimal_places=2)
+    bedrooms = models.CharField(max_length=50)
+    recorded_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'archived_price_history'
+        ordering = ['-recorded_at']
+
+    def __str__(self):
+        return f"[archived] {self.house.name}: {self.previous_price}€ -> {self.price}€ ({self.recorded_at})"
+
 class MainRun(models.Model):
     STATUS_CHOICES = [
         ('initialized', 'Initialized'),
@@ -126,6 +354,9 @@ class ScraperRun(models.Model):
     
     main_run = models.ForeignKey(MainRun, on_delete=models.CASCADE, related_name='scraper_runs')
     scraper = models.CharField(max_length=50)  # Store scraper name directly
+    listing_type = models.CharField(max_length=10, null=True, blank=True)
+    # The run paged every search URL to its last page: the listings of its source it didn't see are offline
+    saw_all_listings = models.BooleanField(default=False)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES)
     start_time = models.DateTimeField(auto_now_add=True)
     end_time = models.DateTimeField(null=True, blank=True)
@@ -140,3 +371,112 @@ class ScraperRun(models.Model):
         
     def __str__(self):
         return f"{self.scraper} - {self.start_time} ({self.status})"
+
+class PurgeJob(models.Model):
+    """Deletion of many houses, run in the background batch by batch (see houses.purge)"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed')
+    ]
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    filters = models.JSONField(default=dict, blank=True)  # See houses.purge.purge_queryset, empty for every house
+    batch_size = models.PositiveIntegerField()
+    total_houses = models.IntegerField(default=0)  # Houses to delete, counted when the job starts
+    deleted_houses = models.IntegerField(default=0)
+    last_house_pk = models.BigIntegerField(null=True, blank=True)  # Houses inserted after the job started are kept
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    start_time = models.DateTimeField(null=True, blank=True)
+    end_time = models.DateTimeField(null=True, blank=True)
+    execution_time = models.FloatField(null=True, blank=True)  # Store execution time in seconds
+    error_message = models.TextField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'purge_jobs'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Purge {self.filters or 'all'} - {self.deleted_houses}/{self.total_houses} ({self.status})"
+
+class DataVersion(models.Model):
+    """Counter bumped whenever the data behind cached API responses changes (see houses.cache)"""
+    key = models.CharField(max_length=50, unique=True)  # 'houses', 'locations' or 'user:<id>' (a user's flags)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'data_versions'
+
+    def __str__(self):
+        return f"{self.key} v{self.version}"
+
+class MarketStat(models.Model):
+    """
+    Price statistics of the active listings of a group, computed after each run (see houses.market_stats).
+
+    A NULL bedrooms or an empty source is the aggregate over all bedrooms / sources.
+    """
+    LEVEL_CHOICES = [
+        ('country', 'Country'),
+        ('district', 'District'),
+        ('county', 'County'),
+        ('parish', 'Parish'),
+    ]
+
+    level = models.CharField(max_length=10, choices=LEVEL_CHOICES)
+    location_id = models.IntegerField(null=True, blank=True)  # District/County/Parish id, NULL for the country
+    location_name = models.CharField(max_length=100, blank=True)
+    listing_type = models.CharField(max_length=10, choices=House.LISTING_TYPE_CHOICES)
+    bedrooms = models.PositiveSmallIntegerField(null=True, blank=True)
+    source = models.CharField(max_length=50, blank=True)
+    count = models.PositiveIntegerField()
+    price_mean = models.DecimalField(max_digits=10, decimal_places=2)
+    price_median = models.DecimalField(max_digits=10, decimal_places=2)
+    price_p10 = models.DecimalField(max_digits=10, decimal_places=2)
+    price_p90 = models.DecimalField(max_digits=10, decimal_places=2)
+    price_per_m2_mean = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    price_per_m2_median = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    main_run = models.ForeignKey('MainRun', on_delete=models.SET_NULL, null=True, blank=True, related_name='market_stats')
+    computed_at = models.DateTimeField()
+    is_current = models.BooleanField(default=True)  # False for the snapshots of previous runs
+
+    class Meta:
+        db_table = 'market_stats'
+        indexes = [
+            models.Index(fields=['is_current', 'level', 'listing_type'], name='market_stats_current_idx'),
+            models.Index(fields=['level', 'location_id', 'listing_type', 'computed_at'], name='market_stats_history_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.level} {self.location_name or '-'} {self.listing_type}: {self.count} houses"
+
+class HouseChange(models.Model):
+    """
+    Append-only log of changes to the houses feed, written by database triggers (see houses.sync).
+
+    The id is the sequence number sync tokens point into. Rows without a user are
+    listing changes (insert, update of a served column, deactivation, delete), rows
+    with a user are changes to that user's favourite/contacted/discarded flags.
+    """
+    house_pk = models.BigIntegerField()  # houses.id, kept after the house is deleted
+    house_id = models.CharField(max_length=100)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True, related_name='+', db_index=False
+    )
+    changed_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'house_changes'
+        indexes = [
+            # Changes after a token: listing changes (user IS NULL) and one user's flag changes
+            models.Index(fields=['user', 'id'], name='house_changes_user_seq_idx'),
+            models.Index(fields=['changed_at'], name='house_changes_changed_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.house_id}" + (f" (user {self.user_id})" if self.user_id else '')
@@ -0,0 +1,105 @@
+"""
+Normalisation of the free-text listing fields into typed, indexed columns.
+
+Portals give us bedrooms as "T2", areas as "85 m²" and floors as "3º andar" or
+"Rés do chão". These are parsed once at ingest (and by the normalize_houses
+command for existing rows) so the API can filter and sort in SQL and return
+stored values instead of re-parsing them on every request.
+"""
+import re
+from decimal import Decimal, InvalidOperation
+
+from unidecode import unidecode
+
+CENTS = Decimal('0.01')
+
+# Checked in order, first match wins (values are House.PROPERTY_TYPE_CHOICES)
+PROPERTY_TYPE_PATTERNS = [
+    ('room', re.compile(r'^(quarto|room)\b|\b(aluga-se|alugo|arrendo) quarto\b|\b(quarto|room) (em|in|para)\b')),
+    ('house', re.compile(r'\b(moradia|vivenda|chalet|quinta|townhouse)\b')),
+    ('studio', re.compile(r'\b(estudio|studio|loft|t0)\b')),
+    ('apartment', re.compile(r'\b(apartamento|apartment|flat|duplex|penthouse|t\d+)\b')),
+]
+
+GROUND_FLOOR_PATTERN = re.compile(r'\b(r/?c|res[ -]do[ -]chao|res-do-chao|ground)\b')
+BASEMENT_PATTERN = re.compile(r'\b(cave|sub[ -]?cave|basement)\b')
+THOUSANDS_PATTERN = re.compile(r'\d{1,3}(\.\d{3})+')
+DIGITS = '0123456789'
+
+
+def parse_bedrooms(bedrooms):
+    """'T2', 't2', '2 quartos' -> 2; None when there is no number"""
+    match = re.search(r'(\d+)', str(bedrooms or ''))
+    return int(match.group(1)) if match else None
+
+
+def parse_area(area):
+    """
+    '85 m²', '85,5', '1.200 m²', Decimal('85.00') -> Decimal('85.00'); None when missing or not positive.
+
+    Portals write decimals with a comma and thousands with a dot: '1.200' is 1200 m², not 1.2.
+    """
+    if area is None:
+        return None
+    if not isinstance(area, Decimal):
+        cleaned = str(area).replace('m²', '')
+        cleaned = ''.join(c for c in cleaned if c in DIGITS or c in '.,')
+        if ',' in cleaned and '.' in cleaned:
+            cleaned = cleaned.replace('.', '').replace(',', '.')  # 1.200,50
+        elif THOUSANDS_PATTERN.fullmatch(cleaned):
+            cleaned = cleaned.replace('.', '')  # 1.200
+        else:
+            cleaned = cleaned.replace(',', '.')  # 85,5
+        try:
+            area = Decimal(cleaned)
+        except (InvalidOperation, ValueError):
+            return None
+    return area.quantize(CENTS) if area > 0 else None
+
+
+def parse_floor(floor):
+    """'3', '3º andar', 'Piso 2' -> number; 'Rés do chão' -> 0; 'Cave' -> -1; None when unknown"""
+    text = unidecode(str(floor or '')).lower().strip()
+    if not text or text in ('n/a', '-'):
+        return None
+    if GROUND_FLOOR_PATTERN.search(text):
+        return 0
+    if BASEMENT_PATTERN.search(text):
+        return -1
+    match = re.search(r'-?\d+', text)
+    return int(match.group(0)) if match else None
+
+
+def classify_property_type(name):
+    """Property type from the listing title"""
+    text = unidecode(str(name or '')).lower()
+    for property_type, pattern in PROPERTY_TYPE_PATTERNS:
+        if pattern.search(text):
+            return property_type
+    return 'other'
+
+
+def normalize_listing(name, price, bedrooms, area, floor):
+    """
+    Typed columns for a listing.
+
+    Returns:
+        dict: bedrooms_num, area_m2, floor_num, price_per_m2 and property_type
+    """
+    area_m2 = parse_area(area)
+    try:
+        price = Decimal(str(price)) if price is not None else None
+    except (InvalidOperation, ValueError):
+        price = None
+    price_per_m2 = (price / area_m2).quantize(CENTS) if price and price > 0 and area_m2 else None
+
+    return {
+        'bedrooms_num': parse_bedrooms(bedrooms),
+        'area_m2': area_m2,
+        'floor_num': parse_floor(floor),
+        'price_per_m2': price_per_m2,
+        'property_type': classify_property_type(name),
+    }
+
+
+NORMALIZED_FIELDS = ['bedrooms_num', 'area_m2', 'floor_num', 'price_per_m2', 'property_type']
@@ -0,0 +1,205 @@
+"""
+Keyset (cursor) pagination for the houses feed.
+
+Pages are selected with a WHERE on the last row of the previous page instead
+of an OFFSET, and no COUNT(*) is run unless the client asks for it with
+``?count=true``, so the cost of a page doesn't depend on how deep it is.
+
+The cursor is an opaque token holding the ordering and the (value, id) of the
+last row served. Ties on the ordering column are broken by id in the same
+direction, which the feed indexes cover (SQLite stores the rowid in every
+index). Orderings without a keyset - name, area, ... - fall back to page
+numbers, and so do requests with a ``?page=`` number: clients that show page
+links and a total (the backoffice) keep the page number pagination, with its
+COUNT and OFFSET.
+"""
+import base64
+import json
+from decimal import Decimal, InvalidOperation
+
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+# Ordering columns that can be paginated by keyset, with the parser for their cursor value.
+# They must be NOT NULL: a NULL never compares true and those rows would be skipped.
+KEYSET_FIELDS = {
+    'scraped_at': parse_datetime,
+    'price': Decimal,
+}
+
+
+class HouseFeedPagination(BasePagination):
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    page_query_param = 'page'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        rows = self.page_queryset(queryset, request)
+        if self.fallback is not None:
+            return self.fallback.paginate_queryset(queryset, request, view)
+        self.count = queryset.count() if self.wants_count(request) else None
+        return self.set_page(list(rows))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset with the async ORM (the page number fallback runs in a thread)"""
+        rows = self.page_queryset(queryset, request)
+        if self.fallback is not None:
+            return await sync_to_async(self.fallback.paginate_queryset)(queryset, request, view)
+        self.count = await queryset.acount() if self.wants_count(request) else None
+        return self.set_page([row async for row in rows])
+
+    def page_queryset(self, queryset, request):
+        """
+        The rows of the requested page plus one (to know whether there is a next page), or
+        None when the ordering has no keyset and self.fallback paginates by page number.
+        """
+        self.request = request
+        self.fallback = None
+        ordering = self.get_ordering(queryset)
+        if ordering is None or self.page_query_param in request.query_params:
+            self.fallback = PageNumberPagination()
+            self.fallback.page_size = self.get_page_size(request)
+            return None
+
+        self.field, self.descending = ordering
+        self.size = self.get_page_size(request)
+
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            value, last_id = cursor
+            if self.descending:
+                # Written as a range + exclusion rather than an OR so the index range scan still applies
+                queryset = queryset.filter(**{f'{self.field}__lte': value}) \
+                    .exclude(Q(**{self.field: value}) & Q(id__gte=last_id))
+            else:
+                queryset = queryset.filter(**{f'{self.field}__gte': value}) \
+                    .exclude(Q(**{self.field: value}) & Q(id__lte=last_id))
+
+        prefix = '-' if self.descending else ''
+        return queryset.order_by(f'{prefix}{self.field}', f'{prefix}id')[:self.size + 1]
+
+    def set_page(self, rows):
+        self.has_next = len(rows) > self.size
+        self.page = rows[:self.size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        if self.fallback is not None:
+            return self.fallback.get_paginated_response(data)
+        response = {'next': self.get_next_link(), 'results': data}
+        if self.count is not None:
+            response = {'count': self.count, **response}
+        return Response(response)
+
+    def get_ordering(self, queryset):
+        """(field, descending) when the queryset's ordering can be paginated by keyset, otherwise None"""
+        order_by = [str(term) for term in (queryset.query.order_by or queryset.model._meta.ordering)]
+        if not order_by:
+            return None
+        first = order_by[0]
+        field = first.lstrip('-')
+        descending = first.startswith('-')
+        if field not in KEYSET_FIELDS:
+            return None
+        # Anything after the first column must be the id tie-breaker we add ourselves
+        if order_by[1:] not in ([], ['-id' if descending else 'id'], ['-pk' if descending else 'pk']):
+            return None
+        return field, descending
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(size, self.max_page_size) if size > 0 else self.page_size
+
+    def wants_count(self, request):
+        return request.query_params.get(self.count_query_param, '').lower() == 'true'
+
+    def decode_cursor(self, request):
+        """(value, id) of the last row of the previous page, or None on the first page"""
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))
+            if payload['o'] != ('-' if self.descending else '') + self.field:
+                raise ValueError('cursor belongs to another ordering')
+            value = KEYSET_FIELDS[self.field](payload['v'])
+            last_id = int(payload['id'])
+        except (TypeError, ValueError, KeyError, InvalidOperation, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if value is None:
+            raise NotFound(self.invalid_cursor_message)
+        return value, last_id
+
+    def encode_cursor(self, row):
+        value = getattr(row, self.field)
+        payload = {
+            'o': ('-' if self.descending else '') + self.field,
+            'v': value.isoformat() if hasattr(value, 'isoformat') else str(value),
+            'id': row.pk,
+        }
+        return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.count_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {
+                    'type': 'integer',
+                    'example': 123,
+                    'description': f'Only present with ?{self.count_query_param}=true',
+                },
+                'next': {
+                    'type': 'string',
+                    'nullable': True,
+                    'format': 'uri',
+                    'example': f'http://api.example.org/houses/?{self.cursor_query_param}=eyJvIjoiLXNjcmFwZWRfYXQifQ',
+                },
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Opaque cursor from the "next" link of the previous page',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': f'Number of results per page (max {self.max_page_size})',
+                'schema': {'type': 'integer'},
+            },
+            {
+                'name': self.count_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Include the total number of results (runs a COUNT query)',
+                'schema': {'type': 'boolean'},
+            },
+        ]
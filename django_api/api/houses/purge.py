@@ -0,0 +1,161 @@
+"""
+Bulk deletion of houses, in the background and in bounded batches.
+
+QuerySet.delete() on the whole table loads every house and walks its photos,
+history, dedup data and user flags in Python before deleting anything, then
+deletes it all in one transaction that holds SQLite's write lock until the
+end. A purge job deletes PURGE_BATCH_SIZE houses per transaction instead,
+picked by primary key: the rows depending on them go first, one set-based
+DELETE per table, then the houses themselves. Nothing is loaded into Python,
+and the scrapers can write between two batches. The job row records the
+progress after every batch.
+
+The raw deletes skip the pre/post_delete signals and the Python-side
+cascades, so they are only used while no receiver listens to those signals
+and the cascaded tables have no dependents of their own; otherwise each batch
+goes through QuerySet.delete(). The database triggers (search index, change
+log) fire either way.
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.db import connections, models, transaction
+from django.db.models import Max
+from django.db.models.signals import post_delete, pre_delete
+from django.utils import timezone
+
+from .cache import bump_data_version
+from .models import House, PurgeJob
+from .settings import PURGE_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+def purge_queryset(filters, now=None):
+    """
+    Houses matching a job's filters, every house for no filters.
+
+    Filters: source, district (id), listing_type, older_than_days (scraped longer ago),
+    inactive (true for the listings that went offline).
+    """
+    now = now or timezone.now()
+    queryset = House.objects.all()
+    if filters.get('source'):
+        queryset = queryset.filter(source=filters['source'])
+    if filters.get('district'):
+        queryset = queryset.filter(district_id=filters['district'])
+    if filters.get('listing_type'):
+        queryset = queryset.filter(listing_type=filters['listing_type'])
+    if filters.get('older_than_days') is not None:
+        queryset = queryset.filter(scraped_at__lt=now - timedelta(days=filters['older_than_days']))
+    if filters.get('inactive'):
+        queryset = queryset.filter(is_active=False)
+    return queryset
+
+
+def cascaded_relations():
+    """The relations whose rows are deleted with a house"""
+    return [relation for relation in House._meta.related_objects if relation.on_delete is models.CASCADE]
+
+
+def can_raw_delete():
+    """Whether deleting with plain DELETE statements does what QuerySet.delete() would"""
+    if any(relation.on_delete not in (models.CASCADE, models.DO_NOTHING) for relation in House._meta.related_objects):
+        return False  # SET_NULL and the like need an UPDATE
+    relations = cascaded_relations()  # DO_NOTHING ones (the search index) are kept in sync by the database
+    if any(relation.related_model._meta.related_objects for relation in relations):
+        return False  # Cascades going further down
+    deleted_models = [House, *(relation.related_model for relation in relations)]
+    return not any(
+        pre_delete.has_listeners(model) or post_delete.has_listeners(model) for model in deleted_models
+    )
+
+
+def delete_houses(house_ids):
+    """
+    Delete a batch of houses and the rows depending on them in one transaction.
+
+    Returns:
+        int: number of houses deleted
+    """
+    if not house_ids:
+        return 0
+
+    with transaction.atomic():
+        if not can_raw_delete():
+            return House.objects.filter(pk__in=house_ids).delete()[1].get(House._meta.label, 0)
+        for relation in cascaded_relations():
+            related = relation.related_model._base_manager.filter(**{f'{relation.field.name}__in': house_ids})
+            related._raw_delete(related.db)
+        houses = House._base_manager.filter(pk__in=house_ids)
+        return houses._raw_delete(houses.db)
+
+
+def start_purge_job(filters, user=None, batch_size=PURGE_BATCH_SIZE):
+    """Record a purge job and run it in a background thread once the current transaction commits"""
+    job = PurgeJob.objects.create(
+        filters=filters, batch_size=batch_size, requested_by=user if user and user.is_authenticated else None
+    )
+    transaction.on_commit(lambda: threading.Thread(
+        target=_run_in_thread, args=(job.pk,), name=f'purge-job-{job.pk}', daemon=True
+    ).start())
+    return job
+
+
+def _run_in_thread(job_id):
+    try:
+        run_purge_job(job_id)
+    finally:
+        connections.close_all()  # The thread's own connections
+
+
+def run_purge_job(job_id, progress=None):
+    """
+    Delete the houses of a purge job, batch by batch.
+
+    The houses are those matching the filters when the job starts, up to the highest primary
+    key then, so that listings inserted while it runs are kept.
+
+    Args:
+        progress: optional callable receiving the job after each batch
+
+    Returns:
+        PurgeJob: the finished (completed or failed) job
+    """
+    job = PurgeJob.objects.get(pk=job_id)
+    queryset = purge_queryset(job.filters, now=job.created_at)
+    job.last_house_pk = queryset.aggregate(last=Max('pk'))['last']
+    job.total_houses = queryset.count()
+    job.status = 'running'
+    job.start_time = timezone.now()
+    job.save(update_fields=['last_house_pk', 'total_houses', 'status', 'start_time'])
+    started = time.perf_counter()
+
+    try:
+        after = 0
+        while job.last_house_pk is not None:
+            house_ids = list(
+                queryset.filter(pk__gt=after, pk__lte=job.last_house_pk)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:job.batch_size]
+            )
+            if not house_ids:
+                break
+            job.deleted_houses += delete_houses(house_ids)
+            after = house_ids[-1]
+            PurgeJob.objects.filter(pk=job.pk).update(deleted_houses=job.deleted_houses)
+            bump_data_version()
+            if progress:
+                progress(job)
+        job.status = 'completed'
+    except Exception as e:
+        logger.exception("Purge job %s failed", job.pk)
+        job.status = 'failed'
+        job.error_message = str(e)
+
+    job.end_time = timezone.now()
+    job.execution_time = time.perf_counter() - started
+    job.save(update_fields=['status', 'error_message', 'end_time', 'execution_time'])
+    return job
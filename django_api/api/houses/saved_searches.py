@@ -0,0 +1,170 @@
+"""
+Matching of new houses against the users' saved searches.
+
+The scrapers hand every page of newly inserted houses to match_new_houses.
+Instead of testing each house against each search, the active searches are
+indexed by predicate. Each search is a bit, and every predicate answers
+"which searches does this value satisfy" with a bitmask:
+
+- equality criteria (listing and property type, district, county, parish) are
+  a dict from value to the searches requiring it, OR the searches that don't
+  constrain the field;
+- bounds (price interval, bedroom and area thresholds) are the searches sorted
+  by bound with cumulative masks, so the searches a value satisfies are a
+  prefix (lower bounds) or a suffix (upper bounds) found by bisection.
+
+A house's matches are the AND of its predicate masks: a few dict lookups and
+bisections per house, whatever the number of users. The index is rebuilt
+once per process when the ``saved_searches`` data version changes, i.e. when
+a search is created, edited or deleted.
+"""
+import threading
+from bisect import bisect_left, bisect_right
+
+from django.utils import timezone
+
+from .cache import version_state, SAVED_SEARCHES_SCOPE
+from .models import House, SavedSearch, SavedSearchMatch, FEED_CONDITION
+
+# SavedSearch field -> (House field, predicate); empty values match anything
+SEARCH_CRITERIA = {
+    'listing_type': ('listing_type', 'exact'),
+    'property_type': ('property_type', 'exact'),
+    'district_id': ('district_id', 'exact'),
+    'county_id': ('county_id', 'exact'),
+    'parish_id': ('parish_id', 'exact'),
+    'price_min': ('price', 'gte'),
+    'price_max': ('price', 'lte'),
+    'min_bedrooms': ('bedrooms_num', 'gte'),
+    'max_bedrooms': ('bedrooms_num', 'lte'),
+    'min_area': ('area_m2', 'gte'),
+}
+HOUSE_FIELDS = sorted({field for field, _ in SEARCH_CRITERIA.values()})
+
+_lock = threading.Lock()
+_index = (None, None)  # (version, SavedSearchIndex)
+
+
+class EqualityIndex:
+    """Searches requiring a field to equal a value"""
+
+    def __init__(self, criteria):
+        self.unconstrained = 0
+        self.by_value = {}
+        for bit, value in criteria:
+            if value in (None, ''):
+                self.unconstrained |= 1 << bit
+            else:
+                self.by_value[value] = self.by_value.get(value, 0) | 1 << bit
+
+    def matching(self, value):
+        return self.unconstrained | self.by_value.get(value, 0)
+
+
+class BoundIndex:
+    """Searches with a lower (gte) or an upper (lte) bound on a field"""
+
+    def __init__(self, criteria, lower):
+        self.lower = lower
+        self.unconstrained = 0
+        bounds = []
+        for bit, bound in criteria:
+            if bound is None:
+                self.unconstrained |= 1 << bit
+            else:
+                bounds.append((bound, bit))
+        bounds.sort()
+        self.bounds = [bound for bound, _ in bounds]
+        # masks[k]: the k smallest lower bounds, or the k largest upper bounds
+        self.masks = [0]
+        for _, bit in (bounds if lower else reversed(bounds)):
+            self.masks.append(self.masks[-1] | 1 << bit)
+
+    def matching(self, value):
+        if value is None:
+            return self.unconstrained  # Unknown values only pass searches without a bound
+        if self.lower:
+            return self.unconstrained | self.masks[bisect_right(self.bounds, value)]
+        return self.unconstrained | self.masks[len(self.bounds) - bisect_left(self.bounds, value)]
+
+
+class SavedSearchIndex:
+    """The active saved searches, indexed by predicate"""
+
+    def __init__(self, searches):
+        self.search_ids = [search['id'] for search in searches]
+        self.predicates = []
+        for name, (field, predicate) in SEARCH_CRITERIA.items():
+            criteria = [(bit, search[name]) for bit, search in enumerate(searches)]
+            if predicate == 'exact':
+                index = EqualityIndex(criteria)
+            else:
+                index = BoundIndex(criteria, lower=predicate == 'gte')
+            self.predicates.append((field, index))
+
+    @classmethod
+    def build(cls):
+        return cls(list(SavedSearch.objects.filter(is_active=True).order_by('id').values('id', *SEARCH_CRITERIA)))
+
+    def match(self, house):
+        """
+        Ids of the searches a house matches.
+
+        Args:
+            house: dict of the HOUSE_FIELDS values of a house
+        """
+        mask = (1 << len(self.search_ids)) - 1
+        for field, index in self.predicates:
+            mask &= index.matching(house[field])
+            if not mask:
+                return []
+        matches = []
+        while mask:
+            bit = mask & -mask
+            matches.append(self.search_ids[bit.bit_length() - 1])
+            mask ^= bit
+        return matches
+
+
+def saved_search_index(version):
+    """The index of the searches at the given saved_searches version, built once per version and process"""
+    global _index
+    cached_version, index = _index
+    if cached_version == version:
+        return index
+    with _lock:
+        if _index[0] != version:
+            _index = (version, SavedSearchIndex.build())
+        return _index[1]
+
+
+def clear_saved_search_index():
+    global _index
+    _index = (None, None)
+
+
+def match_new_houses(house_pks, now=None):
+    """
+    Record the saved searches matched by newly inserted houses (those of the feed: active, not
+    room rentals).
+
+    Returns:
+        int: number of matches recorded
+    """
+    if not house_pks:
+        return 0
+    (version,), _ = version_state([SAVED_SEARCHES_SCOPE])
+    index = saved_search_index(version)
+    if not index.search_ids:
+        return 0
+
+    now = now or timezone.now()
+    houses = House.objects.filter(FEED_CONDITION, pk__in=list(house_pks)).values('pk', *HOUSE_FIELDS)
+    matches = [
+        SavedSearchMatch(saved_search_id=search_id, house_id=house['pk'], matched_at=now)
+        for house in houses
+        for search_id in index.match(house)
+    ]
+    # A house handed over twice keeps its first match
+    SavedSearchMatch.objects.bulk_create(matches, batch_size=1000, ignore_conflicts=True)
+    return len(matches)
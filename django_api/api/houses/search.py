@@ -0,0 +1,168 @@
+"""
+Full-text search over the houses feed.
+
+On SQLite the ``search`` parameter is answered by the ``houses_search`` FTS5
+index (created in migration 0014) instead of ORed ``icontains`` lookups. The
+index holds each house's name, zone, description and location names (parish,
+county, district), tokenised with ``unicode61 remove_diacritics 2`` so that
+"sao joao" finds "São João". Triggers on ``houses`` keep it in sync with every
+insert, update and delete, whichever code path does them. Django rebuilds
+the table (dropping its triggers) for some schema changes on SQLite, so they
+are re-created after every migrate by ensure_search_triggers.
+
+Matches are filtered with an ``id IN (MATCH ...)`` subquery so search composes
+with every other filter, and can be ranked by bm25 with the column weights in
+SEARCH_COLUMN_WEIGHTS.
+
+Words are matched as whole tokens, the last one also as a prefix: "lisb"
+finds Lisboa but, unlike the ``icontains`` lookups used without the index,
+"boa" does not. Infix matches would need a trigram index several times the
+size of the table, and users type the start of words.
+"""
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Lookup, Q
+from django.db.models.expressions import RawSQL
+
+from .models import HouseSearchEntry
+from .settings import SEARCH_COLUMN_WEIGHTS
+
+SEARCH_TABLE = 'houses_search'
+SEARCH_COLUMNS = ['name', 'zone', 'description', 'location']
+
+# Location names of a houses row, as indexed in the location column
+LOCATION_SQL = (
+    "COALESCE((SELECT name FROM parishes WHERE id = {row}.parish_id), '') || ' ' || "
+    "COALESCE((SELECT name FROM counties WHERE id = {row}.county_id), '') || ' ' || "
+    "COALESCE((SELECT name FROM districts WHERE id = {row}.district_id), '')"
+)
+
+TRIGGERS = {
+    'houses_search_insert': f"""
+        CREATE TRIGGER IF NOT EXISTS houses_search_insert AFTER INSERT ON houses BEGIN
+            INSERT INTO {SEARCH_TABLE}(rowid, name, zone, description, location)
+            VALUES (new.id, new.name, new.zone, new.description, {LOCATION_SQL.format(row='new')});
+        END
+    """,
+    'houses_search_update': f"""
+        CREATE TRIGGER IF NOT EXISTS houses_search_update
+        AFTER UPDATE OF name, zone, description, parish_id, county_id, district_id ON houses BEGIN
+            DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id;
+            INSERT INTO {SEARCH_TABLE}(rowid, name, zone, description, location)
+            VALUES (new.id, new.name, new.zone, new.description, {LOCATION_SQL.format(row='new')});
+        END
+    """,
+    'houses_search_delete': f"""
+        CREATE TRIGGER IF NOT EXISTS houses_search_delete AFTER DELETE ON houses BEGIN
+            DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id;
+        END
+    """,
+}
+
+
+class Match(Lookup):
+    """``document__match``: FTS5 MATCH on the hidden column named after the index table"""
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+HouseSearchEntry._meta.get_field('document').register_lookup(Match)
+
+
+def search_index_available():
+    return connection.vendor == 'sqlite'
+
+
+def match_expression(text):
+    """
+    FTS5 query for free text typed by a user: every word must match, the last
+    one as a prefix since the frontend searches as the user types.
+
+    Returns:
+        str or None: the MATCH expression, None when the text has no words
+    """
+    words = re.findall(r'\w+', text or '')
+    if not words:
+        return None
+    # Quoting makes every word a plain string, so FTS5 operators typed by users are not interpreted
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def filter_search(queryset, text):
+    """Restrict a House queryset to the houses matching the search text"""
+    if not search_index_available():
+        return queryset.filter(
+            Q(name__icontains=text) |
+            Q(zone__icontains=text) |
+            Q(description__icontains=text) |
+            Q(parish__name__icontains=text) |
+            Q(county__name__icontains=text) |
+            Q(district__name__icontains=text)
+        )
+    expression = match_expression(text)
+    if expression is None:
+        return queryset
+    return queryset.filter(
+        id__in=RawSQL(f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s', [expression])
+    )
+
+
+def rank_search(queryset, text):
+    """
+    Annotate a House queryset filtered with filter_search with ``search_rank``:
+    the bm25 score of each match, lower is more relevant.
+
+    The index is joined rather than queried per row: a correlated MATCH
+    subquery re-reads the term's whole doclist for every matching house.
+    """
+    expression = match_expression(text)
+    if not search_index_available() or expression is None:
+        return queryset
+    weights = ', '.join(str(SEARCH_COLUMN_WEIGHTS[column]) for column in SEARCH_COLUMNS)
+    return queryset.filter(search_entry__document__match=expression).annotate(
+        search_rank=RawSQL(f'bm25({SEARCH_TABLE}, {weights})', (), output_field=FloatField())
+    )
+
+
+def rebuild_search_index():
+    """
+    Re-index every house (the triggers keep the index in sync, this is for repairs).
+
+    Returns:
+        int: number of houses indexed
+    """
+    columns = ', '.join(SEARCH_COLUMNS)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE}(rowid, {columns}) '
+            f'SELECT h.id, h.name, h.zone, h.description, {LOCATION_SQL.format(row="h")} FROM houses h'
+        )
+        cursor.execute(f'SELECT COUNT(*) FROM {SEARCH_TABLE}')
+        return cursor.fetchone()[0]
+
+
+def ensure_search_triggers(**kwargs):
+    """
+    post_migrate handler: re-create sync triggers lost to a table rebuild and
+    re-index, since rows written meanwhile were not indexed.
+    """
+    if not search_index_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = %s", [SEARCH_TABLE])
+        if cursor.fetchone() is None:
+            return  # Migration 0014 not applied yet
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'houses'")
+        missing = set(TRIGGERS) - {row[0] for row in cursor.fetchall()}
+        for name in missing:
+            cursor.execute(TRIGGERS[name])
+    if missing:
+        rebuild_search_index()
@@ -1,6 +1,15 @@
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Substr
 from rest_framework import serializers
-from .models import House, Photo, Parish, County, District, MainRun, ScraperRun
-import re
+from .models import (
+    House, Photo, Parish, County, District, MainRun, ScraperRun, PriceHistory, MarketStat, UserHouseState, PurgeJob,
+    SavedSearch
+)
+from .actions import ACTION_FIELDS, with_user_state
+from .normalization import parse_bedrooms
+from .settings import (
+    DESCRIPTION_PREVIEW_LENGTH, HOUSE_ACTIONS_MAX_OPERATIONS, PURGE_BATCH_SIZE, SAVED_SEARCHES_MAX_PER_USER
+)
 
 class DistrictSerializer(serializers.ModelSerializer):
     class Meta:
@@ -26,78 +35,244 @@ class PhotoSerializer(serializers.ModelSerializer):
         model = Photo
         fields = ['image_url', 'order']
 
+class PriceHistorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PriceHistory
+        fields = ['name', 'price', 'previous_price', 'area', 'bedrooms', 'recorded_at']
+
 class HouseSerializer(serializers.ModelSerializer):
+    """
+    House with sparse fieldsets.
+
+    The context selects what is built: ``fields`` (field names, the full
+    representation when missing) and ``full_description`` (otherwise the
+    description is a preview of DESCRIPTION_PREVIEW_LENGTH characters).
+    Use ``representation`` to resolve them from the fields= / expand= query
+    parameters and pass the same selection to ``setup_eager_loading`` so that
+    only what is serialised gets loaded.
+    """
     bedrooms = serializers.SerializerMethodField()
-    area = serializers.SerializerMethodField()
+    description = serializers.SerializerMethodField()
     is_favorite = serializers.SerializerMethodField()
     is_contacted = serializers.SerializerMethodField()
     is_discarded = serializers.SerializerMethodField()
     photos = PhotoSerializer(many=True, read_only=True)
+    photo = serializers.SerializerMethodField()
     parish = ParishSerializer(read_only=True)
     county = CountySerializer(read_only=True)
     district = DistrictSerializer(read_only=True)
-    
+    parish_id = serializers.IntegerField(read_only=True)
+    parish_name = serializers.CharField(source='parish.name', read_only=True, default=None)
+    county_id = serializers.IntegerField(read_only=True)
+    county_name = serializers.CharField(source='county.name', read_only=True, default=None)
+    district_id = serializers.IntegerField(read_only=True)
+    district_name = serializers.CharField(source='district.name', read_only=True, default=None)
+
     class Meta:
         model = House
         fields = [
             'name', 'zone', 'price', 'url', 'bedrooms', 'area', 'floor',
-            'description', 'listing_type', 'parish', 'county', 'district', 'source', 'scraped_at',
-            'house_id', 'is_favorite', 'is_contacted', 'is_discarded', 'photos'
+            'description', 'listing_type', 'bedrooms_num', 'area_m2', 'floor_num', 'price_per_m2', 'property_type', 'parish', 'county', 'district', 'source', 'scraped_at',
+            'house_id', 'price_dropped_at', 'last_seen_at', 'is_active', 'listing_group', 'is_favorite', 'is_contacted', 'is_discarded', 'photos'
         ]
-    
+        # Default of the list: flat location ids/names, the first photo and a description preview
+        list_fields = [
+            'name', 'zone', 'price', 'url', 'bedrooms', 'area', 'floor',
+            'description', 'listing_type', 'bedrooms_num', 'area_m2', 'price_per_m2', 'property_type',
+            'parish_id', 'parish_name', 'county_id', 'county_name', 'district_id', 'district_name', 'source', 'scraped_at',
+            'house_id', 'price_dropped_at', 'is_active', 'listing_group', 'is_favorite', 'is_contacted', 'is_discarded', 'photo'
+        ]
+
+    # expand= values and the fields they add ('description' also disables the preview)
+    EXPANSIONS = {
+        'photos': ['photos'],
+        'location': ['parish', 'county', 'district'],
+        'description': ['description'],
+    }
+    LOCATION_FIELDS = {'parish', 'county', 'district'}
+    FLAT_LOCATION_FIELDS = {'parish_name', 'county_name', 'district_name'}
+
+    @classmethod
+    def available_fields(cls):
+        return list(dict.fromkeys(cls.Meta.fields + cls.Meta.list_fields))
+
+    @classmethod
+    def representation(cls, fields=None, expand=None, default=None):
+        """
+        Resolve the fields= and expand= query parameters.
+
+        Args:
+            fields: comma-separated field names replacing the default ones (unknown names are ignored)
+            expand: comma-separated EXPANSIONS added to the selected fields
+            default: field names used without fields=, the full representation if None
+
+        Returns:
+            tuple: (field names, whether the description is complete)
+        """
+        available = cls.available_fields()
+        requested = [name.strip() for name in (fields or '').split(',') if name.strip() in available]
+        expansions = [name.strip() for name in (expand or '').split(',') if name.strip() in cls.EXPANSIONS]
+        names = requested or list(default or cls.Meta.fields)
+        for expansion in expansions:
+            names += [name for name in cls.EXPANSIONS[expansion] if name not in names]
+        full_description = default is None or 'description' in expansions
+        return names, full_description
+
+    def get_field_names(self, declared_fields, info):
+        # Only the selected fields are built
+        fields = self.context.get('fields')
+        return list(fields) if fields is not None else list(self.Meta.fields)
+
     def get_bedrooms(self, obj):
         """
-        Clean the bedrooms field to extract just the number.
-        Converts formats like 'T2', 't2', etc. to just '2'.
+        Number of bedrooms as a string ('T2' -> '2'), from the column parsed at ingest
+        (parsed from the text for rows that haven't been normalised).
         """
-        if not obj.bedrooms:
-            return "0"
-            
-        # Use regex to extract digits from the bedrooms field
-        # This will handle cases like "T2", "t2", "2 bedrooms", etc.
-        match = re.search(r'(\d+)', obj.bedrooms)
-        if match:
-            return match.group(1)
-        return "0"  # Default to 0 if no number is found
-        
-    def get_area(self, obj):
+        bedrooms = obj.bedrooms_num if obj.bedrooms_num is not None else parse_bedrooms(obj.bedrooms)
+        return str(bedrooms) if bedrooms is not None else "0"
+
+    # Per-user flags, annotated by setup_eager_loading: (annotation, UserHouseState column)
+    USER_FLAGS = {
+        'is_favorite': ('user_favorited_at', 'favorited_at'),
+        'is_contacted': ('user_contacted_at', 'contacted_at'),
+        'is_discarded': ('user_discarded_at', 'discarded_at'),
+    }
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, user=None, fields=None, full_description=True):
         """
-        Clean the area field to extract just the number.
-        Handles cases where area might contain text or formatting.
+        Load what the selected fields read in a constant number of queries:
+        the location chain is joined, photos are fetched in one extra query for
+        the whole page (the first photo is a subquery column), the user flags
+        come from the user's UserHouseState row, LEFT JOINed on its (user, house)
+        key, and a description preview is cut in SQL instead of loading the
+        whole text.
         """
-        if isinstance(obj.area, str):
-            # Remove any non-numeric characters except decimal point
-            area = ''.join(c for c in obj.area if c.isdigit() or c == '.')
-            try:
-                # Try to convert to float and then to string
-                return str(float(area))
-            except ValueError:
-                return "0"
-                
-        # Default case, convert to string
-        return str(obj.area)
+        fields = set(cls.Meta.fields if fields is None else fields)
+        if fields & cls.LOCATION_FIELDS:
+            queryset = queryset.select_related('parish__county__district', 'county__district', 'district')
+        elif fields & cls.FLAT_LOCATION_FIELDS:
+            queryset = queryset.select_related(
+                *(name[:-len('_name')] for name in sorted(fields & cls.FLAT_LOCATION_FIELDS))
+            )
+        if 'photos' in fields:
+            queryset = queryset.prefetch_related('photos')
+        if 'photo' in fields:
+            queryset = queryset.annotate(first_photo=Subquery(
+                Photo.objects.filter(house_id=OuterRef('pk')).order_by('order', 'id').values('image_url')[:1]
+            ))
+        if 'description' in fields and not full_description:
+            # One character more than the preview tells whether it was cut
+            queryset = queryset.defer('description').annotate(
+                description_preview=Substr('description', 1, DESCRIPTION_PREVIEW_LENGTH + 1)
+            )
+        flags = [(annotation, column) for flag, (annotation, column) in cls.USER_FLAGS.items() if flag in fields]
+        if flags and user is not None and user.is_authenticated:
+            queryset = with_user_state(queryset, user, alias='serialized_user_state').annotate(**{
+                annotation: F(f'serialized_user_state__{column}') for annotation, column in flags
+            })
+        return queryset
+
+    def _user_flag(self, obj, flag):
+        """Annotated value of a user flag, falling back to a query for non-annotated instances"""
+        request = self.context.get('request')
+        if not (request and request.user.is_authenticated):
+            return False
+        annotation, column = self.USER_FLAGS[flag]
+        if hasattr(obj, annotation):
+            return getattr(obj, annotation) is not None
+        return UserHouseState.objects.filter(user=request.user, house=obj, **{f'{column}__isnull': False}).exists()
+
+    def get_description(self, obj):
+        """Complete description, or a preview when the context asks for one"""
+        if self.context.get('full_description', True):
+            return obj.description
+        preview = getattr(obj, 'description_preview', None)
+        if preview is None:
+            preview = obj.description[:DESCRIPTION_PREVIEW_LENGTH + 1]
+        if len(preview) > DESCRIPTION_PREVIEW_LENGTH:
+            return preview[:DESCRIPTION_PREVIEW_LENGTH].rstrip() + '…'
+        return preview
+
+    def get_photo(self, obj):
+        """URL of the first photo"""
+        if hasattr(obj, 'first_photo'):
+            return obj.first_photo
+        photo = obj.photos.order_by('order', 'id').first()
+        return photo.image_url if photo else None
 
     def get_is_favorite(self, obj):
         """Check if the house is favorited by the current user"""
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return obj.favorited_by.filter(id=request.user.id).exists()
-        return False
+        return self._user_flag(obj, 'is_favorite')
 
     def get_is_contacted(self, obj):
         """Check if the house is marked as contacted by the current user"""
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return obj.contacted_by.filter(id=request.user.id).exists()
-        return False
+        return self._user_flag(obj, 'is_contacted')
 
     def get_is_discarded(self, obj):
         """Check if the house is discarded by the current user"""
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return obj.discarded_by.filter(id=request.user.id).exists()
-        return False
+        return self._user_flag(obj, 'is_discarded')
+
+class HouseActionSerializer(serializers.Serializer):
+    house_id = serializers.CharField(max_length=100)
+    action = serializers.ChoiceField(choices=list(ACTION_FIELDS))
+    state = serializers.BooleanField()
+
+class HouseActionBatchSerializer(serializers.Serializer):
+    operations = HouseActionSerializer(many=True, allow_empty=False, max_length=HOUSE_ACTIONS_MAX_OPERATIONS)
+
+class PurgeRequestSerializer(serializers.Serializer):
+    """Filters of a purge; at least one is required (delete_all purges everything)"""
+    source = serializers.CharField(max_length=50, required=False)
+    district = serializers.IntegerField(min_value=1, required=False)
+    listing_type = serializers.ChoiceField(choices=House.LISTING_TYPE_CHOICES, required=False)
+    older_than_days = serializers.IntegerField(min_value=0, required=False)
+    inactive = serializers.BooleanField(required=False)
+    batch_size = serializers.IntegerField(min_value=1, max_value=10000, default=PURGE_BATCH_SIZE)
+
+    def validate(self, attrs):
+        # inactive=false is no filter
+        attrs = {name: value for name, value in attrs.items() if value is not None and value is not False}
+        if set(attrs) == {'batch_size'}:
+            raise serializers.ValidationError('Give at least one filter, or use delete_all to delete every house')
+        return attrs
 
+class PurgeJobSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = PurgeJob
+        fields = [
+            'id', 'status', 'filters', 'batch_size', 'total_houses', 'deleted_houses', 'progress',
+            'created_at', 'start_time', 'end_time', 'execution_time', 'error_message'
+        ]
+
+    def get_progress(self, obj):
+        """Fraction of the houses deleted so far, 0 to 1"""
+        if obj.status == 'completed':
+            return 1.0
+        return round(obj.deleted_houses / obj.total_houses, 4) if obj.total_houses else 0.0
+
+class SavedSearchSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SavedSearch
+        fields = [
+            'id', 'name', 'listing_type', 'property_type', 'district', 'county', 'parish', 'price_min', 'price_max',
+            'min_bedrooms', 'max_bedrooms', 'min_area', 'notify', 'is_active', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['created_at', 'updated_at']
+
+    def validate(self, attrs):
+        def value(name):
+            return attrs[name] if name in attrs else getattr(self.instance, name, None)
+
+        for low, high in [('price_min', 'price_max'), ('min_bedrooms', 'max_bedrooms')]:
+            if value(low) is not None and value(high) is not None and value(low) > value(high):
+                raise serializers.ValidationError({high: f'Must be at least {low}'})
+        user = self.context['request'].user
+        if self.instance is None and user.saved_searches.count() >= SAVED_SEARCHES_MAX_PER_USER:
+            raise serializers.ValidationError(f'At most {SAVED_SEARCHES_MAX_PER_USER} saved searches per user')
+        return attrs
 
 class ScraperRunSerializer(serializers.ModelSerializer):
     name = serializers.SerializerMethodField()
@@ -122,4 +297,14 @@ class MainRunSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'status', 'start_time', 'end_time', 'execution_time',
             'total_houses', 'new_houses', 'error_message', 'scraper_runs'
-        ] 
\ No newline at end of file
+        ]
+
+
+class MarketStatSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MarketStat
+        fields = [
+            'level', 'location_id', 'location_name', 'listing_type', 'bedrooms', 'source', 'count',
+            'price_mean', 'price_median', 'price_p10', 'price_p90', 'price_per_m2_mean', 'price_per_m2_median',
+            'main_run', 'computed_at'
+        ]
@@ -14,4 +14,74 @@ ROOM_RENTAL_DESCRIPTION_TERMS = [
     "SHARED ROOM", 
     "ROOM IN APARTMENT",
     "ALUGAM-SE QUARTOS"
-] 
\ No newline at end of file
+] 
+
+# Listing liveness settings
+LISTING_EXPIRY_DAYS = 7  # Mark listings as inactive when not seen by any run for this many days
+
+# Cross-portal duplicate detection settings
+DEDUP_NUM_PERMUTATIONS = 64  # MinHash signature length
+DEDUP_BANDS = 16  # LSH bands (DEDUP_NUM_PERMUTATIONS / DEDUP_BANDS rows per band)
+DEDUP_SHINGLE_SIZE = 3  # Words per shingle
+DEDUP_TEXT_THRESHOLD = 0.5  # Minimum estimated Jaccard similarity of title + description
+DEDUP_PRICE_BAND = 0.1  # Candidates must be within ~10% of the price
+DEDUP_AREA_TOLERANCE = 0.1  # Duplicates must be within 10% of the area
+DEDUP_MAX_CANDIDATES = 200  # Safety cap on candidates scored per listing
+
+# Archive settings
+ARCHIVE_INACTIVE_AFTER_DAYS = 30  # Archive listings that have been inactive (not seen) for this many days
+ARCHIVE_MAX_AGE_DAYS = 365  # Archive any listing scraped longer ago than this, even if still seen
+ARCHIVE_BATCH_SIZE = 500  # Houses moved per transaction
+
+# Full-text search settings
+SEARCH_COLUMN_WEIGHTS = {  # bm25 weight of each column of the houses_search index
+    'name': 10.0,
+    'zone': 4.0,
+    'description': 1.0,
+    'location': 4.0,  # Parish, county and district names
+}
+
+# Market statistics settings
+MARKET_STATS_SNAPSHOTS = True  # Keep the statistics of every run as a time series (otherwise only the latest)
+MARKET_STATS_RETENTION_DAYS = 365  # Snapshots older than this are pruned when statistics are stored (None keeps them all)
+
+# API representation settings
+DESCRIPTION_PREVIEW_LENGTH = 200  # Characters of the description in the default list representation (expand=description for all)
+
+# Response compression settings (houses.middleware.CompressionMiddleware)
+COMPRESSION_MIN_SIZE = 1024  # Responses smaller than this many bytes are sent uncompressed
+COMPRESSION_BROTLI_QUALITY = 5  # 0-11, higher is smaller but slower
+COMPRESSIBLE_CONTENT_TYPES = {
+    'application/json', 'application/x-ndjson', 'application/vnd.oai.openapi+json', 'application/javascript',
+    'text/html', 'text/plain', 'text/csv', 'text/css', 'text/javascript',
+}
+
+# Delta sync settings (see houses.sync)
+CHANGE_LOG_RETENTION_DAYS = 30  # Changes older than this are pruned; clients with older tokens refetch everything
+SYNC_BATCH_SIZE = 500  # Changes per sync response by default
+SYNC_MAX_BATCH_SIZE = 2000
+
+# Batched user actions settings (see houses.actions)
+HOUSE_ACTIONS_MAX_OPERATIONS = 500  # Operations accepted in one request
+
+# Bulk export settings (see houses.export)
+EXPORT_CHUNK_SIZE = 2000  # Rows fetched from the database at a time
+EXPORT_BUFFER_SIZE = 64 * 1024  # Bytes of CSV/NDJSON gathered before a chunk is sent or written
+EXPORT_PARQUET_ROW_GROUP_SIZE = 50000  # Rows per Parquet row group, the rows held in memory while writing one
+
+# Live feed settings (see houses.live)
+LIVE_FEED_POLL_SECONDS = 5  # How often each API process looks for new houses, the delay of the live feed (see houses.live)
+LIVE_FEED_HEARTBEAT_SECONDS = 15  # Comment sent on idle connections so that proxies keep them open
+LIVE_FEED_RETRY_MS = 5000  # Reconnection delay advised to the clients
+LIVE_FEED_QUEUE_SIZE = 1000  # Events waiting for a slow client before it is disconnected (it resumes from its Last-Event-ID)
+LIVE_FEED_BATCH_SIZE = 500  # Houses loaded per query, and replayed at most to a resuming client
+
+# Bulk deletion settings (see houses.purge)
+PURGE_BATCH_SIZE = 1000  # Houses deleted per transaction; the scrapers can write between two batches
+
+# Saved search settings (see houses.saved_searches)
+SAVED_SEARCHES_MAX_PER_USER = 20
+
+# Zone resolution settings (see houses.location_resolver)
+LOCATION_MATCH_THRESHOLD = 85  # A zone part matches a parish/county name when their partial_ratio is above this
+LOCATION_MEMO_SIZE = 10000  # Zone parts whose match is remembered per scraper process
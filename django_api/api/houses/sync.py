@@ -0,0 +1,185 @@
+"""
+Delta sync for offline-capable clients.
+
+Every change to the houses feed is appended to the ``house_changes`` log by
+triggers on ``houses`` and on the users' flags (``user_house_states``), whichever
+code path writes them (ingest, maintenance commands, the API). Updates are only
+logged when a column the API serves actually changes, so marking listings as
+seen on every run doesn't flood the log. The triggers are SQLite only, like
+the search index's, and are created after every migrate by
+ensure_change_log_triggers (which also restores them after a table rebuild).
+
+A client keeps the opaque token of its last sync and asks for the changes after
+it; the log is read through the (user, id) index, so catching up costs
+O(changes) rather than a full refetch. Tokens older than the pruned part of the
+log (CHANGE_LOG_RETENTION_DAYS) get a reset, and the client refetches.
+"""
+import base64
+import json
+from datetime import timedelta
+
+from django.db import connection
+from django.utils import timezone
+
+from .models import HouseChange
+from .settings import CHANGE_LOG_RETENTION_DAYS
+
+CHANGE_TABLE = 'house_changes'
+STATE_TABLE = 'user_house_states'
+FLAG_COLUMNS = ['favorited_at', 'contacted_at', 'discarded_at']
+
+# Columns of houses served by the API: an update logs a change when one of them differs
+SERVED_COLUMNS = [
+    'name', 'zone', 'price', 'url', 'bedrooms', 'area', 'floor', 'description', 'listing_type', 'parish_id',
+    'county_id', 'district_id', 'source', 'house_id', 'price_dropped_at', 'is_active', 'listing_group',
+    'bedrooms_num', 'area_m2', 'floor_num', 'price_per_m2', 'property_type', 'is_room_rental',
+]
+
+NOW_SQL = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+LOG_SQL = f"INSERT INTO {CHANGE_TABLE}(house_pk, house_id, user_id, changed_at) VALUES ({{values}}, {NOW_SQL});"
+STATE_SQL = "{row}.house_id, (SELECT house_id FROM houses WHERE id = {row}.house_id), {row}.user_id"
+# A flag changes when it is set or cleared; rows without any flag are not states
+FLAG_CHANGED_SQL = ' OR '.join(f'(old.{column} IS NULL) IS NOT (new.{column} IS NULL)' for column in FLAG_COLUMNS)
+HAS_FLAGS_SQL = ' OR '.join(f'{{row}}.{column} IS NOT NULL' for column in FLAG_COLUMNS)
+
+TRIGGERS = {
+    'houses': {
+        'house_changes_insert': f"""
+            CREATE TRIGGER IF NOT EXISTS house_changes_insert AFTER INSERT ON houses BEGIN
+                {LOG_SQL.format(values='new.id, new.house_id, NULL')}
+            END
+        """,
+        'house_changes_update': f"""
+            CREATE TRIGGER IF NOT EXISTS house_changes_update AFTER UPDATE ON houses
+            WHEN {' OR '.join(f'old.{column} IS NOT new.{column}' for column in SERVED_COLUMNS)} BEGIN
+                {LOG_SQL.format(values='new.id, new.house_id, NULL')}
+            END
+        """,
+        'house_changes_delete': f"""
+            CREATE TRIGGER IF NOT EXISTS house_changes_delete AFTER DELETE ON houses BEGIN
+                {LOG_SQL.format(values='old.id, old.house_id, NULL')}
+            END
+        """,
+    },
+    STATE_TABLE: {
+        'user_house_states_changes_insert': f"""
+            CREATE TRIGGER IF NOT EXISTS user_house_states_changes_insert AFTER INSERT ON {STATE_TABLE}
+            WHEN {HAS_FLAGS_SQL.format(row='new')} BEGIN
+                {LOG_SQL.format(values=STATE_SQL.format(row='new'))}
+            END
+        """,
+        'user_house_states_changes_update': f"""
+            CREATE TRIGGER IF NOT EXISTS user_house_states_changes_update AFTER UPDATE ON {STATE_TABLE}
+            WHEN {FLAG_CHANGED_SQL} BEGIN
+                {LOG_SQL.format(values=STATE_SQL.format(row='new'))}
+            END
+        """,
+        'user_house_states_changes_delete': f"""
+            CREATE TRIGGER IF NOT EXISTS user_house_states_changes_delete AFTER DELETE ON {STATE_TABLE}
+            WHEN {HAS_FLAGS_SQL.format(row='old')} BEGIN
+                {LOG_SQL.format(values=STATE_SQL.format(row='old'))}
+            END
+        """,
+    },
+}
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+def change_log_available():
+    return connection.vendor == 'sqlite'
+
+
+def encode_token(sequence):
+    payload = json.dumps({'c': sequence}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii')
+
+
+def decode_token(token):
+    """Sequence number of a sync token, raises InvalidToken"""
+    try:
+        sequence = int(json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))['c'])
+    except (TypeError, ValueError, KeyError, UnicodeError):
+        raise InvalidToken(token)
+    if sequence < 0:
+        raise InvalidToken(token)
+    return sequence
+
+
+def log_bounds():
+    """(first, last) sequence numbers still in the log, (None, None) when it's empty"""
+    # Two primary key lookups: SQLite only optimises a lone MIN() or MAX() into one
+    sequences = HouseChange.objects.values_list('id', flat=True)
+    return sequences.order_by('id').first(), sequences.order_by('-id').first()
+
+
+def current_sequence():
+    return HouseChange.objects.values_list('id', flat=True).order_by('-id').first() or 0
+
+
+def read_changes(since, user=None, limit=500):
+    """
+    The changes after a sequence number seen by a user, oldest first.
+
+    Returns:
+        tuple: (changes, next sequence, more) where changes are (house pk, house_id,
+        is a flag change) tuples, or None when the sequence is no longer in the log
+        and the client has to refetch everything
+    """
+    first, last = log_bounds()
+    if last is None:
+        # An empty log can only be synced from the start
+        return ([], 0, False) if since == 0 else None
+    if since > last or since < first - 1:
+        # Issued by another database, or pruned
+        return None
+
+    listing = HouseChange.objects.filter(user__isnull=True, id__gt=since)
+    rows = list(listing.order_by('id').values_list('id', 'house_pk', 'house_id', 'user_id')[:limit + 1])
+    if user is not None and user.is_authenticated:
+        flags = HouseChange.objects.filter(user=user, id__gt=since)
+        rows += flags.order_by('id').values_list('id', 'house_pk', 'house_id', 'user_id')[:limit + 1]
+        rows.sort()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if more:
+        sequence = rows[-1][0]
+    else:
+        # Nothing left for this user: skip the other users' changes too
+        sequence = max([since, last] + [row[0] for row in rows[-1:]])
+    return [(house_pk, house_id, user_id is not None) for _, house_pk, house_id, user_id in rows], sequence, more
+
+
+def prune_change_log(days=CHANGE_LOG_RETENTION_DAYS, now=None):
+    """
+    Delete the changes older than `days`, always keeping the last one so that
+    current tokens stay valid.
+
+    Returns:
+        int: number of changes deleted
+    """
+    now = now or timezone.now()
+    last = current_sequence()
+    deleted, _ = HouseChange.objects.filter(changed_at__lt=now - timedelta(days=days), id__lt=last).delete()
+    return deleted
+
+
+def ensure_change_log_triggers(**kwargs):
+    """post_migrate handler: create the triggers, or re-create those lost to a table rebuild"""
+    if not change_log_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        tables = {row[0] for row in cursor.fetchall()}
+        if CHANGE_TABLE not in tables:
+            return  # Migration 0018 not applied yet
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        existing = {row[0] for row in cursor.fetchall()}
+        for table, triggers in TRIGGERS.items():
+            if table not in tables:
+                continue  # Migrated to an earlier state
+            for name, sql in triggers.items():
+                if name not in existing:
+                    cursor.execute(sql)
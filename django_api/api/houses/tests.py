@@ -0,0 +1,1769 @@
+import asyncio
+import csv
+import gzip
+import importlib
+import importlib.util
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import skipUnless
+
+from asgiref.sync import async_to_sync, sync_to_async
+
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.urls import resolve
+from django.utils.translation import gettext_lazy as _
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .cache import response_cache, bump_data_version, bump_locations_version, bump_user_version
+from .actions import set_house_flags
+from .archive import archivable_houses, archive_batch, archived_urls, is_archived_url
+from .classifier import MultiPatternMatcher, is_room_rental, terms_version
+from .dedup import assign_listing_group, estimate_similarity, minhash, shingles
+from .export import csv_stream, export_rows, pyarrow
+from .ingest import (
+    expire_stale_listings, flush_listing_changes, fully_seen_sources, listing_fingerprint, load_listing_states,
+    mark_listings_seen, merge_fingerprint
+)
+from .live import live_feed
+from .location_resolver import LocationResolver, fuzz, normalize_name, process, zone_parts
+from .locations import clear_location_tree
+from .management.commands import benchmark_locations
+from .market_stats import refresh_market_stats
+from .middleware import negotiate_encoding
+from .models import (
+    ArchivedHouse, District, County, Parish, House, HouseChange, Photo, MainRun, PriceHistory, PurgeJob, SavedSearch,
+    SavedSearchMatch, ScraperRun, UserHouseState
+)
+from .normalization import classify_property_type, normalize_listing, parse_area, parse_bedrooms, parse_floor
+from .pagination import HouseFeedPagination
+from .purge import run_purge_job
+from .saved_searches import HOUSE_FIELDS, SEARCH_CRITERIA, SavedSearchIndex, clear_saved_search_index, match_new_houses
+from .renderers import ORJSONRenderer
+from .sync import prune_change_log
+from .serializers import HouseSerializer
+from .settings import DESCRIPTION_PREVIEW_LENGTH
+from .views import HouseViewSet
+
+
+class HouseAPITestCase(TestCase):
+    def setUp(self):
+        # Cached responses would outlive the test's rolled back data
+        response_cache.clear()
+        clear_location_tree()
+        clear_saved_search_index()
+
+
+class PriceHistoryTests(TestCase):
+    def setUp(self):
+        self.house = House.objects.create(
+            name='Apartamento T2', zone='Arroios', price=Decimal('1000'), url='https://example.com/history',
+            bedrooms='T2', area=Decimal('80'), description='', source='era', scraped_at=timezone.now(),
+            house_id='history',
+        )
+
+    def test_fingerprint_compares_scraped_and_stored_values(self):
+        stored = listing_fingerprint('Apartamento T2', Decimal('1000.00'), Decimal('80.00'), 'T2')
+        self.assertEqual(listing_fingerprint('Apartamento T2 ', '1000', '80', 'T2 '), stored)
+        self.assertEqual(listing_fingerprint(None, 'abc', '', None), (None, None, '', ''))
+        self.assertEqual(load_listing_states(House.objects.all()), {self.house.url: (self.house.pk, stored)})
+
+    def test_merge_keeps_what_the_portal_did_not_show(self):
+        known = listing_fingerprint('Apartamento T2', 1000, 80, 'T2')
+        scraped = listing_fingerprint(None, 950, None, None)
+        self.assertEqual(merge_fingerprint(known, scraped), (Decimal('950.00'), Decimal('80.00'), 'T2', 'Apartamento T2'))
+
+    def test_flush_records_history_and_updates_the_house(self):
+        old = listing_fingerprint('Apartamento T2', 1000, 80, 'T2')
+        now = timezone.now()
+        written = flush_listing_changes({
+            self.house.pk: (old, listing_fingerprint('Apartamento T3', 900, 95, 'T3')),
+            self.house.pk + 1000: (old, old),  # Deleted meanwhile
+        }, now=now)
+        self.assertEqual(written, 1)
+
+        self.house.refresh_from_db()
+        self.assertEqual((self.house.name, self.house.price, self.house.area), ('Apartamento T3', 900, 95))
+        self.assertEqual((self.house.bedrooms_num, self.house.area_m2, self.house.price_per_m2), (3, 95, Decimal('9.47')))
+        self.assertEqual(self.house.price_dropped_at, now)
+        history = self.house.price_history.get()
+        self.assertEqual((history.previous_price, history.price, history.recorded_at), (1000, 900, now))
+
+        # A rise is recorded too, without touching price_dropped_at
+        flush_listing_changes({self.house.pk: (
+            listing_fingerprint('Apartamento T3', 900, 95, 'T3'), listing_fingerprint('Apartamento T3', 1100, 95, 'T3')
+        )}, now=now + timedelta(days=1))
+        self.house.refresh_from_db()
+        self.assertEqual(self.house.price_dropped_at, now)
+        response = APIClient().get(f'/api/houses/{self.house.house_id}/price_history/')
+        self.assertEqual([row['price'] for row in response.json()], ['1100.00', '900.00'])
+        self.assertEqual(flush_listing_changes({}), 0)
+
+
+class ListingLivenessTests(TestCase):
+    def make_house(self, key, source='Imovirtual', listing_type='rent', seen_days_ago=10):
+        return House.objects.create(
+            name=f'Apartamento {key}', zone='Arroios', price=1000, url=f'https://example.com/{key}', bedrooms='T1',
+            area=50, description='', source=source, listing_type=listing_type, scraped_at=timezone.now(),
+            last_seen_at=timezone.now() - timedelta(days=seen_days_ago), house_id=f'live-{key}',
+        )
+
+    def make_run(self, main_run, scraper, listing_type='rent', status='completed', saw_all_listings=True):
+        return ScraperRun.objects.create(
+            main_run=main_run, scraper=scraper, listing_type=listing_type, status=status,
+            saw_all_listings=saw_all_listings,
+        )
+
+    def test_seen_listings_come_back_to_life(self):
+        house = self.make_house('back')
+        House.objects.filter(pk=house.pk).update(is_active=False)
+        self.assertEqual(mark_listings_seen([house.pk]), 1)
+        house.refresh_from_db()
+        self.assertTrue(house.is_active)
+        self.assertLess(timezone.now() - house.last_seen_at, timedelta(minutes=1))
+        self.assertEqual(mark_listings_seen([]), 0)
+
+    def test_only_sources_paged_to_the_end_expire(self):
+        walked = self.make_house('walked')
+        recent = self.make_house('recent', seen_days_ago=1)
+        other_type = self.make_house('buy', listing_type='buy')
+        stopped_early = self.make_house('early', source='Idealista')
+        blocked = self.make_house('blocked', source='SuperCasa')
+        main_run = MainRun.objects.create(status='completed')
+        self.make_run(main_run, 'Imovirtual')
+        # Stopped on a page without new listings: later pages were never looked at
+        self.make_run(main_run, 'Idealista', saw_all_listings=False)
+        self.make_run(main_run, 'SuperCasa', status='failed')
+
+        sources = fully_seen_sources(main_run)
+        self.assertEqual(sources, {('Imovirtual', 'rent')})
+        self.assertEqual(expire_stale_listings(sources), 1)
+        self.assertEqual(
+            set(House.objects.filter(is_active=True).values_list('pk', flat=True)),
+            {recent.pk, other_type.pk, stopped_early.pk, blocked.pk}
+        )
+        self.assertFalse(House.objects.get(pk=walked.pk).is_active)
+        self.assertEqual(expire_stale_listings(set()), 0)
+
+    def test_command_uses_the_last_completed_run(self):
+        self.make_house('walked')
+        self.make_house('early', source='Idealista')
+        self.make_run(MainRun.objects.create(status='completed'), 'Idealista', saw_all_listings=False)
+        out = io.StringIO()
+        call_command('expire_listings', stdout=out)
+        self.assertIn('nothing expired', out.getvalue())
+        self.assertEqual(House.objects.filter(is_active=True).count(), 2)
+
+        self.make_run(MainRun.objects.create(status='completed'), 'Imovirtual')
+        call_command('expire_listings', stdout=io.StringIO())
+        self.assertEqual(list(House.objects.filter(is_active=True).values_list('source', flat=True)), ['Idealista'])
+
+
+SCRAPER_DEPENDENCIES = all(importlib.util.find_spec(name) for name in ('pandas', 'selenium', 'bs4'))
+
+
+@skipUnless(SCRAPER_DEPENDENCIES, 'the scrapers need pandas, selenium and beautifulsoup4')
+class SuperCasaPaginationTests(TestCase):
+    class Driver:
+        """Selenium driver stub: a page with elements of the given classes and links to the given pages"""
+
+        def __init__(self, *classes, pages=()):
+            self.classes = classes
+            self.pages = pages
+
+        def find_elements(self, by, value):
+            links = [page for page in self.pages if f"href*='/pagina-{page}'" in value]
+            return [object()] if value in self.classes or links else []
+
+    def setUp(self):
+        if str(settings.BASE_DIR.parent) not in sys.path:
+            sys.path.append(str(settings.BASE_DIR.parent))
+        from src.scrapers.super_casa import SuperCasaScraper
+
+        self.scraper = SuperCasaScraper.__new__(SuperCasaScraper)
+        self.scraper._log = lambda *args, **kwargs: None
+
+    def test_blocked_page_is_not_the_last_page(self):
+        # A captcha or error page has no pagination element, like a real single page: unknown
+        self.assertIsNone(self.scraper._check_pagination(self.Driver(), 1))
+
+    def test_last_page(self):
+        self.assertIs(self.scraper._check_pagination(self.Driver('list-pagination'), 3), False)
+        driver = self.Driver('list-pagination', 'list-pagination-next', pages=[4])
+        self.assertIs(self.scraper._check_pagination(driver, 3), True)
+        # A next link pointing elsewhere can't be trusted either way
+        self.assertIsNone(self.scraper._check_pagination(self.Driver('list-pagination', 'list-pagination-next'), 3))
+
+
+class ListingDedupTests(TestCase):
+    DESCRIPTION = (
+        'Apartamento T2 renovado com varanda e muita luz natural, cozinha equipada, perto do metro de Arroios '
+        'e de todos os serviços, disponível a partir de setembro'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.district = District.objects.create(name='Lisboa')
+        cls.county = County.objects.create(name='Lisboa', district=cls.district)
+        cls.parish = Parish.objects.create(name='Arroios', county=cls.county)
+
+    def make_house(self, key, price=1200, parish=True, description=DESCRIPTION, photos=()):
+        house = House.objects.create(
+            name='Apartamento T2 em Arroios', zone='Arroios, Lisboa', price=price, url=f'https://example.com/{key}',
+            bedrooms='T2', bedrooms_num=2, area=80, description=description, source=key,
+            parish=self.parish if parish else None, county=self.county, district=self.district,
+            scraped_at=timezone.now(), house_id=f'dedup-{key}',
+        )
+        assign_listing_group(house, list(photos))
+        return house
+
+    def test_similarity(self):
+        self.assertEqual(shingles('Casa  Azul!', size=3), {'casa azul'})
+        signature = minhash(shingles(self.DESCRIPTION))
+        self.assertEqual(estimate_similarity(signature, signature), 1.0)
+        self.assertLess(estimate_similarity(signature, minhash(shingles('Moradia V4 com piscina em Cascais'))), 0.2)
+        self.assertEqual(estimate_similarity(signature, []), 0.0)
+
+    def test_same_flat_on_two_portals_is_grouped(self):
+        first = self.make_house('idealista')
+        second = self.make_house('era', price=1250)
+        other = self.make_house('remax', description='Moradia V4 com piscina e jardim, garagem para dois carros')
+        self.assertEqual(first.listing_group, first.pk)
+        self.assertEqual(second.listing_group, first.pk)
+        self.assertEqual(other.listing_group, other.pk)
+
+        response = APIClient().get('/api/houses/', {'collapse': 'group', 'page': 1})
+        self.assertEqual(sorted(house['house_id'] for house in response.json()['results']), ['dedup-idealista', 'dedup-remax'])
+
+    def test_parish_and_county_level_locations_meet(self):
+        first = self.make_house('idealista', parish=False)
+        self.assertEqual(self.make_house('era').listing_group, first.pk)
+        self.assertEqual(self.make_house('remax', parish=False).listing_group, first.pk)
+
+    def test_shared_photo(self):
+        first = self.make_house('idealista', description='T2 Arroios', photos=['https://img.example.com/a.JPG?w=800'])
+        second = self.make_house('era', description='Bom apartamento', photos=['https://IMG.example.com/a.jpg'])
+        self.assertEqual(second.listing_group, first.pk)
+
+    def test_keys_follow_price_changes(self):
+        first = self.make_house('idealista')
+        before = set(first.dedup_buckets.values_list('key', flat=True))
+        state = listing_fingerprint(first.name, first.price, first.area, first.bedrooms)
+        flush_listing_changes({first.pk: (state, listing_fingerprint(first.name, 1800, first.area, first.bedrooms))})
+        after = set(first.dedup_buckets.values_list('key', flat=True))
+        self.assertTrue(after)
+        self.assertFalse(before & after)
+        self.assertEqual(House.objects.get(pk=first.pk).listing_group, first.pk)
+        # A listing at the new price is now found
+        self.assertEqual(self.make_house('era', price=1800).listing_group, first.pk)
+
+
+class ArchiveTests(TestCase):
+    def make_house(self, key, scraped_days_ago=1, seen_days_ago=1, is_active=True):
+        now = timezone.now()
+        return House.objects.create(
+            name=f'Apartamento {key}', zone='Arroios', price=1000, url=f'https://example.com/Casa-{key}',
+            bedrooms='T1', area=50, description='', source='era', scraped_at=now - timedelta(days=scraped_days_ago),
+            last_seen_at=now - timedelta(days=seen_days_ago), is_active=is_active, house_id=f'archive-{key}',
+        )
+
+    def test_archivable_houses(self):
+        gone = self.make_house('gone', scraped_days_ago=60, seen_days_ago=40, is_active=False)
+        old = self.make_house('old', scraped_days_ago=400)
+        self.make_house('live', scraped_days_ago=60, seen_days_ago=1)
+        self.make_house('recently-gone', seen_days_ago=3, is_active=False)
+        favourite = self.make_house('favourite', scraped_days_ago=400)
+        set_house_flags(get_user_model().objects.create_user(username='archive'), {favourite.pk: {'favorite': True}})
+        self.assertEqual(set(archivable_houses()), {gone, old})
+        self.assertEqual(set(archivable_houses(max_age_days=None)), {gone})
+
+    def test_archive_moves_photos_and_price_history(self):
+        house = self.make_house('gone', scraped_days_ago=60, seen_days_ago=40, is_active=False)
+        dropped_at = timezone.now() - timedelta(days=45)
+        House.objects.filter(pk=house.pk).update(price_dropped_at=dropped_at)
+        Photo.objects.create(house=house, image_url='https://example.com/gone.jpg', order=0)
+        PriceHistory.objects.create(
+            house=house, name=house.name, price=1000, previous_price=1100, area=50, bedrooms='T1', recorded_at=dropped_at
+        )
+        out = io.StringIO()
+        call_command('archive_houses', stdout=out)
+        self.assertIn('Archived 1 house(s)', out.getvalue())
+
+        self.assertFalse(House.objects.exists())
+        self.assertFalse(PriceHistory.objects.exists())
+        archived = ArchivedHouse.objects.get()
+        self.assertEqual((archived.original_id, archived.price_dropped_at), (house.pk, dropped_at))
+        self.assertEqual(list(archived.photos.values_list('image_url', flat=True)), ['https://example.com/gone.jpg'])
+        history = archived.price_history.get()
+        self.assertEqual((history.previous_price, history.price, history.recorded_at), (1100, 1000, dropped_at))
+
+    def test_archived_urls_are_matched_like_the_houses(self):
+        archive_batch([self.make_house('gone').pk])
+        self.assertTrue(is_archived_url('https://example.com/Casa-gone'))
+        self.assertTrue(is_archived_url('https://EXAMPLE.com/casa-GONE'))
+        self.assertFalse(is_archived_url('https://example.com/Casa-other'))
+        self.assertEqual(
+            archived_urls(['https://example.com/CASA-gone', 'https://example.com/new', None]),
+            {'https://example.com/casa-gone'}
+        )
+        with CaptureQueriesContext(connection) as queries:
+            archived_urls(['https://example.com/casa-gone'])
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {queries[0]['sql']}")
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('archived_url_lower_idx', plan)
+
+
+class NormalizationTests(TestCase):
+    def test_bedrooms(self):
+        for value, expected in [('T2', 2), ('t3', 3), ('2 quartos', 2), ('T0', 0), ('N/A', None), (None, None)]:
+            self.assertEqual(parse_bedrooms(value), expected, value)
+
+    def test_area(self):
+        for value, expected in [
+            ('85 m²', Decimal('85.00')), ('85,5', Decimal('85.50')), (Decimal('85'), Decimal('85.00')),
+            ('1.200 m²', Decimal('1200.00')), ('1.200,50 m²', Decimal('1200.50')), ('72.5', Decimal('72.50')),
+            ('0', None), ('N/A', None), ('', None), (None, None),
+        ]:
+            self.assertEqual(parse_area(value), expected, value)
+
+    def test_floor(self):
+        for value, expected in [
+            ('3', 3), ('3º andar', 3), ('Piso 2', 2), ('Rés do chão', 0), ('R/C', 0), ('Cave', -1), ('N/A', None),
+            ('', None), (None, None),
+        ]:
+            self.assertEqual(parse_floor(value), expected, value)
+
+    def test_property_type(self):
+        for name, expected in [
+            ('Apartamento T2 em Arroios', 'apartment'), ('Moradia V4', 'house'), ('Estúdio no Chiado', 'studio'),
+            ('Quarto em apartamento partilhado', 'room'), ('Loja', 'other'),
+        ]:
+            self.assertEqual(classify_property_type(name), expected, name)
+
+    def test_normalize_listing(self):
+        self.assertEqual(normalize_listing('Apartamento T2', '1200', 'T2', '1.200 m²', '2º andar'), {
+            'bedrooms_num': 2, 'area_m2': Decimal('1200.00'), 'floor_num': 2, 'price_per_m2': Decimal('1.00'),
+            'property_type': 'apartment',
+        })
+        self.assertEqual(normalize_listing('Casa', 0, '', None, None)['price_per_m2'], None)
+
+    def test_existing_houses_are_backfilled(self):
+        house = House.objects.create(
+            name='Moradia T3', zone='Loulé', price=1500, url='https://example.com/typed', bedrooms='T3', area=150,
+            floor='Rés do chão', description='', source='era', scraped_at=timezone.now(), house_id='typed-1',
+        )
+        self.assertIsNone(house.bedrooms_num)
+        # Rows the migration hasn't filled yet still show their bedrooms
+        self.assertEqual(HouseSerializer(house).data['bedrooms'], '3')
+
+        migration = importlib.import_module('houses.migrations.0026_backfill_typed_columns')
+        migration.backfill_typed_columns(django_apps, None)
+        house.refresh_from_db()
+        self.assertEqual(
+            {field: getattr(house, field) for field in ('bedrooms_num', 'area_m2', 'floor_num', 'price_per_m2', 'property_type')},
+            normalize_listing(house.name, house.price, house.bedrooms, house.area, house.floor),
+        )
+        self.assertEqual((house.bedrooms_num, house.floor_num, house.property_type), (3, 0, 'house'))
+
+
+class RoomRentalClassifierTests(HouseAPITestCase):
+    def make_house(self, key, name, description='', **fields):
+        return House.objects.create(
+            name=name, zone='Arroios', price=400, url=f'https://example.com/{key}', bedrooms='T1', area=15,
+            description=description, source='era', scraped_at=timezone.now(), house_id=f'room-{key}', **fields
+        )
+
+    def test_whole_words_only(self):
+        self.assertTrue(is_room_rental('Quarto em Arroios'))
+        self.assertTrue(is_room_rental('Aluga-se quarto, Alameda'))
+        self.assertTrue(is_room_rental('Room near the metro'))
+        self.assertTrue(is_room_rental('T3', 'Quarto partilhado com casa de banho'))
+        self.assertTrue(is_room_rental('T3', 'Alugam-se quartos a estudantes'))
+        self.assertFalse(is_room_rental('Apartamento T2 com 2 quartos'))
+        self.assertFalse(is_room_rental('Bathroom renovated, showroom apartment'))
+        self.assertFalse(is_room_rental('T3', 'Showroom com quartos amplos'))
+
+    def test_case_and_accent_insensitive(self):
+        matcher = MultiPatternMatcher(['Estúdio', 'sala'])
+        self.assertTrue(matcher.search('ESTUDIO no Chiado'))
+        self.assertFalse(matcher.search('salas'))
+        self.assertTrue(matcher.search('salas', whole_words=False))
+        self.assertEqual(list(MultiPatternMatcher(['he', 'she', 'hers']).finditer('USHERS')), [(1, 4), (2, 4), (2, 6)])
+
+    def test_existing_houses_are_classified(self):
+        room = self.make_house('room', 'Quarto em Arroios')
+        flat = self.make_house('flat', 'Apartamento T1')
+        migration = importlib.import_module('houses.migrations.0024_classify_existing_room_rentals')
+        migration.classify_existing_houses(django_apps, None)
+        self.assertEqual(
+            dict(House.objects.values_list('house_id', 'is_room_rental')), {room.house_id: True, flat.house_id: False}
+        )
+        self.assertEqual(set(House.objects.values_list('room_rental_version', flat=True)), {migration.TERMS_VERSION})
+        response = self.client.get('/api/houses/', {'page': 1})
+        self.assertEqual([house['house_id'] for house in response.json()['results']], [flat.house_id])
+
+    def test_migration_keeps_its_own_terms(self):
+        # Frozen in the migration: whole words, case and accent insensitive, like houses.classifier
+        migration = importlib.import_module('houses.migrations.0024_classify_existing_room_rentals')
+        for title, description, expected in [
+            ('Quarto em Arroios', '', True), ('Aluga-se quarto, Alameda', '', True), ('Room near the metro', '', True),
+            ('T3', 'Quarto partilhado com casa de banho', True), ('T3', 'Alugam-se quartos a estudantes', True),
+            ('DIVIDIR apartamento', '', True), ('Apartamento T2 com 2 quartos', '', False),
+            ('Bathroom renovated, showroom apartment', '', False), ('T3', 'Showroom com quartos amplos', False),
+            ('room_service', '', True), (None, None, False),
+        ]:
+            self.assertEqual(migration.is_room_rental(title, description), expected, title)
+        self.assertEqual(len(migration.TERMS_VERSION), 12)
+
+    def test_command_only_reclassifies_stale_rows(self):
+        self.make_house('room', 'Quarto em Arroios', room_rental_version='old')
+        self.make_house('flat', 'Quarto em Arroios', room_rental_version=terms_version())
+        out = io.StringIO()
+        call_command('classify_room_rentals', stdout=out)
+        self.assertIn('Classified 1 house(s)', out.getvalue())
+        self.assertEqual(list(House.objects.filter(is_room_rental=True).values_list('house_id', flat=True)), ['room-room'])
+
+
+class HouseFeedQueryPlanTests(TestCase):
+    """
+    The house feed must be served from the partial feed indexes (see House.Meta):
+    no full table scan of houses and no temporary B-tree to sort the page.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='plan', password='plan')
+        cls.district = District.objects.create(name='Lisboa')
+        cls.county = County.objects.create(name='Lisboa', district=cls.district)
+        cls.parish = Parish.objects.create(name='Arroios', county=cls.county)
+
+    def feed_page_plan(self, params, user=None):
+        """EXPLAIN QUERY PLAN of the page query HouseViewSet.list runs for these query parameters"""
+        request = APIRequestFactory().get('/api/houses/', params)
+        if user is not None:
+            force_authenticate(request, user=user)
+        view = HouseViewSet(action_map={'get': 'list'}, format_kwarg=None)
+        view.request = view.initialize_request(request)
+        with CaptureQueriesContext(connection) as queries:
+            view.paginate_queryset(view.filter_queryset(view.get_queryset()))
+        page_sql = [query['sql'] for query in queries if 'ORDER BY' in query['sql']]
+        self.assertEqual(len(page_sql), 1, queries.captured_queries)
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + page_sql[0])
+            return '\n'.join(row[-1] for row in cursor.fetchall())
+
+    def assertUsesFeedIndex(self, params, user=None):
+        plan = self.feed_page_plan(params, user)
+        for line in plan.splitlines():
+            with self.subTest(params=params, line=line):
+                if line.startswith('SCAN houses'):
+                    self.assertIn('INDEX', line, f"full scan of houses:\n{plan}")
+                self.assertNotIn('TEMP B-TREE', line, f"sort without an index:\n{plan}")
+        self.assertIn('feed_', plan)
+
+    def test_default_feed(self):
+        for ordering in ('-scraped_at', 'price', '-price'):
+            self.assertUsesFeedIndex({'ordering': ordering})
+
+    def test_filtered_feeds(self):
+        filters = [
+            {'listing_type': 'rent'},
+            {'district': self.district.id},
+            {'county': self.county.id},
+            {'parish': self.parish.id},
+            {'source': 'idealista'},
+            {'listing_type': 'buy', 'district': self.district.id},
+        ]
+        for params in filters:
+            for ordering in ('-scraped_at', 'price', '-price'):
+                self.assertUsesFeedIndex({**params, 'ordering': ordering})
+
+    def test_next_pages(self):
+        paginator = HouseFeedPagination()
+        house = House(id=42, scraped_at=timezone.now(), price=1000)
+        for ordering in ('-scraped_at', 'price', '-price'):
+            paginator.field, paginator.descending = ordering.lstrip('-'), ordering.startswith('-')
+            cursor = paginator.encode_cursor(house)
+            self.assertUsesFeedIndex({'ordering': ordering, 'cursor': cursor})
+            self.assertUsesFeedIndex({'district': self.district.id, 'ordering': ordering, 'cursor': cursor})
+
+    def test_authenticated_feed(self):
+        self.assertUsesFeedIndex({}, user=self.user)
+        self.assertUsesFeedIndex({'district': self.district.id, 'ordering': 'price'}, user=self.user)
+
+    def test_sqlite_plan_format(self):
+        # The assertions above rely on SQLite's EXPLAIN QUERY PLAN wording
+        self.assertEqual(connection.vendor, 'sqlite')
+
+
+class HouseSerializationQueryCountTests(HouseAPITestCase):
+    """Serializing a page of houses costs the same number of queries whatever the page size"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='count', password='count')
+        district = District.objects.create(name='Porto')
+        county = County.objects.create(name='Porto', district=district)
+        parish = Parish.objects.create(name='Bonfim', county=county)
+        now = timezone.now()
+        for i in range(25):
+            house = House.objects.create(
+                name=f'Apartamento T2 {i}', zone='Bonfim', price=900 + i, url=f'https://example.com/{i}',
+                bedrooms='T2', area=80, description='', parish=parish, county=county, district=district,
+                source='idealista', scraped_at=now - timedelta(minutes=i), house_id=f'count-{i}',
+                bedrooms_num=2, listing_group=i,
+            )
+            Photo.objects.bulk_create([Photo(house=house, image_url=f'https://example.com/{i}/{n}.jpg', order=n)
+                                       for n in range(3)])
+            set_house_flags(cls.user, {house.pk: {'favorite': bool(i % 2), 'contacted': bool(i % 3)}})
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def test_anonymous_list(self):
+        # data version, page (with the first photo as a subquery column)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/houses/')
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertEqual(response.data['results'][0]['district_name'], 'Porto')
+        self.assertEqual(response.data['results'][0]['photo'], 'https://example.com/0/0.jpg')
+
+    def test_authenticated_list(self):
+        self.client.force_authenticate(self.user)
+        # data versions, page (with the user flags as EXISTS columns), photos
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/houses/', {'ordering': 'price', 'expand': 'photos'})
+        results = response.data['results']
+        self.assertEqual([house['is_favorite'] for house in results[:2]], [False, True])
+        self.assertEqual([house['is_contacted'] for house in results[:3]], [False, True, True])
+        self.assertEqual(len(results[0]['photos']), 3)
+
+    def test_query_count_does_not_grow_with_page(self):
+        self.client.force_authenticate(self.user)
+        next_page = self.client.get('/api/houses/').data['next']
+        next_page = self.client.get(next_page).data['next']
+        with self.assertNumQueries(2):
+            self.client.get(next_page)
+        with self.assertNumQueries(2):
+            self.client.get('/api/houses/', {'collapse': 'group', 'source': 'idealista'})
+
+    def test_detail(self):
+        self.client.force_authenticate(self.user)
+        # data versions (ETag), house, photos
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/houses/count-1/')
+        self.assertTrue(response.data['is_favorite'])
+        self.assertEqual(response.data['parish']['county']['district']['name'], 'Porto')
+
+
+class SparseFieldsetTests(HouseAPITestCase):
+    """fields= / expand= and the lightweight list representation"""
+
+    @classmethod
+    def setUpTestData(cls):
+        district = District.objects.create(name='Lisboa')
+        county = County.objects.create(name='Lisboa', district=district)
+        cls.parish = Parish.objects.create(name='Arroios', county=county)
+        cls.description = 'Apartamento luminoso com varanda. ' * 20
+        house = House.objects.create(
+            name='Apartamento T1', zone='Arroios', price=1200, url='https://example.com/sparse',
+            bedrooms='T1', area=50, description=cls.description, parish=cls.parish, county=county,
+            district=district, source='idealista', scraped_at=timezone.now(), house_id='sparse-1',
+        )
+        Photo.objects.bulk_create([Photo(house=house, image_url=f'https://example.com/sparse/{n}.jpg', order=n)
+                                   for n in (2, 1)])
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def test_default_list_representation(self):
+        house = self.client.get('/api/houses/').json()['results'][0]
+        self.assertEqual(set(house), set(HouseSerializer.Meta.list_fields))
+        self.assertEqual(house['parish_id'], self.parish.id)
+        self.assertEqual((house['parish_name'], house['county_name'], house['district_name']),
+                         ('Arroios', 'Lisboa', 'Lisboa'))
+        self.assertEqual(house['photo'], 'https://example.com/sparse/1.jpg')
+        self.assertEqual(len(house['description']), DESCRIPTION_PREVIEW_LENGTH + 1)
+        self.assertTrue(house['description'].endswith('…'))
+
+    def test_fields(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/houses/', {'fields': 'house_id,price,unknown'})
+        self.assertEqual(response.json()['results'], [{'house_id': 'sparse-1', 'price': '1200.00'}])
+
+    def test_expand(self):
+        response = self.client.get('/api/houses/', {'fields': 'house_id', 'expand': 'description,location,photos'})
+        house = response.json()['results'][0]
+        self.assertEqual(house['description'], self.description)
+        self.assertEqual(house['parish']['county']['district']['name'], 'Lisboa')
+        self.assertEqual([photo['order'] for photo in house['photos']], [1, 2])
+
+    def test_expanded_list(self):
+        # As requested by the backoffice houses page: the list fields plus the nested ones it renders
+        house = self.client.get('/api/houses/', {'expand': 'photos,location,description'}).json()['results'][0]
+        self.assertTrue(set(HouseSerializer.Meta.list_fields) < set(house))
+        self.assertEqual(house['parish']['name'], 'Arroios')
+        self.assertEqual(len(house['photos']), 2)
+        self.assertEqual(house['description'], self.description)
+
+    def test_detail_is_complete(self):
+        house = self.client.get('/api/houses/sparse-1/').json()
+        self.assertEqual(house['description'], self.description)
+        self.assertEqual(len(house['photos']), 2)
+        self.assertEqual(self.client.get('/api/houses/sparse-1/', {'fields': 'name'}).json(),
+                         {'name': 'Apartamento T1'})
+
+
+class HouseFeedPaginationTests(HouseAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        for i in range(23):
+            House.objects.create(
+                name=f'Moradia {i}', zone='Sintra', price=500 + (i % 4) * 100, url=f'https://example.com/p{i}',
+                bedrooms='T3', area=120, description='', source='era', house_id=f'page-{i}',
+                scraped_at=now - timedelta(hours=i // 3),  # Ties on both orderings
+            )
+
+    def walk(self, params):
+        """house_ids of every page, following the next links"""
+        client = APIClient()
+        response = client.get('/api/houses/', params)
+        house_ids = []
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            house_ids.extend(house['house_id'] for house in response.data['results'])
+            if not response.data['next']:
+                return house_ids
+            response = client.get(response.data['next'])
+
+    def test_walks_every_house_once_in_order(self):
+        orderings = {
+            '-scraped_at': lambda house: (-house.scraped_at.timestamp(), -house.pk),
+            'price': lambda house: (house.price, house.pk),
+            '-price': lambda house: (-house.price, -house.pk),
+        }
+        for ordering, key in orderings.items():
+            with self.subTest(ordering=ordering):
+                expected = [house.house_id for house in sorted(House.objects.all(), key=key)]
+                self.assertEqual(self.walk({'ordering': ordering, 'page_size': 4}), expected)
+
+    def test_optional_count(self):
+        response = APIClient().get('/api/houses/', {'count': 'true'})
+        self.assertEqual(response.data['count'], 23)
+        self.assertNotIn('count=', response.data['next'])
+
+    def test_invalid_cursor(self):
+        client = APIClient()
+        self.assertEqual(client.get('/api/houses/', {'cursor': 'garbage'}).status_code, 404)
+        # A cursor is only valid for the ordering that produced it
+        cursor = client.get('/api/houses/', {'ordering': 'price'}).data['next'].split('cursor=')[1]
+        self.assertEqual(client.get('/api/houses/', {'ordering': '-scraped_at', 'cursor': cursor}).status_code, 404)
+
+    def test_other_orderings_use_page_numbers(self):
+        response = APIClient().get('/api/houses/', {'ordering': 'name', 'page': 2})
+        self.assertEqual(response.data['count'], 23)
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_page_numbers_on_request(self):
+        # The backoffice pages the default ordering by number and shows the total
+        client = APIClient()
+        expected = list(House.objects.order_by('-scraped_at', '-id').values_list('house_id', flat=True))
+        response = client.get('/api/houses/', {'ordering': '-scraped_at', 'page': 3})
+        self.assertEqual(response.data['count'], 23)
+        self.assertEqual([house['house_id'] for house in response.data['results']], expected[20:])
+        self.assertIsNone(response.data['next'])
+        self.assertIn('page=2', response.data['previous'])
+
+
+class HouseSearchTests(HouseAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        district = District.objects.create(name='Setúbal')
+        county = County.objects.create(name='Almada', district=district)
+        parish = Parish.objects.create(name='Caparica e Trafaria', county=county)
+        now = timezone.now()
+        common = dict(price=900, bedrooms='T2', area=70, source='idealista', scraped_at=now)
+        House.objects.create(name='Apartamento T2 em São João', zone='Costa', description='Vista mar',
+                             url='https://example.com/s1', house_id='search-1', **common)
+        House.objects.create(name='Moradia com piscina', zone='Caparica', description='Perto de São João',
+                             parish=parish, county=county, district=district,
+                             url='https://example.com/s2', house_id='search-2', **{**common, 'source': 'era'})
+        House.objects.create(name='Estúdio', zone='Arroios', description='Metro',
+                             url='https://example.com/s3', house_id='search-3', **common)
+
+    def search(self, params):
+        response = APIClient().get('/api/houses/', params)
+        return [house['house_id'] for house in response.json()['results']]
+
+    def test_accent_insensitive_ranked(self):
+        # The name match outranks the description match
+        self.assertEqual(self.search({'search': 'sao JOAO'}), ['search-1', 'search-2'])
+        self.assertEqual(self.search({'search': 'setubal'}), ['search-2'])
+        self.assertEqual(self.search({'search': 'estud'}), ['search-3'])
+        # Text without words (or FTS5 syntax) doesn't filter anything
+        self.assertEqual(self.search({'search': '"'}), self.search({}))
+
+    def test_prefix_matches_only(self):
+        # Words match whole or, the last one, by their start: infix text no longer matches as with icontains
+        self.assertEqual(self.search({'search': 'arroi'}), ['search-3'])
+        self.assertEqual(self.search({'search': 'rroios'}), [])
+        self.assertEqual(self.search({'search': 'piscina moradia'}), ['search-2'])
+
+    def test_composes_with_filters(self):
+        self.assertEqual(self.search({'search': 'são joão', 'source': 'era'}), ['search-2'])
+        self.assertEqual(self.search({'search': 'são joão', 'ordering': 'price'}), ['search-1', 'search-2'])
+
+    def test_index_follows_updates_and_deletes(self):
+        House.objects.filter(house_id='search-3').update(name='Loft renovado')
+        bump_data_version()
+        self.assertEqual(self.search({'search': 'loft'}), ['search-3'])
+        self.assertEqual(self.search({'search': 'estudio'}), [])
+        House.objects.filter(house_id='search-3').delete()
+        bump_data_version()
+        self.assertEqual(self.search({'search': 'loft'}), [])
+
+
+class HouseResponseCacheTests(HouseAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='cache', email='cache@example.com', password='cache')
+        cls.other = get_user_model().objects.create_user(username='other', email='other@example.com', password='other')
+        for i in range(3):
+            House.objects.create(
+                name=f'Apartamento {i}', zone='Arroios', price=1000 + i, url=f'https://example.com/c{i}',
+                bedrooms='T1', area=50, description='', source='idealista', scraped_at=timezone.now(),
+                house_id=f'cache-{i}',
+            )
+
+    def test_identical_requests_hit(self):
+        client = APIClient()
+        first = client.get('/api/houses/', {'source': 'idealista', 'ordering': 'price'})
+        self.assertEqual(first['X-Cache'], 'MISS')
+        # Same parameters in another order, plus an empty one: only the version lookup runs
+        with self.assertNumQueries(1):
+            second = client.get('/api/houses/', {'ordering': 'price', 'district': '', 'source': 'idealista'})
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(client.get('/api/houses/stats/')['X-Cache'], 'MISS')
+        self.assertEqual(client.get('/api/houses/stats/')['X-Cache'], 'HIT')
+
+    def test_users_have_their_own_scope(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        client.get('/api/houses/')
+        self.assertEqual(client.get('/api/houses/')['X-Cache'], 'HIT')
+        self.assertEqual(APIClient().get('/api/houses/')['X-Cache'], 'MISS')
+        client.force_authenticate(self.other)
+        self.assertEqual(client.get('/api/houses/')['X-Cache'], 'MISS')
+
+    def test_toggle_invalidates_only_that_user(self):
+        client = APIClient()
+        client.force_authenticate(self.other)
+        client.get('/api/houses/')
+        client.force_authenticate(self.user)
+        client.get('/api/houses/')
+        client.post('/api/houses/cache-1/toggle_favorite/')
+        response = client.get('/api/houses/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual([house['is_favorite'] for house in response.data['results']], [False, True, False])
+        client.force_authenticate(self.other)
+        self.assertEqual(client.get('/api/houses/')['X-Cache'], 'HIT')
+
+    def test_data_version_invalidates_everyone(self):
+        client = APIClient()
+        client.get('/api/houses/')
+        House.objects.filter(house_id='cache-0').update(price=1)
+        self.assertEqual(client.get('/api/houses/')['X-Cache'], 'HIT')
+        bump_data_version()
+        response = client.get('/api/houses/', {'ordering': 'price'})
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['house_id'], 'cache-0')
+
+    def test_api_writes_invalidate_everyone(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        client.get('/api/houses/', {'ordering': 'price'})
+        self.assertEqual(client.patch('/api/houses/cache-0/', {'price': '1500.00'}, format='json').status_code, 200)
+        response = client.get('/api/houses/', {'ordering': 'price'})
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual([house['price'] for house in response.data['results']], ['1001.00', '1002.00', '1500.00'])
+
+        self.assertEqual(client.delete('/api/houses/cache-1/').status_code, 204)
+        response = client.get('/api/houses/', {'ordering': 'price'})
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual([house['house_id'] for house in response.data['results']], ['cache-2', 'cache-0'])
+        self.assertEqual(APIClient().get('/api/houses/stats/').data['total_houses'], 2)
+
+
+class ConditionalGetTests(HouseAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='etag', email='etag@example.com', password='etag')
+        cls.district = District.objects.create(name='Faro')
+        House.objects.create(
+            name='Moradia T3', zone='Loulé', price=1500, url='https://example.com/e1', bedrooms='T3', area=150,
+            description='', source='era', scraped_at=timezone.now(), house_id='etag-1', district=cls.district,
+        )
+        bump_data_version()
+
+    def test_not_modified_without_running_the_view(self):
+        client = APIClient()
+        response = client.get('/api/houses/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', response)
+        # Only the version lookup: no page query, no serialisation
+        with self.assertNumQueries(1):
+            not_modified = client.get('/api/houses/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b'')
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+        since = client.get('/api/houses/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(since.status_code, 304)
+        # Other parameters are another representation
+        self.assertNotEqual(client.get('/api/houses/', {'source': 'era'})['ETag'], response['ETag'])
+
+    def test_etag_follows_data_and_user_versions(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        etag = client.get('/api/houses/etag-1/')['ETag']
+        client.post('/api/houses/etag-1/toggle_favorite/')
+        self.assertEqual(client.get('/api/houses/etag-1/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        etag = client.get('/api/houses/stats/')['ETag']
+        bump_data_version()
+        self.assertEqual(client.get('/api/houses/stats/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_api_writes_change_the_etag(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        list_etag = client.get('/api/houses/')['ETag']
+        detail_etag = client.get('/api/houses/etag-1/')['ETag']
+        client.patch('/api/houses/etag-1/', {'price': '1400.00'}, format='json')
+        response = client.get('/api/houses/', HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], list_etag)
+        self.assertEqual(response.data['results'][0]['price'], '1400.00')
+        response = client.get('/api/houses/etag-1/', HTTP_IF_NONE_MATCH=detail_etag)
+        self.assertEqual((response.status_code, response.data['price']), (200, '1400.00'))
+
+        list_etag = client.get('/api/houses/')['ETag']
+        client.delete('/api/houses/etag-1/')
+        response = client.get('/api/houses/', HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual((response.status_code, response.data['results']), (200, []))
+        self.assertNotEqual(response['ETag'], list_etag)
+
+    def test_locations(self):
+        client = APIClient()
+        etag = client.get('/api/districts/')['ETag']
+        self.assertEqual(client.get('/api/districts/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # A scrape run doesn't change the location tree, but does change a location's houses
+        houses_etag = client.get(f'/api/districts/{self.district.id}/houses/')['ETag']
+        bump_data_version()
+        self.assertEqual(client.get('/api/districts/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(
+            client.get(f'/api/districts/{self.district.id}/houses/', HTTP_IF_NONE_MATCH=houses_etag).status_code, 200
+        )
+        bump_locations_version()
+        self.assertEqual(client.get('/api/districts/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_main_runs(self):
+        client = APIClient()
+        run = MainRun.objects.create(status='running')
+        scraper_run = ScraperRun.objects.create(main_run=run, scraper='era', status='running')
+        response = client.get('/api/main-runs/')
+        self.assertNotIn('Last-Modified', response)
+        self.assertEqual(client.get('/api/main-runs/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        ScraperRun.objects.filter(pk=scraper_run.pk).update(total_houses=25)
+        self.assertEqual(client.get('/api/main-runs/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+        MainRun.objects.filter(pk=run.pk).update(status='completed', end_time=timezone.now())
+        self.assertIn('Last-Modified', client.get('/api/main-runs/'))
+
+
+class MarketStatsTests(HouseAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.lisboa = District.objects.create(name='Lisboa')
+        cls.porto = District.objects.create(name='Porto')
+        now = timezone.now()
+        listings = [
+            (cls.lisboa, 'idealista', 'T1', 1000, 50), (cls.lisboa, 'idealista', 'T2', 1400, 70),
+            (cls.lisboa, 'era', 'T2', 1800, 90), (cls.lisboa, 'era', 'T2', 2200, None),
+            (cls.porto, 'era', 'T2', 900, 60),
+        ]
+        for i, (district, source, bedrooms, price, area) in enumerate(listings):
+            House.objects.create(
+                name=f'Apartamento {bedrooms}', zone='', price=price, url=f'https://example.com/m{i}',
+                bedrooms=bedrooms, area=area or 0, description='', source=source, scraped_at=now,
+                house_id=f'market-{i}', district=district, bedrooms_num=int(bedrooms[1:]),
+                price_per_m2=Decimal(price) / area if area else None,
+            )
+        House.objects.create(
+            name='Gone', zone='', price=99999, url='https://example.com/gone', bedrooms='T2', area=1,
+            description='', source='era', scraped_at=now, house_id='market-gone', district=cls.lisboa,
+            is_active=False,
+        )
+
+    def get(self, params):
+        return APIClient().get('/api/market-stats/', params).json()
+
+    def test_aggregates(self):
+        refresh_market_stats()
+        [lisboa] = self.get({'location': self.lisboa.id})
+        self.assertEqual(lisboa['count'], 4)
+        self.assertEqual(Decimal(lisboa['price_mean']), Decimal('1600.00'))
+        self.assertEqual(Decimal(lisboa['price_median']), Decimal('1600.00'))
+        self.assertEqual(Decimal(lisboa['price_p10']), Decimal('1120.00'))
+        self.assertEqual(Decimal(lisboa['price_p90']), Decimal('2080.00'))
+        self.assertEqual(Decimal(lisboa['price_per_m2_median']), Decimal('20.00'))
+
+        [t2_era] = self.get({'location': self.lisboa.id, 'bedrooms': 2, 'source': 'era'})
+        self.assertEqual((t2_era['count'], Decimal(t2_era['price_median'])), (2, Decimal('2000.00')))
+        self.assertEqual([row['location_name'] for row in self.get({})], ['Lisboa', 'Porto'])
+        [country] = self.get({'level': 'country'})
+        self.assertEqual(country['count'], 5)
+
+    def test_snapshots(self):
+        refresh_market_stats(snapshots=True)
+        House.objects.filter(house_id='market-4').update(price=1100)
+        refresh_market_stats(snapshots=True)
+        history = self.get({'location': self.porto.id, 'history': 'true'})
+        self.assertEqual([Decimal(row['price_median']) for row in history], [Decimal('900.00'), Decimal('1100.00')])
+        self.assertEqual(len(self.get({'location': self.porto.id})), 1)
+        refresh_market_stats(snapshots=False)
+        self.assertEqual(len(self.get({'location': self.porto.id, 'history': 'true'})), 2)
+
+    def test_snapshot_retention(self):
+        now = timezone.now()
+        refresh_market_stats(snapshots=True, now=now - timedelta(days=40))
+        refresh_market_stats(snapshots=True, now=now - timedelta(days=20))
+        refresh_market_stats(snapshots=True, now=now, retention_days=30)
+        history = self.get({'location': self.porto.id, 'history': 'true'})
+        self.assertEqual(len(history), 2)
+        refresh_market_stats(snapshots=True, now=now, retention_days=None)
+        self.assertEqual(len(self.get({'location': self.porto.id, 'history': 'true'})), 3)
+
+    def test_served_in_constant_queries(self):
+        refresh_market_stats()
+        # data version (ETag), statistics rows
+        with self.assertNumQueries(2):
+            APIClient().get('/api/market-stats/', {'level': 'parish'})
+
+
+class RenderingAndCompressionTests(HouseAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        for i in range(20):
+            House.objects.create(
+                name=f'Apartamento T1 {i}', zone='Arroios', price=Decimal('1000.50') + i, url=f'https://example.com/z{i}',
+                bedrooms='T1', area=50, description='Luminoso com varanda \u2028 e vista rio. ' * 5, source='era',
+                scraped_at=now - timedelta(minutes=i), house_id=f'zip-{i}',
+            )
+
+    def test_orjson_matches_json_renderer(self):
+        data = {
+            'decimal': Decimal('1.50'), 'when': timezone.now(), 'day': timezone.now().date(),
+            'lazy': _('Houses'), 1: ['á', '\u2028'], 'nested': {'none': None, 'float': 0.1},
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        page = APIClient().get('/api/houses/', {'expand': 'description'})
+        self.assertEqual(page.content, JSONRenderer().render(json.loads(page.content)))
+        self.assertIn(b'\\u2028', page.content)
+
+    def test_negotiation(self):
+        self.assertEqual(negotiate_encoding('gzip, deflate'), 'gzip')
+        self.assertEqual(negotiate_encoding('gzip;q=0, identity'), None)
+        self.assertEqual(negotiate_encoding('*'), negotiate_encoding('br, gzip'))
+        self.assertEqual(negotiate_encoding('br;q=0.5, gzip;q=0.8'), 'gzip')
+        self.assertEqual(negotiate_encoding(''), None)
+
+    def test_large_responses_are_compressed(self):
+        client = APIClient()
+        response = client.get('/api/houses/', {'page_size': 20}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))['results']), 20)
+        # The weakened ETag still validates the cached copy
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        self.assertEqual(
+            client.get('/api/houses/', {'page_size': 20}, HTTP_ACCEPT_ENCODING='gzip',
+                       HTTP_IF_NONE_MATCH=response['ETag']).status_code,
+            304
+        )
+        self.assertFalse(client.get('/api/houses/', {'page_size': 20}).has_header('Content-Encoding'))
+
+    def test_small_responses_are_not_compressed(self):
+        response = APIClient().get('/api/houses/', {'fields': 'house_id', 'page_size': 1}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+class DeltaSyncTests(HouseAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='sync', email='sync@example.com', password='sync')
+        cls.other = get_user_model().objects.create_user(username='sync2', email='sync2@example.com', password='sync')
+        for i in range(4):
+            cls.create_house(i)
+
+    @staticmethod
+    def create_house(i, **fields):
+        return House.objects.create(**{
+            'name': f'Apartamento T2 {i}', 'zone': 'Bonfim', 'price': 900, 'url': f'https://example.com/s{i}',
+            'bedrooms': 'T2', 'area': 70, 'description': '', 'source': 'era', 'scraped_at': timezone.now(),
+            'house_id': f'sync-{i}', **fields,
+        })
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sync(self, token, **params):
+        response = self.client.get('/api/houses/sync/', {'since': token, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_changes_since_token(self):
+        start = self.client.get('/api/houses/sync/').json()
+        self.assertTrue(start['reset'])
+        self.assertEqual(self.sync(start['token'])['houses'], [])
+
+        now = timezone.now()
+        House.objects.filter(house_id='sync-0').update(price=850)
+        House.objects.filter(house_id='sync-1').update(is_active=False)
+        House.objects.filter(house_id='sync-2').delete()
+        # Marking listings as seen changes nothing the API serves
+        House.objects.update(last_seen_at=now, is_active=True)
+        House.objects.filter(house_id='sync-1').update(is_active=False)
+        self.create_house(9)
+        self.client.post('/api/houses/sync-3/toggle_favorite/')
+        self.client.force_authenticate(self.other)
+        self.client.post('/api/houses/sync-3/toggle_discarded/')
+        self.client.force_authenticate(self.user)
+
+        changes = self.sync(start['token'])
+        self.assertFalse(changes['reset'] or changes['more'])
+        self.assertEqual([house['house_id'] for house in changes['houses']], ['sync-0', 'sync-9'])
+        self.assertEqual(changes['houses'][0]['price'], '850.00')
+        self.assertEqual(changes['removed'], ['sync-1', 'sync-2'])
+        self.assertEqual(changes['flags'], [
+            {'house_id': 'sync-3', 'is_favorite': True, 'is_contacted': False, 'is_discarded': False}
+        ])
+        # Nothing new: the other user's change is skipped, the token stays valid
+        self.assertEqual(self.sync(changes['token'])['houses'], [])
+        self.assertEqual(self.sync(changes['token'])['token'], changes['token'])
+
+    def test_batches(self):
+        token = self.client.get('/api/houses/sync/').json()['token']
+        for i in range(10, 15):
+            self.create_house(i)
+        seen = []
+        while True:
+            changes = self.sync(token, limit=2)
+            seen += [house['house_id'] for house in changes['houses']]
+            token = changes['token']
+            if not changes['more']:
+                break
+        self.assertEqual(seen, [f'sync-{i}' for i in range(10, 15)])
+
+    def test_catch_up_cost_follows_changes(self):
+        token = self.client.get('/api/houses/sync/').json()['token']
+        for i in range(10, 40):
+            self.create_house(i)
+        # data versions and log head (ETag), log bounds, listing changes, flag changes, houses
+        with self.assertNumQueries(7):
+            self.assertEqual(len(self.sync(token, limit=25)['houses']), 25)
+        # Both reads of the log are ranges of the (user, id) index
+        for queryset in (HouseChange.objects.filter(user__isnull=True, id__gt=3),
+                         HouseChange.objects.filter(user=self.user, id__gt=3)):
+            plan = queryset.order_by('id')[:26].explain()
+            self.assertIn('house_changes_user_seq_idx', plan)
+            self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_expired_and_invalid_tokens(self):
+        token = self.client.get('/api/houses/sync/').json()['token']
+        self.create_house(20)
+        self.create_house(21)
+        HouseChange.objects.update(changed_at=timezone.now() - timedelta(days=90))
+        self.assertGreater(prune_change_log(), 0)
+        # The last change is kept, so tokens issued now stay valid
+        self.assertEqual(HouseChange.objects.count(), 1)
+        self.assertTrue(self.sync(token)['reset'])
+        current = self.client.get('/api/houses/sync/').json()['token']
+        self.assertFalse(self.sync(current)['reset'])
+        self.assertEqual(self.client.get('/api/houses/sync/', {'since': 'garbage'}).status_code, 400)
+
+    def test_not_modified_until_a_change(self):
+        token = self.client.get('/api/houses/sync/').json()['token']
+        etag = self.client.get('/api/houses/sync/', {'since': token})['ETag']
+        self.assertEqual(self.client.get('/api/houses/sync/', {'since': token}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # Written by a scraper mid-run: no data version bump yet
+        House.objects.filter(house_id='sync-0').update(price=800)
+        self.assertEqual(self.client.get('/api/houses/sync/', {'since': token}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class HouseActionBatchTests(HouseAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='swipe', email='swipe@example.com', password='swipe')
+        for i in range(30):
+            house = House.objects.create(
+                name=f'Apartamento T1 {i}', zone='Arroios', price=1000, url=f'https://example.com/a{i}', bedrooms='T1',
+                area=50, description='', source='era', scraped_at=timezone.now(), house_id=f'swipe-{i}',
+            )
+            if i < 2:
+                set_house_flags(cls.user, {house.pk: {'favorite': True}})
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, operations):
+        return self.client.post('/api/houses/actions/', {'operations': operations}, format='json')
+
+    def test_applies_operations_in_constant_queries(self):
+        operations = [{'house_id': f'swipe-{i}', 'action': 'discarded', 'state': True} for i in range(2, 30)]
+        operations += [
+            {'house_id': 'swipe-0', 'action': 'favorite', 'state': False},
+            {'house_id': 'swipe-1', 'action': 'favorite', 'state': True},  # Already set
+            {'house_id': 'swipe-2', 'action': 'contacted', 'state': True},
+            {'house_id': 'swipe-2', 'action': 'discarded', 'state': False},  # Last one wins
+            {'house_id': 'gone', 'action': 'favorite', 'state': True},
+        ]
+        # houses, transaction (savepoint, release), missing states insert, one update per flag set or
+        # cleared (5), empty states delete, user version bump (savepoint, update, release), states
+        with self.assertNumQueries(14):
+            response = self.post(operations)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['not_found'], ['gone'])
+        states = {row['house_id']: row for row in data['results']}
+        self.assertEqual(len(states), 30)
+        self.assertEqual(states['swipe-0']['is_favorite'], False)
+        self.assertEqual(states['swipe-1']['is_favorite'], True)
+        self.assertEqual((states['swipe-2']['is_contacted'], states['swipe-2']['is_discarded']), (True, False))
+        states = self.user.house_states
+        self.assertEqual(states.filter(discarded_at__isnull=False).count(), 27)
+        self.assertEqual(list(states.filter(favorited_at__isnull=False).values_list('house__house_id', flat=True)),
+                         ['swipe-1'])
+        # Replaying the batch changes nothing, cleared flags leave no empty rows behind
+        self.post(operations)
+        self.assertEqual(states.filter(discarded_at__isnull=False).count(), 27)
+        self.assertEqual(states.count(), 29)
+
+    def test_invalidates_the_users_cached_list(self):
+        self.assertEqual(len(self.client.get('/api/houses/', {'page_size': 50}).json()['results']), 30)
+        self.post([{'house_id': 'swipe-5', 'action': 'discarded', 'state': True}])
+        self.assertEqual(len(self.client.get('/api/houses/', {'page_size': 50}).json()['results']), 29)
+
+    def test_validation(self):
+        self.assertEqual(self.post([]).status_code, 400)
+        self.assertEqual(self.post([{'house_id': 'swipe-0', 'action': 'liked', 'state': True}]).status_code, 400)
+        anonymous = APIClient().post('/api/houses/actions/', {'operations': []}, format='json')
+        self.assertEqual(anonymous.status_code, 401)
+
+
+class UserHouseStateTests(HouseAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='state', email='state@example.com', password='state')
+        cls.houses = [
+            House.objects.create(
+                name=f'Moradia T3 {i}', zone='Loulé', price=1500, url=f'https://example.com/st{i}', bedrooms='T3',
+                area=150, description='', source='era', scraped_at=timezone.now() - timedelta(days=400),
+                house_id=f'state-{i}', is_active=i != 2,
+            )
+            for i in range(4)
+        ]
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def house_ids(self, **params):
+        response = self.client.get('/api/houses/', {'fields': 'house_id', **params})
+        return sorted(house['house_id'] for house in response.json()['results'])
+
+    def test_toggles_and_user_lists(self):
+        self.assertTrue(self.client.post('/api/houses/state-0/toggle_favorite/').json()['is_favorite'])
+        self.assertTrue(self.client.post('/api/houses/state-2/toggle_favorite/').json()['is_favorite'])
+        self.assertTrue(self.client.post('/api/houses/state-1/toggle_discarded/').json()['is_discarded'])
+        self.assertTrue(self.client.post('/api/houses/state-3/toggle_contacted/').json()['is_contacted'])
+        # Favourites keep listings that went offline, discarded houses leave the feed
+        self.assertEqual(self.house_ids(favorites='true'), ['state-0', 'state-2'])
+        self.assertEqual(self.house_ids(contacted='true'), ['state-3'])
+        self.assertEqual(self.house_ids(), ['state-0', 'state-3'])
+        state = self.user.house_states.get(house__house_id='state-0')
+        self.assertIsNotNone(state.favorited_at)
+
+        self.assertFalse(self.client.post('/api/houses/state-1/toggle_discarded/').json()['is_discarded'])
+        self.assertEqual(self.house_ids(), ['state-0', 'state-1', 'state-3'])
+        self.assertFalse(self.user.house_states.filter(house__house_id='state-1').exists())
+
+    def test_flagged_houses_are_not_archived(self):
+        set_house_flags(self.user, {self.houses[0].pk: {'favorite': True}, self.houses[1].pk: {'discarded': True}})
+        self.assertEqual(sorted(archivable_houses().values_list('house_id', flat=True)), ['state-1', 'state-2', 'state-3'])
+
+    def test_user_flags_are_one_join(self):
+        set_house_flags(self.user, {self.houses[0].pk: {'favorite': True}})
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/houses/')
+        [page] = [query['sql'] for query in queries if 'FROM "houses"' in query['sql']]
+        self.assertEqual(page.count('user_house_states'), 2)  # the flags join and the discarded anti-join
+
+
+class ExportTests(HouseAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='export', email='export@example.com', password='export')
+        district = District.objects.create(name='Porto')
+        county = County.objects.create(name='Porto', district=district)
+        cls.houses = [
+            House.objects.create(
+                name=f'Apartamento T1, "{i}"', zone='Bonfim', price=Decimal('750.50') + i, url=f'https://example.com/e{i}',
+                bedrooms='T1', area=45, description='Linha um\nlinha dois', source='era' if i % 2 else 'idealista',
+                scraped_at=timezone.now(), house_id=f'export-{i}', is_active=i != 4, county=county, district=district,
+            )
+            for i in range(6)
+        ]
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_requires_authentication(self):
+        self.assertEqual(APIClient().get('/api/houses/export/csv/').status_code, 401)
+
+    def test_csv_is_streamed_with_the_list_filters(self):
+        set_house_flags(self.user, {self.houses[1].pk: {'discarded': True}})
+        response = self.client.get('/api/houses/export/csv/')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('attachment; filename="houses-', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode('utf-8'))))
+        # Inactive and discarded houses are left out, like in the feed
+        self.assertEqual([row['house_id'] for row in rows], ['export-0', 'export-2', 'export-3', 'export-5'])
+        self.assertEqual(rows[0]['name'], 'Apartamento T1, "0"')
+        self.assertEqual(rows[0]['description'], 'Linha um\nlinha dois')
+        self.assertEqual(rows[0]['price'], '750.50')
+        self.assertEqual(rows[0]['district_name'], 'Porto')
+        self.assertEqual(rows[0]['parish_name'], '')
+
+        response = self.client.get('/api/houses/export/csv/', {'source': 'era', 'include_inactive': 'true'})
+        rows = csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode('utf-8')))
+        self.assertEqual([row['house_id'] for row in rows], ['export-3', 'export-5'])
+
+    def test_asgi_export_is_streamed_asynchronously(self):
+        authorization = {'Authorization': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+
+        async def export():
+            response = await self.async_client.get('/api/houses/export/csv/', headers=authorization)
+            self.assertTrue(response.is_async)  # A sync iterator would be read to the end before sending
+            return b''.join([chunk async for chunk in response.streaming_content])
+
+        rows = csv.DictReader(io.StringIO(async_to_sync(export)().decode('utf-8')))
+        self.assertEqual([row['house_id'] for row in rows], ['export-0', 'export-1', 'export-2', 'export-3', 'export-5'])
+
+    def test_ndjson(self):
+        response = self.client.get('/api/houses/export/ndjson/', {'source': 'idealista'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['house_id'] for row in rows], ['export-0', 'export-2'])
+        self.assertEqual(rows[1]['price'], 752.5)
+        self.assertTrue(rows[1]['scraped_at'].endswith('Z'))
+        self.assertEqual(self.client.get('/api/houses/export/xml/').status_code, 404)
+
+    def test_rows_are_read_in_chunks_by_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            chunks = list(csv_stream(export_rows(House.objects.all(), chunk_size=2)))
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(b''.join(chunks).decode('utf-8').count('export-'), 6)
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'houses.ndjson')
+            call_command('export_houses', output, '--all', '--chunk-size', '2', stdout=io.StringIO())
+            with open(output, 'rb') as f:
+                self.assertEqual(len(f.read().splitlines()), 6)
+            self.assertEqual(os.listdir(directory), ['houses.ndjson'])
+            with self.assertRaises(CommandError):
+                call_command('export_houses', os.path.join(directory, 'houses.txt'), stdout=io.StringIO())
+
+    @skipUnless(pyarrow, 'pyarrow is not installed')
+    def test_parquet_row_groups(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'houses.parquet')
+            call_command('export_houses', output, '--row-group-size', '2', stdout=io.StringIO())
+            parquet = pyarrow.parquet.ParquetFile(output)
+            self.assertEqual(parquet.metadata.num_rows, 5)
+            self.assertEqual(parquet.metadata.num_row_groups, 3)
+            self.assertEqual(parquet.schema_arrow.field('price').type, pyarrow.float64())
+
+
+class LocationTreeTests(HouseAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for district_name, counties in [('Porto', ['Porto', 'Gaia']), ('Faro', ['Loulé'])]:
+            district = District.objects.create(name=district_name)
+            for county_name in counties:
+                county = County.objects.create(name=county_name, district=district)
+                for parish_name in ['Bonfim', 'Almancil', 'Centro']:
+                    Parish.objects.create(name=f'{parish_name} ({county_name})', county=county)
+
+    def test_tree(self):
+        with CaptureQueriesContext(connection) as queries:
+            tree = APIClient().get('/api/districts/tree/').json()
+        self.assertEqual(len(queries), 4)  # the locations version and one query per level
+        self.assertEqual([district['name'] for district in tree], ['Faro', 'Porto'])
+        porto = tree[1]
+        self.assertEqual([county['name'] for county in porto['counties']], ['Gaia', 'Porto'])
+        self.assertEqual(
+            [parish['name'] for parish in porto['counties'][0]['parishes']],
+            ['Almancil (Gaia)', 'Bonfim (Gaia)', 'Centro (Gaia)']
+        )
+        self.assertEqual(set(porto['counties'][0]['parishes'][0]), {'id', 'name'})
+
+    def test_cached_until_locations_change(self):
+        client = APIClient()
+        first = client.get('/api/districts/tree/')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(client.get('/api/districts/tree/').json(), first.json())
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(client.get('/api/districts/tree/', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        District.objects.create(name='Braga')
+        bump_locations_version()
+        second = client.get('/api/districts/tree/')
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual([district['name'] for district in second.json()], ['Braga', 'Faro', 'Porto'])
+
+    def test_parish_list_queries(self):
+        porto = District.objects.get(name='Porto')
+        with self.assertNumQueries(2):  # the locations version and the parishes with their county and district
+            parishes = APIClient().get('/api/parishes/', {'district': porto.pk}).json()
+        self.assertEqual(len(parishes), 6)
+        self.assertEqual(parishes[0]['county']['district']['name'], 'Porto')
+
+
+class AsyncViewTests(HouseAPITestCase):
+    """The async views of the ASGI deployment (api.asgi_urls) answer like the sync ones"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='async', email='async@example.com', password='async')
+        district = District.objects.create(name='Lisboa')
+        cls.county = County.objects.create(name='Lisboa', district=district)
+        parish = Parish.objects.create(name='Arroios', county=cls.county)
+        cls.houses = [
+            House.objects.create(
+                name=f'Apartamento T{i}', zone='Arroios', price=900 + i, url=f'https://example.com/as{i}',
+                bedrooms=f'T{i}', area=60, description='Perto do metro', source='era', scraped_at=timezone.now() - timedelta(hours=i),
+                house_id=f'async-{i}', parish=parish, county=cls.county, district=district,
+            )
+            for i in range(3)
+        ]
+        Photo.objects.create(house=cls.houses[0], image_url='https://img.example.com/async-0.jpg', order=0)
+        set_house_flags(cls.user, {cls.houses[1].pk: {'favorite': True}})
+        cls.authorization = {'Authorization': f'Bearer {RefreshToken.for_user(cls.user).access_token}'}
+
+    def get(self, path, params=None, asgi=False, **headers):
+        if not asgi:
+            return APIClient().get(path, params, headers=headers)
+        with override_settings(ROOT_URLCONF='api.asgi_urls'):
+            return async_to_sync(self.async_client.get)(path, params, headers=headers)
+
+    def test_async_routes(self):
+        self.assertTrue(asyncio.iscoroutinefunction(resolve('/api/houses/', urlconf='api.asgi_urls').func))
+        self.assertTrue(asyncio.iscoroutinefunction(resolve('/api/districts/tree/', urlconf='api.asgi_urls').func))
+        self.assertFalse(asyncio.iscoroutinefunction(resolve('/api/houses/', urlconf='api.urls').func))
+
+    def test_same_responses_as_sync_views(self):
+        requests = [
+            ('/api/houses/', None), ('/api/houses/', {'page_size': 1, 'count': 'true', 'expand': 'photos'}),
+            ('/api/houses/', {'ordering': 'name', 'fields': 'house_id,is_favorite'}), ('/api/houses/async-0/', None),
+            ('/api/houses/stats/', None), ('/api/districts/', None), ('/api/districts/tree/', None),
+            ('/api/counties/', None), (f'/api/counties/{self.county.pk}/', None),
+            ('/api/parishes/', {'county': self.county.pk}),
+        ]
+        for headers in [{}, self.authorization]:
+            for path, params in requests:
+                with self.subTest(path=path, params=params, authenticated=bool(headers)):
+                    sync_response = self.get(path, params, **headers)
+                    async_response = self.get(path, params, asgi=True, **headers)
+                    self.assertEqual(async_response.status_code, 200)
+                    self.assertEqual(async_response.json(), sync_response.json())
+                    self.assertEqual(async_response['ETag'], sync_response['ETag'])
+                    self.assertEqual(async_response['Content-Type'], sync_response['Content-Type'])
+                    conditional = {'If-None-Match': async_response['ETag'], **headers}
+                    self.assertEqual(self.get(path, params, asgi=True, **conditional).status_code, 304)
+        favorites = self.get('/api/houses/', {'favorites': 'true'}, asgi=True, **self.authorization).json()['results']
+        self.assertEqual([house['house_id'] for house in favorites], ['async-1'])
+
+    def test_response_cache(self):
+        self.assertEqual(self.get('/api/houses/', asgi=True)['X-Cache'], 'MISS')
+        self.assertEqual(self.get('/api/houses/', asgi=True)['X-Cache'], 'HIT')
+        self.assertEqual(self.get('/api/houses/', asgi=True, **self.authorization)['X-Cache'], 'MISS')
+
+    def test_errors(self):
+        self.assertEqual(self.get('/api/houses/missing/', asgi=True).status_code, 404)
+        self.assertEqual(self.get('/api/houses/', {'cursor': 'nope'}, asgi=True).status_code, 404)
+        response = self.get('/api/houses/', asgi=True, Authorization='Bearer nope')
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('WWW-Authenticate', response)
+
+    def test_other_requests_use_the_sync_views(self):
+        with override_settings(ROOT_URLCONF='api.asgi_urls'):
+            post = async_to_sync(self.async_client.post)
+            toggle = post('/api/houses/async-0/toggle_favorite/', headers=self.authorization)
+            self.assertEqual(toggle.json(), {'is_favorite': True})
+            scrapers = post('/api/run-scrapers/', {'listing_type': 'lease'}, content_type='application/json')
+            self.assertEqual(scrapers.status_code, 400)
+        browsable = self.get('/api/houses/', asgi=True, Accept='text/html')
+        self.assertEqual(browsable['Content-Type'], 'text/html; charset=utf-8')
+
+
+class LiveFeedTests(HouseAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.lisboa = District.objects.create(name='Lisboa')
+        cls.porto = District.objects.create(name='Porto')
+        cls.existing = [cls.create_house(i, cls.lisboa) for i in range(3)]
+
+    @staticmethod
+    def create_house(i, district, **fields):
+        return House.objects.create(**{
+            'name': f'Apartamento T2 {i}', 'zone': district.name, 'price': 1000 + i, 'url': f'https://example.com/live{i}',
+            'bedrooms': 'T2', 'area': 70, 'description': 'Novo', 'source': 'era', 'scraped_at': timezone.now(),
+            'house_id': f'live-{i}', 'district': district, **fields,
+        })
+
+    async def read_events(self, response, count):
+        """The first `count` events of a stream, as (id, house)"""
+        events = []
+
+        async def read():
+            async for chunk in response.streaming_content:
+                if chunk.startswith(b'id: '):
+                    lines = dict(line.split(': ', 1) for line in chunk.decode('utf-8').strip().split('\n'))
+                    self.assertEqual(lines['event'], 'house')
+                    events.append((int(lines['id']), json.loads(lines['data'])))
+                if len(events) == count:
+                    return
+
+        try:
+            await asyncio.wait_for(read(), 5)
+        finally:
+            await response.streaming_content.aclose()
+        return events
+
+    async def test_new_houses_are_pushed_to_matching_subscribers(self):
+        response = await self.async_client.get('/api/houses/live/', {'district': self.lisboa.pk, 'max_price': 2000})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(len(live_feed.subscriptions), 1)
+
+        create = sync_to_async(self.create_house)
+        await create(10, self.porto)
+        await create(11, self.lisboa, price=2500)
+        await create(12, self.lisboa, is_room_rental=True)
+        house = await create(13, self.lisboa)
+        live_feed.notify()
+
+        [(event_id, data)] = await self.read_events(response, 1)
+        self.assertEqual(event_id, house.pk)
+        self.assertEqual(data['house_id'], 'live-13')
+        self.assertEqual(data['district_name'], 'Lisboa')
+        self.assertNotIn('is_favorite', data)
+
+    async def test_resume_from_last_event_id(self):
+        response = await self.async_client.get(
+            '/api/houses/live/', headers={'Last-Event-ID': str(self.existing[0].pk)}
+        )
+        events = await self.read_events(response, 2)
+        self.assertEqual([event_id for event_id, _ in events], [house.pk for house in self.existing[1:]])
+
+    def test_needs_asgi(self):
+        self.assertEqual(APIClient().get('/api/houses/live/').status_code, 501)
+
+
+class PurgeTests(HouseAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = get_user_model().objects.create_user(
+            username='staff', email='staff@example.com', password='staff', is_staff=True
+        )
+        user = get_user_model().objects.create_user(username='purge', email='purge@example.com', password='purge')
+        cls.user = user
+        for i in range(12):
+            house = House.objects.create(
+                name=f'Apartamento T1 {i}', zone='Arroios', price=1000, url=f'https://example.com/p{i}', bedrooms='T1',
+                area=50, description='', source='remax' if i % 3 == 0 else 'era', scraped_at=timezone.now(),
+                house_id=f'purge-{i}',
+            )
+            Photo.objects.create(house=house, image_url=f'https://example.com/p{i}.jpg')
+            PriceHistory.objects.create(
+                house=house, name=house.name, price=1100, area=50, bedrooms='T1', recorded_at=timezone.now()
+            )
+            set_house_flags(user, {house.pk: {'favorite': True}})
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def start(self, path, data=None):
+        """POST a purge, returns (response, the purge job id) without starting the background thread"""
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(path, data or {}, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(len(callbacks), 1)
+        return response, response.json()['job']['id']
+
+    def test_delete_all_in_batches_without_loading_rows(self):
+        response, job_id = self.start('/api/houses/delete_all/')
+        self.assertEqual(response.json()['job']['status'], 'queued')
+        self.assertEqual(House.objects.count(), 12)  # Left to the job
+        PurgeJob.objects.filter(pk=job_id).update(batch_size=5)
+
+        progress = []
+        with CaptureQueriesContext(connection) as queries:
+            job = run_purge_job(job_id, progress=lambda job: progress.append(job.deleted_houses))
+        self.assertEqual(progress, [5, 10, 12])
+        self.assertEqual((job.status, job.total_houses, job.deleted_houses), ('completed', 12, 12))
+        for model in (House, Photo, PriceHistory, UserHouseState):
+            self.assertFalse(model.objects.exists(), model)
+        # Set-based deletes: only the primary keys of each batch are read
+        selects = [query['sql'] for query in queries if query['sql'].startswith('SELECT')]
+        self.assertFalse([sql for sql in selects if 'houses_photo' in sql or 'user_house_states' in sql])
+
+        data = self.client.get(f'/api/purge-jobs/{job_id}/').json()
+        self.assertEqual((data['status'], data['deleted_houses'], data['progress']), ('completed', 12, 1.0))
+
+    def test_purge_by_filter(self):
+        _, job_id = self.start('/api/houses/purge/', {'source': 'remax', 'batch_size': 2})
+        job = run_purge_job(job_id)
+        self.assertEqual((job.filters, job.deleted_houses), ({'source': 'remax'}, 4))
+        self.assertFalse(House.objects.filter(source='remax').exists())
+        self.assertEqual(Photo.objects.count(), 8)
+        self.assertEqual(HouseChange.objects.filter(house_id='purge-0', user=None).count(), 2)  # Insert and delete
+
+    def test_staff_only(self):
+        job = PurgeJob.objects.create(filters={}, batch_size=10)
+        requests = [
+            ('post', '/api/houses/delete_all/'), ('post', '/api/houses/purge/'),
+            ('get', '/api/purge-jobs/'), ('get', f'/api/purge-jobs/{job.pk}/'),
+        ]
+        user_client = APIClient()
+        user_client.force_authenticate(self.user)
+        for method, path in requests:
+            with self.subTest(path=path):
+                self.assertEqual(getattr(APIClient(), method)(path, {'source': 'era'}, format='json').status_code, 401)
+                self.assertEqual(getattr(user_client, method)(path, {'source': 'era'}, format='json').status_code, 403)
+        self.assertEqual(PurgeJob.objects.count(), 1)
+        self.assertEqual(House.objects.count(), 12)
+
+    def test_purge_needs_a_filter(self):
+        self.assertEqual(self.client.post('/api/houses/purge/', {}, format='json').status_code, 400)
+        response = self.client.post('/api/houses/purge/', {'inactive': False}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(PurgeJob.objects.exists())
+
+    def test_command(self):
+        with self.assertRaises(CommandError):
+            call_command('purge_houses', stdout=io.StringIO())
+        out = io.StringIO()
+        call_command('purge_houses', '--source', 'era', '--batch-size', '3', stdout=out)
+        self.assertIn('Deleted 3/8 house(s)...', out.getvalue())
+        self.assertEqual(set(House.objects.values_list('source', flat=True)), {'remax'})
+
+
+class SavedSearchTests(HouseAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.lisboa = District.objects.create(name='Lisboa')
+        cls.porto = District.objects.create(name='Porto')
+        cls.arroios = County.objects.create(name='Arroios', district=cls.lisboa)
+        cls.alice = get_user_model().objects.create_user(username='alice', email='alice@example.com', password='x')
+        cls.bob = get_user_model().objects.create_user(username='bob', email='bob@example.com', password='x')
+        cls.cheap_lisboa = SavedSearch.objects.create(
+            user=cls.alice, name='T2 Lisboa', listing_type='rent', district=cls.lisboa, price_max=1200, min_bedrooms=2
+        )
+        cls.large = SavedSearch.objects.create(user=cls.alice, name='Large', min_area=100)
+        cls.porto_search = SavedSearch.objects.create(user=cls.bob, name='Porto', district=cls.porto)
+        SavedSearch.objects.create(user=cls.bob, name='Paused', is_active=False)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def create_house(self, i, district, price=1000, bedrooms=2, area=80, **fields):
+        return House.objects.create(**{
+            'name': f'Apartamento {i}', 'zone': district.name, 'price': price, 'url': f'https://example.com/s{i}',
+            'bedrooms': f'T{bedrooms}', 'bedrooms_num': bedrooms, 'area': area or 0, 'area_m2': area, 'description': '',
+            'source': 'era', 'scraped_at': timezone.now(), 'house_id': f'saved-{i}', 'district': district, **fields,
+        })
+
+    def test_index_matches_like_the_database(self):
+        rng = random.Random(49)
+        counties = [None, self.arroios.pk]
+        searches = []
+        for _ in range(200):
+            low = rng.choice([None, 500, 800, 1000, 1500])
+            searches.append({
+                'id': len(searches) + 1,
+                'listing_type': rng.choice(['', 'rent', 'buy']),
+                'property_type': rng.choice(['', 'apartment', 'house']),
+                'district_id': rng.choice([None, self.lisboa.pk, self.porto.pk]),
+                'county_id': rng.choice(counties),
+                'parish_id': None,
+                'price_min': None if low is None else Decimal(low),
+                'price_max': rng.choice([None, Decimal(1000), Decimal(2000)]),
+                'min_bedrooms': rng.choice([None, 1, 2, 3]),
+                'max_bedrooms': rng.choice([None, 2, 4]),
+                'min_area': rng.choice([None, Decimal(50), Decimal('80.5')]),
+            })
+        for i in range(60):
+            self.create_house(
+                i, rng.choice([self.lisboa, self.porto]), price=rng.choice([500, 800, 1000, 1200, 2500]),
+                bedrooms=rng.choice([None, 0, 1, 2, 3, 5]), area=rng.choice([None, 40, 80, 80.5, 120]),
+                county=rng.choice([None, self.arroios]), listing_type=rng.choice(['rent', 'buy']),
+                property_type=rng.choice(['apartment', 'house', 'studio']),
+            )
+
+        expected = {}
+        for search in searches:
+            for pk in House.objects.filter(**{
+                f'{field}__{predicate}': search[name] for name, (field, predicate) in SEARCH_CRITERIA.items()
+                if search[name] not in (None, '')
+            }).values_list('pk', flat=True):
+                expected.setdefault(pk, []).append(search['id'])
+        index = SavedSearchIndex(searches)
+        for house in House.objects.values('pk', *HOUSE_FIELDS):
+            self.assertEqual(sorted(index.match(house)), expected.get(house['pk'], []), house)
+
+    def test_new_houses_are_matched_in_constant_queries(self):
+        match_new_houses([self.create_house(0, self.lisboa).pk])  # Builds the index
+        houses = [
+            self.create_house(1, self.lisboa, price=1100, area=120),  # Both of alice's searches
+            self.create_house(2, self.lisboa, price=1500),  # Too expensive
+            self.create_house(3, self.porto, area=90),  # bob's
+            self.create_house(4, self.lisboa, area=150, is_room_rental=True),  # Not in the feed
+        ]
+        # Versions, houses, matches insert
+        with self.assertNumQueries(3):
+            self.assertEqual(match_new_houses([house.pk for house in houses]), 3)
+        self.assertEqual(match_new_houses([houses[0].pk]), 2)  # Already recorded, nothing doubled
+        self.assertEqual(
+            set(SavedSearchMatch.objects.values_list('saved_search__name', 'house__house_id')),
+            {('T2 Lisboa', 'saved-0'), ('T2 Lisboa', 'saved-1'), ('Large', 'saved-1'), ('Porto', 'saved-3')},
+        )
+        self.assertEqual(SavedSearchMatch.objects.filter(notified_at=None).count(), 4)
+
+    def test_api(self):
+        response = self.client.post('/api/saved-searches/', {'name': 'Porto', 'district': self.porto.pk}, format='json')
+        self.assertEqual(response.status_code, 201)
+        search_id = response.json()['id']
+        # The index follows the new search
+        house = self.create_house(1, self.porto, area=120)
+        match_new_houses([house.pk])
+        self.create_house(2, self.lisboa)
+
+        results = self.client.get('/api/saved-searches/matches/').json()['results']
+        self.assertEqual([item['house_id'] for item in results], ['saved-1'])
+        self.assertIn('matched_at', results[0])
+        self.assertEqual(self.client.get(f'/api/saved-searches/{search_id}/matches/').json()['count'], 1)
+        self.assertEqual(self.client.get(f'/api/saved-searches/{self.cheap_lisboa.pk}/matches/').json()['count'], 0)
+
+        self.client.delete(f'/api/saved-searches/{self.large.pk}/')
+        self.assertEqual(self.client.get('/api/saved-searches/matches/').json()['count'], 1)  # Still by the new one
+        self.assertEqual(self.client.get(f'/api/saved-searches/{self.porto_search.pk}/').status_code, 404)
+        self.assertEqual(len(self.client.get('/api/saved-searches/').json()['results']), 2)
+
+    def test_validation(self):
+        response = self.client.post('/api/saved-searches/', {'name': 'x', 'price_min': 900, 'price_max': 800})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.patch(f'/api/saved-searches/{self.cheap_lisboa.pk}/', {'price_min': 1500})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(APIClient().get('/api/saved-searches/').status_code, 401)
+
+
+class LocationResolverTests(TestCase):
+    ZONES = [
+        'Arroios, Lisboa', 'Rua Morais Soares, Arroios, Lisboa', 'Aroios, Lisbo', 'Penha de França', 'Sta Maria Maior',
+        'Parque das Nações - Lisboa', 'Cascais e Estoril, Cascais', 'Carcavelos', 'São Domingos de Rana, Cascais',
+        'Algés, Linda-a-Velha e Cruz Quebrada-Dafundo, Oeiras', 'Mina de Água, Amadora', 'Venteira, Amadora',
+        'Odivelas', 'Sintra', 'Queluz e Belas, Sintra', 'Vila Franca de Xira', 'Ericeira, Mafra', 'Centro, Lisboa',
+        'Campo de Ourique, Lisboa', 'Benfica', 'Alcântara', 'Porto', 'Madrid, Espanha', ',', '',
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('populate_location_data', stdout=io.StringIO())
+        cls.parishes = list(Parish.objects.filter(county__district__name='Lisboa').values_list('id', 'name'))
+        cls.counties = list(County.objects.filter(district__name='Lisboa').values_list('id', 'name'))
+
+    def scan(self, zone):
+        """Every part against every name, like LocationManager before the index"""
+        def first(part, names):
+            for name_id, name in names:
+                if round(fuzz.partial_ratio(part, name)) > 85:
+                    return name_id
+            return None
+
+        parishes = [(name_id, normalize_name(name)) for name_id, name in self.parishes]
+        counties = [(name_id, normalize_name(name)) for name_id, name in self.counties]
+        parish_id = county_id = None
+        for part in zone_parts(zone):
+            parish_id = parish_id or first(part, parishes)
+            county_id = county_id or first(part, counties)
+        return parish_id, county_id
+
+    def test_same_matches_as_scoring_every_name(self):
+        resolver = LocationResolver(self.parishes, self.counties)
+        for zone in self.ZONES:
+            self.assertEqual(resolver.resolve(zone), self.scan(zone), zone)
+        parish_id, county_id = resolver.resolve('Rua Morais Soares, Arroios, Lisboa')
+        self.assertEqual(Parish.objects.get(pk=parish_id).name, 'Arroios')
+        self.assertEqual(County.objects.get(pk=county_id).name, 'Lisboa')
+
+    def test_benchmark_zones_match_the_fuzzywuzzy_scan(self):
+        # Whichever scorer shortlists the names (rapidfuzz when installed), fuzzywuzzy makes the decisions
+        resolver = LocationResolver(self.parishes, self.counties)
+        for zone in benchmark_locations.SAMPLE_ZONES:
+            expected = benchmark_locations.Command._legacy(zone, *self.legacy_names())
+            self.assertEqual(resolver.resolve(zone), expected, f'{zone} ({"rapidfuzz" if process else "fuzzywuzzy"})')
+
+    def legacy_names(self):
+        return [
+            [(name_id, normalize_name(name)) for name_id, name in names] for names in (self.parishes, self.counties)
+        ]
+
+    def test_parts_are_memoised(self):
+        resolver = LocationResolver(self.parishes, self.counties)
+        expected = resolver.resolve('Arroios, Lisboa')
+        self.assertEqual(set(resolver.memo), {'arroios', 'lisboa'})
+        resolver.parishes = resolver.counties = None  # Not consulted again
+        self.assertEqual(resolver.resolve('ARROIOS ,  Lisboa'), expected)
@@ -1,6 +1,9 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import HouseViewSet, DistrictViewSet, CountyViewSet, MainRunViewSet, ParishViewSet
+from .views import (
+    HouseViewSet, DistrictViewSet, CountyViewSet, MainRunViewSet, ParishViewSet, MarketStatViewSet, PurgeJobViewSet,
+    SavedSearchViewSet, house_live_feed
+)
 
 router = DefaultRouter()
 router.register(r'houses', HouseViewSet, basename='house')
@@ -8,8 +11,13 @@ router.register(r'districts', DistrictViewSet, basename='district')
 router.register(r'counties', CountyViewSet, basename='county')
 router.register(r'parishes', ParishViewSet, basename='parish')
 router.register(r'main-runs', MainRunViewSet, basename='mainrun')
+router.register(r'market-stats', MarketStatViewSet, basename='marketstat')
+router.register(r'purge-jobs', PurgeJobViewSet, basename='purgejob')
+router.register(r'saved-searches', SavedSearchViewSet, basename='savedsearch')
 
 urlpatterns = [
+    # Before the router, whose house detail route would take 'live' for a house_id
+    path('houses/live/', house_live_feed, name='house-live'),
     path('', include(router.urls)),
     path('run-scrapers/', HouseViewSet.as_view({'post': 'run_scrapers'}), name='run-scrapers'),
 ] 
\ No newline at end of file
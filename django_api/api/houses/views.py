@@ -1,23 +1,57 @@
 from django.shortcuts import render
-from rest_framework import viewsets, filters, permissions
+from rest_framework import viewsets, filters, permissions, serializers
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from django.conf import settings
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
-from .models import House, MainRun, District, County, Parish
-from .serializers import HouseSerializer, DistrictSerializer, CountySerializer, ParishSerializer, MainRunSerializer
-from .settings import ROOM_RENTAL_TITLE_TERMS
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.db.models import Exists, OuterRef, Avg, Count, Max, Sum, Q
+from .models import (
+    House, MainRun, ScraperRun, District, County, Parish, MarketStat, PurgeJob, SavedSearch,
+    FEED_CONDITION
+)
+from .serializers import (
+    HouseSerializer, DistrictSerializer, CountySerializer, ParishSerializer, MainRunSerializer,
+    PriceHistorySerializer, MarketStatSerializer, HouseActionBatchSerializer, PurgeJobSerializer, PurgeRequestSerializer,
+    SavedSearchSerializer
+)
+from .actions import apply_house_actions, has_flag, toggle_house_flag
+from .pagination import HouseFeedPagination
+from .search import filter_search, rank_search
+from .async_views import AsyncViewSetMixin
+from .cache import (
+    acache_response, arequest_version_state, cache_response, bump_data_version, bump_saved_searches_version,
+    request_version_state, DATA_SCOPE, LOCATIONS_SCOPE
+)
+from .conditional import ConditionalGetMixin
+from .export import EXPORT_FORMATS, aiterate, csv_stream, export_rows, ndjson_stream
+from .live import HEARTBEAT_FRAME, LiveFilter, live_feed, parse_last_event_id
+from .locations import alocation_tree, location_tree
+from .purge import start_purge_job
+from .settings import LIVE_FEED_HEARTBEAT_SECONDS, LIVE_FEED_RETRY_MS, SYNC_BATCH_SIZE, SYNC_MAX_BATCH_SIZE
+from .sync import change_log_available, current_sequence, decode_token, encode_token, read_changes, InvalidToken
+import asyncio
 import json
+import sys
 from pathlib import Path
 from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 
 
-class HouseViewSet(viewsets.ModelViewSet):
+class HouseViewSet(AsyncViewSetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = HouseSerializer
     lookup_field = 'house_id'
     filter_backends = [filters.OrderingFilter]
-    ordering_fields = ['name', 'price', 'area', 'bedrooms', 'zone', 'freguesia', 'concelho', 'source', 'scraped_at']
+    ordering_fields = [
+        'name', 'price', 'area', 'bedrooms', 'zone', 'freguesia', 'concelho', 'source', 'scraped_at',
+        'bedrooms_num', 'area_m2', 'price_per_m2'
+    ]
     ordering = ['-scraped_at']
+    pagination_class = HouseFeedPagination
     # permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
@@ -27,24 +61,28 @@ class HouseViewSet(viewsets.ModelViewSet):
         """
         queryset = House.objects.all()
         
-        # Filter out houses discarded by the current user
-        if self.request.user.is_authenticated:
-            queryset = queryset.exclude(discarded_by=self.request.user)
-        
-        # Filter out room rentals based on title terms
-        room_rental_filter = Q()
-        for term in ROOM_RENTAL_TITLE_TERMS:
-            room_rental_filter |= Q(name__icontains=term)
-        queryset = queryset.exclude(room_rental_filter)
-
         # Handle additional filters
         show_favorites = self.request.query_params.get('favorites', '').lower() == 'true'
         show_contacted = self.request.query_params.get('contacted', '').lower() == 'true'
+        include_inactive = self.request.query_params.get('include_inactive', '').lower() == 'true'
+
+        # Feeds and stats only cover listings that are still online, unless asked otherwise.
+        # Favorites and contacted lists keep gone listings so users don't lose track of them,
+        # and detail/toggle actions must still resolve a house that went offline.
+        if self.action in ('list', 'stats', 'export') and not (include_inactive or show_favorites or show_contacted):
+            queryset = queryset.filter(is_active=True)
+        
+        # Filter out houses discarded by the current user
+        if self.request.user.is_authenticated:
+            queryset = queryset.exclude(has_flag(self.request.user, 'discarded'))
+        
+        # Filter out room rentals (classified once at ingest, see houses.classifier)
+        queryset = queryset.filter(is_room_rental=False)
 
         if show_favorites:
-            queryset = queryset.filter(favorited_by=self.request.user)
+            queryset = queryset.filter(has_flag(self.request.user, 'favorite'))
         if show_contacted:
-            queryset = queryset.filter(contacted_by=self.request.user)
+            queryset = queryset.filter(has_flag(self.request.user, 'contacted'))
         
         # Location filters
         district_id = self.request.query_params.get('district')
@@ -64,40 +102,229 @@ class HouseViewSet(viewsets.ModelViewSet):
         if listing_type:
             queryset = queryset.filter(listing_type=listing_type)
         
-        # Search filter - searches across multiple fields
+        # Numeric filters on the typed columns
+        range_filters = {
+            'min_bedrooms': 'bedrooms_num__gte',
+            'max_bedrooms': 'bedrooms_num__lte',
+            'min_area': 'area_m2__gte',
+            'max_area': 'area_m2__lte',
+            'min_price': 'price__gte',
+            'max_price': 'price__lte',
+            'min_price_per_m2': 'price_per_m2__gte',
+            'max_price_per_m2': 'price_per_m2__lte',
+        }
+        for param, lookup in range_filters.items():
+            value = self.request.query_params.get(param)
+            if value:
+                try:
+                    queryset = queryset.filter(**{lookup: Decimal(value)})
+                except (InvalidOperation, ValueError):
+                    pass
+        property_type = self.request.query_params.get('property_type')
+        if property_type:
+            queryset = queryset.filter(property_type=property_type)
+        
+        # Price drop filter - houses whose price went down since the given date/datetime
+        price_dropped_since = self.request.query_params.get('price_dropped_since')
+        if price_dropped_since:
+            since = parse_datetime(price_dropped_since)
+            if since is None:
+                since_date = parse_date(price_dropped_since)
+                if since_date:
+                    since = datetime.combine(since_date, datetime.min.time())
+            if since is not None:
+                if timezone.is_naive(since):
+                    since = timezone.make_aware(since)
+                queryset = queryset.filter(price_dropped_at__gte=since)
+        
+        # Search filter - name, zone, description and location names, through the full-text index
         search = self.request.query_params.get('search', '').strip()
         if search:
-            search_filter = Q(name__icontains=search) | \
-                          Q(zone__icontains=search) | \
-                          Q(description__icontains=search) | \
-                          Q(parish__name__icontains=search) | \
-                          Q(county__name__icontains=search) | \
-                          Q(district__name__icontains=search)
-            queryset = queryset.filter(search_filter)
+            queryset = filter_search(queryset, search)
         
+        # Collapse the same flat listed on several portals into a single result (the earliest listing)
+        if self.request.query_params.get('collapse', '').lower() == 'group':
+            earlier_in_group = queryset.filter(
+                listing_group=OuterRef('listing_group'),
+                id__lt=OuterRef('id')
+            )
+            queryset = queryset.exclude(Exists(earlier_in_group))
+        
+        if self.action == 'export':
+            return queryset  # Exported as rows, see houses.export
+        fields, full_description = self.get_representation()
+        return HouseSerializer.setup_eager_loading(queryset, self.request.user, fields, full_description)
+
+    def get_representation(self):
+        """
+        Fields serialised for this request, from the fields= and expand= parameters.
+        The list defaults to the lightweight representation, the other actions to the full one.
+        """
+        if not hasattr(self, '_representation'):
+            self._representation = HouseSerializer.representation(
+                self.request.query_params.get('fields'),
+                self.request.query_params.get('expand'),
+                default=HouseSerializer.Meta.list_fields if self.action in ('list', 'sync') else None,
+            )
+        return self._representation
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'], context['full_description'] = self.get_representation()
+        return context
+
+    # Writes through the API change the feed: new versions for the cached responses and the ETags
+    def perform_create(self, serializer):
+        serializer.save()
+        bump_data_version()
+
+    def perform_update(self, serializer):
+        serializer.save()
+        bump_data_version()
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        bump_data_version()
+
+    def get_validators(self, request):
+        state, last_modified = super().get_validators(request)
+        if self.action == 'sync':
+            # The change log grows during a run, before the data version is bumped at its end
+            return [state, current_sequence()], None
+        return state, last_modified
+
+    @cache_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @acache_response
+    async def alist(self, request, *args, **kwargs):
+        return await super().alist(request, *args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        # Searches are ordered by relevance unless the client asked for an ordering
+        search = self.request.query_params.get('search', '').strip()
+        if search and not self.request.query_params.get('ordering'):
+            queryset = rank_search(queryset, search)
+            if 'search_rank' in queryset.query.annotations:
+                queryset = queryset.order_by('search_rank', '-scraped_at', '-id')
         return queryset
 
+    @action(detail=True, methods=['get'])
+    def price_history(self, request, house_id=None):
+        """
+        Get the recorded price/attribute changes of a house, newest first
+        """
+        house = self.get_object()
+        serializer = PriceHistorySerializer(house.price_history.all(), many=True)
+        return Response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def duplicates(self, request, house_id=None):
+        """
+        Get the other listings of the same flat (same listing_group), e.g. on other portals
+        """
+        house = self.get_object()
+        houses = House.objects.filter(listing_group=house.listing_group).exclude(pk=house.pk) \
+            if house.listing_group else House.objects.none()
+        houses = HouseSerializer.setup_eager_loading(houses, request.user)
+        serializer = HouseSerializer(houses, many=True, context={'request': request})
+        return Response(serializer.data)
+
+    # Fields of the flag states returned by sync and actions
+    FLAG_FIELDS = ['house_id', 'is_favorite', 'is_contacted', 'is_discarded']
+
+    @action(detail=False, methods=['get'])
+    def sync(self, request):
+        """
+        Changes to the feed after the token of a previous sync (?since=), oldest first, in
+        batches of ?limit= changes:
+        - houses: houses added or updated and still in the feed, in the list representation
+          (fields= / expand= apply; discarded houses are included, with is_discarded)
+        - removed: house_ids that left the feed (inactive, room rental or deleted)
+        - flags: current flags of the houses whose flags the user changed
+        Keep the returned token and call again while "more" is true. Without a token, or with
+        one the change log no longer covers, "reset" is true: refetch the list, then sync from
+        the returned token.
+        """
+        token = request.query_params.get('since')
+        try:
+            limit = min(max(int(request.query_params.get('limit', SYNC_BATCH_SIZE)), 1), SYNC_MAX_BATCH_SIZE)
+        except ValueError:
+            limit = SYNC_BATCH_SIZE
+
+        changes = None
+        if token and change_log_available():
+            try:
+                changes = read_changes(decode_token(token), request.user, limit)
+            except InvalidToken:
+                raise ValidationError({'since': 'Invalid sync token'})
+        if changes is None:
+            return Response({
+                'token': encode_token(current_sequence()), 'reset': True, 'more': False,
+                'houses': [], 'removed': [], 'flags': [],
+            })
+
+        changes, sequence, more = changes
+        listing_ids = {pk: house_id for pk, house_id, is_flag in changes if not is_flag}
+        flag_pks = {pk for pk, _, is_flag in changes if is_flag}
+
+        fields, full_description = self.get_representation()
+        houses = list(HouseSerializer.setup_eager_loading(
+            House.objects.filter(FEED_CONDITION, pk__in=list(listing_ids)).order_by('pk'),
+            request.user, fields, full_description
+        ))
+        # By listing id: a house deleted and imported again is served, not removed
+        served = {house.house_id for house in houses}
+        flags = self.flag_states(flag_pks) if flag_pks and request.user.is_authenticated else []
+
+        return Response({
+            'token': encode_token(sequence),
+            'reset': False,
+            'more': more,
+            'houses': self.get_serializer(houses, many=True).data,
+            'removed': sorted(set(listing_ids.values()) - served),
+            'flags': flags,
+        })
+
+    def flag_states(self, pks):
+        """Current flags of the user on the given houses, in one query"""
+        houses = HouseSerializer.setup_eager_loading(
+            House.objects.filter(pk__in=list(pks)).only('house_id').order_by('pk'), self.request.user, self.FLAG_FIELDS
+        )
+        return HouseSerializer(houses, many=True, context={'request': self.request, 'fields': self.FLAG_FIELDS}).data
+
+    @action(detail=False, methods=['post'], url_path='actions', permission_classes=[permissions.IsAuthenticated])
+    def batch_actions(self, request):
+        """
+        Set the user's flags on many houses in one transaction, e.g. the queued swipes of an app:
+
+        {"operations": [{"house_id": "...", "action": "favorite|contacted|discarded", "state": true}, ...]}
+
+        Operations set a state (they don't toggle), so replaying a batch is harmless; for the same
+        house and action the last one wins. Returns the resulting flags of the houses and the
+        house_ids that don't exist (their operations are skipped).
+        """
+        serializer = HouseActionBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        pks, not_found = apply_house_actions(request.user, [
+            (operation['house_id'], operation['action'], operation['state'])
+            for operation in serializer.validated_data['operations']
+        ])
+        return Response({'results': self.flag_states(pks), 'not_found': not_found})
+
     @action(detail=True, methods=['post'])
     def toggle_contacted(self, request, house_id=None):
         house = self.get_object()
-        if house.contacted_by.filter(id=request.user.id).exists():
-            house.contacted_by.remove(request.user)
-            is_contacted = False
-        else:
-            house.contacted_by.add(request.user)
-            is_contacted = True
+        is_contacted = toggle_house_flag(request.user, house, 'contacted')
         return Response({'is_contacted': is_contacted})
 
     @action(detail=True, methods=['post'])
     def toggle_discarded(self, request, house_id=None):
         try:
             house = House.objects.get(house_id=house_id)
-            if house.discarded_by.filter(id=request.user.id).exists():
-                house.discarded_by.remove(request.user)
-                is_discarded = False
-            else:
-                house.discarded_by.add(request.user)
-                is_discarded = True
+            is_discarded = toggle_house_flag(request.user, house, 'discarded')
             return Response({'is_discarded': is_discarded})
         except House.DoesNotExist:
             return Response({'error': 'House not found'}, status=404)
@@ -105,15 +332,11 @@ class HouseViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def toggle_favorite(self, request, house_id=None):
         house = self.get_object()
-        if house.favorited_by.filter(id=request.user.id).exists():
-            house.favorited_by.remove(request.user)
-            is_favorite = False
-        else:
-            house.favorited_by.add(request.user)
-            is_favorite = True
+        is_favorite = toggle_house_flag(request.user, house, 'favorite')
         return Response({'is_favorite': is_favorite})
 
     @action(detail=False, methods=['get'])
+    @cache_response
     def stats(self, request):
         """
         Get statistics about houses in the database
@@ -124,58 +347,93 @@ class HouseViewSet(viewsets.ModelViewSet):
             "average_price": 850.50
         }
         """
-        from django.db.models import Avg, Count
-        
-        queryset = self.get_queryset()
-        
-        # Calculate statistics
-        stats = queryset.aggregate(
-            total_houses=Count('house_id'),
-            average_price=Avg('price')
-        )
+        return Response(self.stats_data(self.get_queryset().aggregate(**self.stats_aggregates())))
 
-        
-        return Response({
+    @acache_response
+    async def astats(self, request):
+        return Response(self.stats_data(await self.get_queryset().aaggregate(**self.stats_aggregates())))
+
+    @staticmethod
+    def stats_aggregates():
+        return {'total_houses': Count('house_id'), 'average_price': Avg('price')}
+
+    @staticmethod
+    def stats_data(stats):
+        return {
             'total_houses': stats['total_houses'] or 0,
             'average_price': float(stats['average_price']) if stats['average_price'] else 0.0
-        })
+        }
 
-    @action(detail=False, methods=['post'])
+    @action(
+        detail=False, methods=['get'], url_path=r'export/(?P<export_format>csv|ndjson)',
+        permission_classes=[permissions.IsAuthenticated]
+    )
+    def export(self, request, export_format=None):
+        """
+        Every house matching the list filters (district=, source=, min_price=, search=, ...) as a
+        CSV or NDJSON download, in primary key order. The rows are streamed as they are read
+        from the database, chunk by chunk, so the export doesn't have to fit in memory (under ASGI
+        through an async iterator, which Django streams instead of buffering).
+        """
+        content_type, extension = EXPORT_FORMATS[export_format]
+        stream = csv_stream if export_format == 'csv' else ndjson_stream
+        chunks = stream(export_rows(self.get_queryset()))
+        if isinstance(request._request, ASGIRequest):
+            chunks = aiterate(chunks)
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        filename = f"houses-{timezone.now():%Y%m%d-%H%M%S}.{extension}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAdminUser])
     def delete_all(self, request):
         """
-        Delete all houses from the database
-        
-        This will cascade delete all related data including:
-        - Photos (due to ForeignKey with on_delete=CASCADE)
-        - Many-to-Many relationships (favorited_by, contacted_by, discarded_by)
-        
-        Returns:
+        Delete all houses from the database, in the background (see houses.purge)
+
+        The houses are deleted in batches with the rows depending on them (photos, price
+        history, dedup data, users' flags); GET /api/purge-jobs/<id>/ reports the progress.
+
+        Returns (202):
         {
-            "status": "success",
-            "deleted_count": 1234,
-            "message": "Successfully deleted 1234 houses and related data"
+            "status": "accepted",
+            "job": {"id": 1, "status": "queued", "total_houses": 0, "deleted_houses": 0, "progress": 0.0, ...},
+            "message": "Deleting all houses in the background"
         }
         """
-        try:
-            # Get count before deletion
-            house_count = House.objects.count()
-            
-            # Delete all houses (cascades to photos and clears M2M relationships)
-            deleted_info = House.objects.all().delete()
-            
-            return Response({
-                'status': 'success',
-                'deleted_count': house_count,
-                'deleted_objects': deleted_info[0],  # Total number of objects deleted (houses + photos + m2m)
-                'message': f'Successfully deleted {house_count} houses and related data'
-            })
-            
-        except Exception as e:
-            print(f"Error deleting all houses: {str(e)}")
-            return Response({
-                'status': 'error',
-                'error': str(e)
-            }, status=500)
+        job = start_purge_job({}, user=request.user)
+        return Response({
+            'status': 'accepted',
+            'job': PurgeJobSerializer(job).data,
+            'message': 'Deleting all houses in the background'
+        }, status=202)
+
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAdminUser])
+    def purge(self, request):
+        """
+        Delete the houses matching some filters, in the background like delete_all
+
+        Request body (at least one filter):
+        {
+            "source": "era",
+            "district": 11,
+            "listing_type": "rent",
+            "older_than_days": 180,  // Scraped longer ago than this
+            "inactive": true,  // Only listings that went offline
+            "batch_size": 1000  // Optional: houses deleted per transaction
+        }
+
+        Returns (202) the job, like delete_all.
+        """
+        serializer = PurgeRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        filters = dict(serializer.validated_data)
+        batch_size = filters.pop('batch_size')
+        job = start_purge_job(filters, user=request.user, batch_size=batch_size)
+        return Response({
+            'status': 'accepted',
+            'job': PurgeJobSerializer(job).data,
+            'message': 'Deleting the matching houses in the background'
+        }, status=202)
 
     @action(detail=False, methods=['post'])
     def run_scrapers(self, request):
@@ -198,58 +456,16 @@ class HouseViewSet(viewsets.ModelViewSet):
         """
         from django.core.management import call_command
         import io
-        
-        # Get scrapers selection from request body
-        scrapers = request.data.get('scrapers', [])
-        run_all = request.data.get('all', False)
-        listing_type = request.data.get('listing_type', 'rent')  # Default to rent
-        
-        # Validate listing_type
-        valid_types = ['rent', 'buy', 'all']
-        if listing_type not in valid_types:
-            return Response({
-                'status': 'error',
-                'error': f'Invalid listing_type. Must be one of: {", ".join(valid_types)}'
-            }, status=400)
-        
-        # Validate scraper names
-        valid_scrapers = ['ImoVirtual', 'Idealista', 'Remax', 'ERA', 'CasaSapo', 'SuperCasa']
-        
-        if scrapers:
-            # Validate that all requested scrapers are valid
-            invalid_scrapers = [s for s in scrapers if s not in valid_scrapers]
-            if invalid_scrapers:
-                return Response({
-                    'status': 'error',
-                    'error': f'Invalid scrapers: {", ".join(invalid_scrapers)}',
-                    'valid_scrapers': valid_scrapers
-                }, status=400)
-        
+
+        cmd_args, body = self.scraper_command(request.data)
+        if cmd_args is None:
+            return Response(body, status=400)
+
         # Capture the output of the command
         out = io.StringIO()
         try:
-            # Build command arguments
-            cmd_args = []
-            
-            if run_all or not scrapers:
-                # Run all scrapers if explicitly requested or no specific scrapers provided
-                cmd_args.append('--all')
-            else:
-                # Run specific scrapers
-                cmd_args.extend(['--scrapers'] + scrapers)
-            
-            # Add listing type argument
-            cmd_args.extend(['--type', listing_type])
-            
             call_command('run_scrapers', *cmd_args, stdout=out)
-            
-            return Response({
-                'status': 'success',
-                'output': out.getvalue(),
-                'scrapers_run': scrapers if scrapers else 'all',
-                'listing_type': listing_type,
-                'message': f'Started {"all scrapers" if (run_all or not scrapers) else ", ".join(scrapers)} for {listing_type}'
-            })
+            return Response({'status': 'success', 'output': out.getvalue(), **body})
         except Exception as e:
             print(f"Error running scrapers: {e}")
             return Response({
@@ -257,8 +473,84 @@ class HouseViewSet(viewsets.ModelViewSet):
                 'error': str(e)
             }, status=500)
 
+    async def arun_scrapers(self, request):
+        """
+        run_scrapers in a subprocess awaited on the event loop, so that a run lasting minutes
+        doesn't hold a worker thread
+        """
+        cmd_args, body = self.scraper_command(request.data)
+        if cmd_args is None:
+            return Response(body, status=400)
+
+        try:
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, str(Path(settings.BASE_DIR) / 'manage.py'), 'run_scrapers', *cmd_args,
+                stdout=asyncio.subprocess.PIPE,
+            )
+            output, _ = await process.communicate()
+        except OSError as e:
+            print(f"Error running scrapers: {e}")
+            return Response({'status': 'error', 'error': str(e)}, status=500)
+        if process.returncode != 0:
+            return Response({
+                'status': 'error',
+                'error': f'run_scrapers exited with status {process.returncode}',
+                'output': output.decode('utf-8', 'replace'),
+            }, status=500)
+        return Response({'status': 'success', 'output': output.decode('utf-8', 'replace'), **body})
+
+    VALID_SCRAPERS = ['ImoVirtual', 'Idealista', 'Remax', 'ERA', 'CasaSapo', 'SuperCasa']
+
+    @classmethod
+    def scraper_command(cls, data):
+        """
+        run_scrapers arguments for a run_scrapers request body.
+
+        Returns:
+            tuple: (arguments, response fields of a started run) or (None, error response)
+        """
+        # Get scrapers selection from request body
+        scrapers = data.get('scrapers', [])
+        run_all = data.get('all', False)
+        listing_type = data.get('listing_type', 'rent')  # Default to rent
+        
+        # Validate listing_type
+        valid_types = ['rent', 'buy', 'all']
+        if listing_type not in valid_types:
+            return None, {
+                'status': 'error',
+                'error': f'Invalid listing_type. Must be one of: {", ".join(valid_types)}'
+            }
+        
+        # Validate that all requested scrapers are valid
+        invalid_scrapers = [s for s in scrapers if s not in cls.VALID_SCRAPERS]
+        if invalid_scrapers:
+            return None, {
+                'status': 'error',
+                'error': f'Invalid scrapers: {", ".join(invalid_scrapers)}',
+                'valid_scrapers': cls.VALID_SCRAPERS
+            }
+        
+        # Build command arguments
+        cmd_args = []
+        if run_all or not scrapers:
+            # Run all scrapers if explicitly requested or no specific scrapers provided
+            cmd_args.append('--all')
+        else:
+            # Run specific scrapers
+            cmd_args.extend(['--scrapers'] + scrapers)
+        
+        # Add listing type argument
+        cmd_args.extend(['--type', listing_type])
+
+        return cmd_args, {
+            'scrapers_run': scrapers if scrapers else 'all',
+            'listing_type': listing_type,
+            'message': f'Started {"all scrapers" if (run_all or not scrapers) else ", ".join(scrapers)} for {listing_type}'
+        }
+
 
-class DistrictViewSet(viewsets.ReadOnlyModelViewSet):
+class DistrictViewSet(AsyncViewSetMixin, ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for viewing districts.
     Supports filtering by name.
@@ -270,12 +562,29 @@ class DistrictViewSet(viewsets.ReadOnlyModelViewSet):
     ordering_fields = ['name']
     ordering = ['name']
     pagination_class = None  # Disable pagination for location endpoints
+    version_scopes = (LOCATIONS_SCOPE,)
+    action_version_scopes = {'houses': (LOCATIONS_SCOPE, DATA_SCOPE)}
+
+    @action(detail=False, methods=['get'])
+    def tree(self, request):
+        """
+        Every district with its counties and their parishes, ordered by name, for the
+        location pickers:
+        [{"id": 1, "name": "Aveiro", "counties": [{"id": 1, "name": "Águeda", "parishes": [{"id": 1, "name": "..."}]}]}]
+        Kept in memory until populate_location_data changes the locations.
+        """
+        versions, _ = request_version_state(request, self.version_scopes)
+        return Response(location_tree(versions))
+
+    async def atree(self, request):
+        versions, _ = await arequest_version_state(request, self.version_scopes)
+        return Response(await alocation_tree(versions))
 
     @action(detail=True, methods=['get'])
     def counties(self, request, pk=None):
         """Get all counties in this district"""
         district = self.get_object()
-        counties = district.counties.all()
+        counties = district.counties.select_related('district')
         serializer = CountySerializer(counties, many=True)
         return Response(serializer.data)
 
@@ -283,7 +592,8 @@ class DistrictViewSet(viewsets.ReadOnlyModelViewSet):
     def houses(self, request, pk=None):
         """Get all houses in this district"""
         district = self.get_object()
-        houses = House.objects.filter(district=district)
+        houses = House.objects.filter(district=district, is_active=True)
+        houses = HouseSerializer.setup_eager_loading(houses, request.user)
         
         # Apply pagination
         page = self.paginate_queryset(houses)
@@ -295,7 +605,7 @@ class DistrictViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data)
 
 
-class CountyViewSet(viewsets.ReadOnlyModelViewSet):
+class CountyViewSet(AsyncViewSetMixin, ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for viewing counties.
     Supports filtering by name and district.
@@ -307,9 +617,11 @@ class CountyViewSet(viewsets.ReadOnlyModelViewSet):
     ordering_fields = ['name', 'district__name']
     ordering = ['name']
     pagination_class = None  # Disable pagination for location endpoints
+    version_scopes = (LOCATIONS_SCOPE,)
+    action_version_scopes = {'houses': (LOCATIONS_SCOPE, DATA_SCOPE)}
 
     def get_queryset(self):
-        queryset = County.objects.all()
+        queryset = County.objects.select_related('district')
         district_id = self.request.query_params.get('district')
         if district_id:
             queryset = queryset.filter(district_id=district_id)
@@ -319,7 +631,7 @@ class CountyViewSet(viewsets.ReadOnlyModelViewSet):
     def parishes(self, request, pk=None):
         """Get all parishes in this county"""
         county = self.get_object()
-        parishes = county.parishes.all()
+        parishes = county.parishes.select_related('county__district')
         serializer = ParishSerializer(parishes, many=True)
         return Response(serializer.data)
 
@@ -327,7 +639,8 @@ class CountyViewSet(viewsets.ReadOnlyModelViewSet):
     def houses(self, request, pk=None):
         """Get all houses in this county"""
         county = self.get_object()
-        houses = House.objects.filter(county=county)
+        houses = House.objects.filter(county=county, is_active=True)
+        houses = HouseSerializer.setup_eager_loading(houses, request.user)
         
         # Apply pagination
         page = self.paginate_queryset(houses)
@@ -339,7 +652,7 @@ class CountyViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data)
 
 
-class ParishViewSet(viewsets.ReadOnlyModelViewSet):
+class ParishViewSet(AsyncViewSetMixin, ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for viewing parishes.
     Supports filtering by name, county, and district.
@@ -351,9 +664,11 @@ class ParishViewSet(viewsets.ReadOnlyModelViewSet):
     ordering_fields = ['name', 'county__name']
     ordering = ['name']
     pagination_class = None  # Disable pagination for location endpoints
+    version_scopes = (LOCATIONS_SCOPE,)
+    action_version_scopes = {'houses': (LOCATIONS_SCOPE, DATA_SCOPE)}
 
     def get_queryset(self):
-        queryset = Parish.objects.all()
+        queryset = Parish.objects.select_related('county__district')
         county_id = self.request.query_params.get('county')
         district_id = self.request.query_params.get('district')
         
@@ -368,7 +683,8 @@ class ParishViewSet(viewsets.ReadOnlyModelViewSet):
     def houses(self, request, pk=None):
         """Get all houses in this parish"""
         parish = self.get_object()
-        houses = House.objects.filter(parish=parish)
+        houses = House.objects.filter(parish=parish, is_active=True)
+        houses = HouseSerializer.setup_eager_loading(houses, request.user)
         
         # Apply pagination
         page = self.paginate_queryset(houses)
@@ -380,7 +696,7 @@ class ParishViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data)
 
 
-class MainRunViewSet(viewsets.ReadOnlyModelViewSet):
+class MainRunViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """
     Read-only ViewSet for viewing main scraper runs with nested scraper runs.
     
@@ -390,3 +706,176 @@ class MainRunViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = MainRun.objects.prefetch_related('scraper_runs').order_by('-start_time')
     serializer_class = MainRunSerializer
     # permission_classes = [permissions.IsAuthenticated]
+
+    def get_validators(self, request):
+        """Runs change as they progress, so the validators come from aggregates of both run tables"""
+        runs = MainRun.objects.aggregate(
+            count=Count('id'),
+            running=Count('id', filter=Q(status='running')),
+            last_start=Max('start_time'),
+            last_end=Max('end_time'),
+        )
+        scraper_runs = ScraperRun.objects.aggregate(
+            count=Count('id'),
+            last_end=Max('end_time'),
+            total_houses=Sum('total_houses'),
+            new_houses=Sum('new_houses'),
+        )
+        # Scraper counters move without any timestamp changing, so no Last-Modified while a run is going
+        timestamps = [runs['last_start'], runs['last_end'], scraper_runs['last_end']]
+        last_modified = None if runs['running'] else max(filter(None, timestamps), default=None)
+        return [runs, scraper_runs], last_modified
+
+
+class PurgeJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Read-only ViewSet for the progress of the purge jobs (delete_all and purge), for staff users.
+
+    Not cached nor conditional: a running job changes after every batch.
+    """
+    queryset = PurgeJob.objects.order_by('-created_at')
+    serializer_class = PurgeJobSerializer
+    permission_classes = [permissions.IsAdminUser]
+
+
+class SavedSearchViewSet(viewsets.ModelViewSet):
+    """
+    The user's saved searches. New houses are matched against them at ingest (see
+    houses.saved_searches); the matches are the user's feed of new listings:
+
+    - GET /api/saved-searches/matches/: houses matching any of the searches, newest match first
+    - GET /api/saved-searches/<id>/matches/: houses matching one search
+    """
+    serializer_class = SavedSearchSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return SavedSearch.objects.filter(user=self.request.user).order_by('-created_at')
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+        bump_saved_searches_version()
+
+    def perform_update(self, serializer):
+        serializer.save()
+        bump_saved_searches_version()
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        bump_saved_searches_version()
+
+    @action(detail=False, methods=['get'], url_path='matches')
+    def all_matches(self, request):
+        return self.matched_houses(request, self.get_queryset())
+
+    @action(detail=True, methods=['get'])
+    def matches(self, request, pk=None):
+        return self.matched_houses(request, [self.get_object()])
+
+    def matched_houses(self, request, searches):
+        """Listings of the feed matched by the searches, in the list representation with matched_at"""
+        houses = (
+            House.objects.filter(FEED_CONDITION, saved_search_matches__saved_search__in=searches)
+            .exclude(has_flag(request.user, 'discarded'))
+            .annotate(matched_at=Max('saved_search_matches__matched_at'))
+            .order_by('-matched_at', '-pk')
+        )
+        fields = HouseSerializer.Meta.list_fields
+        page = self.paginate_queryset(
+            HouseSerializer.setup_eager_loading(houses, request.user, fields, full_description=False)
+        )
+        data = HouseSerializer(
+            page, many=True, context={'request': request, 'fields': fields, 'full_description': False}
+        ).data
+        matched_at = serializers.DateTimeField()
+        for item, house in zip(data, page):
+            item['matched_at'] = matched_at.to_representation(house.matched_at)
+        return self.get_paginated_response(data)
+
+
+class MarketStatViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Read-only ViewSet for the market statistics computed after each run (see houses.market_stats).
+
+    Query parameters:
+    - level: country, district (default), county or parish
+    - location: id of the district, county or parish
+    - listing_type: rent or buy
+    - bedrooms: number of bedrooms, or all (default)
+    - source: portal, or all (default)
+    - history: true to include the statistics of previous runs, oldest first
+    """
+    serializer_class = MarketStatSerializer
+    pagination_class = None  # One row per group, bounded by the filters
+
+    def get_queryset(self):
+        params = self.request.query_params
+        history = params.get('history', '').lower() == 'true'
+        queryset = MarketStat.objects.all() if history else MarketStat.objects.filter(is_current=True)
+
+        queryset = queryset.filter(level=params.get('level') or 'district')
+        location = params.get('location')
+        if location:
+            queryset = queryset.filter(location_id=location)
+        listing_type = params.get('listing_type')
+        if listing_type:
+            queryset = queryset.filter(listing_type=listing_type)
+
+        bedrooms = params.get('bedrooms', 'all')
+        if bedrooms.isdigit():
+            queryset = queryset.filter(bedrooms=int(bedrooms))
+        else:
+            queryset = queryset.filter(bedrooms__isnull=True)
+        source = params.get('source', 'all')
+        queryset = queryset.filter(source='' if source == 'all' else source)
+
+        if history:
+            return queryset.order_by('location_name', 'listing_type', 'computed_at')
+        return queryset.order_by('location_name', 'listing_type')
+
+
+async def house_live_feed(request):
+    """
+    Server-Sent Events stream of the houses inserted from now on matching the list filters
+    (district, county, parish, source, listing_type, property_type, min/max_price,
+    min/max_bedrooms, min/max_area). Each event is a house in the list representation,
+    without user flags, with the house's sequence number as its id: a client reconnecting
+    with Last-Event-ID (or ?last_event_id=) first gets the houses it missed.
+    Only served by the ASGI deployment (api.asgi).
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'detail': 'The live feed is only served by the ASGI server (api.asgi)'}, status=501)
+
+    live_filter = LiveFilter.from_params(request.GET)
+    after = parse_last_event_id(request.headers.get('Last-Event-ID', request.GET.get('last_event_id')))
+    subscription = await live_feed.subscribe(live_filter)
+    try:
+        missed = await live_feed.replay(live_filter, after) if after is not None else []
+    except BaseException:
+        live_feed.unsubscribe(subscription)
+        raise
+
+    async def events():
+        try:
+            yield b'retry: %d\n\n' % LIVE_FEED_RETRY_MS
+            last = after or 0
+            for event_id, frame in missed:
+                last = event_id
+                yield frame
+            # Ends when the client disconnects (the task is cancelled) or can't keep up
+            while subscription.queue is not None:
+                try:
+                    event_id, frame = await asyncio.wait_for(subscription.queue.get(), LIVE_FEED_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield HEARTBEAT_FRAME
+                    continue
+                if event_id > last:  # Not already replayed
+                    last = event_id
+                    yield frame
+        finally:
+            live_feed.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Proxies mustn't hold the events back
+    return response
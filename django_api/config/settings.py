@@ -150,23 +150,7 @@ NTFY_NOTIFICATION_ENABLED = False
 NTFY_PRICE_THRESHOLD = 900  # Maximum price for notifications
 NTFY_FILTER_ROOM_RENTALS = True  # Skip notifications for room rentals
 
-# Room rental filter settings
-ROOM_RENTAL_TITLE_TERMS = [
-    "QUARTO", 
-    "ROOM", 
-    "ALUGA-SE QUARTO", 
-    "ALUGO QUARTO", 
-    "QUARTO PARA ALUGAR",
-    "Dividir apartamento"
-]
-
-ROOM_RENTAL_DESCRIPTION_TERMS = [
-    "QUARTO EM APARTAMENTO", 
-    "QUARTO PARTILHADO", 
-    "SHARED ROOM", 
-    "ROOM IN APARTMENT",
-    "ALUGAM-SE QUARTOS"
-]
+# Room rental terms live in api/houses/settings.py, shared by the API feed and notifications
 
 # Idealista Settings
 IDEALISTA_MAX_REQUESTS_PER_HOUR = 50  # Maximum number of requests per hour for Idealista scraper
@@ -10,40 +10,6 @@ import numpy as np
 import lightgbm as lgb
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-import re
-
-
-def extract_bedrooms(bedroom_str):
-    """Extract number of bedrooms from string like 'T2', 'T3', etc."""
-    if pd.isna(bedroom_str):
-        return 0
-    match = re.search(r'(\d+)', str(bedroom_str))
-    if match:
-        return int(match.group(1))
-    return 0
-
-
-def extract_floor(floor_str):
-    """Extract floor number from string."""
-    if pd.isna(floor_str):
-        return 0
-    match = re.search(r'(\d+)', str(floor_str))
-    if match:
-        return int(match.group(1))
-    return 0
-
-
-def extract_property_type(name):
-    """Extract property type from name: apartamento vs moradia (house)"""
-    if pd.isna(name):
-        return 'other'
-    name_lower = str(name).lower()
-    if 'moradia' in name_lower or 'vivenda' in name_lower:
-        return 'house'
-    elif 'apartamento' in name_lower:
-        return 'apartment'
-    else:
-        return 'other'
 
 
 def load_data(db_path, district_id=22):
@@ -69,6 +35,11 @@ def load_data(db_path, district_id=22):
         h.bedrooms,
         h.area,
         h.floor,
+        h.bedrooms_num,
+        h.area_m2,
+        h.floor_num,
+        h.price_per_m2,
+        h.property_type,
         h.listing_type,
         h.source,
         h.county_id,
@@ -111,19 +82,15 @@ def preprocess_data(df):
     data['county_name_original'] = data['county_name'] if 'county_name' in data.columns else None
     data['parish_name_original'] = data['parish_name'] if 'parish_name' in data.columns else None
     
-    # Extract property type from name
-    data['property_type'] = data['name'].apply(extract_property_type)
-    
-    # Extract numeric features
-    data['bedrooms_num'] = data['bedrooms'].apply(extract_bedrooms)
-    data['floor_num'] = data['floor'].apply(extract_floor)
+    # Numeric features and property type are parsed at ingest (houses.normalization)
+    data['bedrooms_num'] = data['bedrooms_num'].fillna(0).astype(int)
+    data['floor_num'] = data['floor_num'].fillna(0).astype(int)
+    data['property_type'] = data['property_type'].fillna('other')
     
     # Convert area to float
-    data['area'] = pd.to_numeric(data['area'], errors='coerce')
+    data['area'] = pd.to_numeric(data['area_m2'].fillna(data['area']), errors='coerce')
     data['price'] = pd.to_numeric(data['price'], errors='coerce')
-    
-    # Calculate price per square meter
-    data['price_per_sqm'] = data['price'] / data['area']
+    data['price_per_sqm'] = pd.to_numeric(data['price_per_m2'], errors='coerce')
     
     # One-hot encode categorical features
     data = pd.get_dummies(data, columns=['source'], prefix='source')
@@ -365,6 +365,7 @@ class CasaSapoScraper(BaseScraper):
                     self._log('error', f"Error processing house: {str(e)}")
                     continue
 
+            self.flush_listing_updates()
             driver.quit()
             return True  # Signal to continue pagination
 
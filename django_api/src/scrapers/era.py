@@ -343,6 +343,8 @@ class EraScraper(BaseScraper):
                 # Clean up detail driver
                 detail_driver.quit()
 
+            self.flush_listing_updates()
+
             self._log('info', f"Finished processing URL: {self.url}")
 
         except Exception as e:
@@ -222,13 +222,6 @@ class IdealistaScraper(BaseScraper):
                     name = title_link.get("title", "N/A")
                     url = f"https://www.idealista.pt{title_link.get('href', '')}"
                     
-                    # Skip if URL already exists in the database
-                    if self.url_exists(url):
-                        continue
-
-                    # If we get here, we found at least one new house
-                    new_houses_found = True
-                    
                     price_elem = house.find("span", class_="item-price")
                     price = price_elem.text.strip() if price_elem else "N/A"
 
@@ -239,6 +232,14 @@ class IdealistaScraper(BaseScraper):
                         if len(details) > 1
                         else "N/A"
                     )
+
+                    # Skip if URL already exists in the database, but keep track of price/attribute changes
+                    if self.url_exists(url):
+                        self.track_existing_listing(url, name=name, price=price, area=area, bedrooms=bedrooms)
+                        continue
+
+                    # If we get here, we found at least one new house
+                    new_houses_found = True
                     
                     # Extract floor directly from item-detail
                     floor = "N/A"
@@ -305,6 +306,7 @@ class IdealistaScraper(BaseScraper):
                     self._log('error', f"Traceback: {traceback.format_exc()}")
                     continue
 
+            self.flush_listing_updates()
             self._log('info', f"Finished processing all {len(houses)} houses on page {page_num}")
             self._log('info', f"New houses found: {new_houses_found}")
             
@@ -43,6 +43,7 @@ class ImoVirtualScraper(BaseScraper):
 
     def _process_page(self, url, page_num):
         """Process a single page of listings"""
+        search_url = url  # `url` is reused for the listings below
         if page_num == 1:
             current_url = url
         else:
@@ -552,17 +553,23 @@ class ImoVirtualScraper(BaseScraper):
                         # Normalize URL to handle /pt/ and /hpr/pt/ variations
                         normalized_url = url.replace('/hpr/pt/', '/pt/')
                         
-                        # Skip if URL already exists in our database
+                        # Extract house information
+                        title_elem = article.find('p', {'data-cy': 'listing-item-title'})
+                        name = title_elem.text.strip() if title_elem else "N/A"
+                        
+                        # Skip if URL already exists in our database, but keep track of price/attribute changes
                         if self.url_exists(normalized_url):
                             self._log('info', f"Skipping already processed property: {url}")
+                            price_elem = article.find('span', {'data-sentry-element': 'MainPrice'})
+                            self.track_existing_listing(
+                                normalized_url,
+                                name=name,
+                                price=price_elem.text.strip() if price_elem else None
+                            )
                             continue
                         
                         found_new_listing = True
                         
-                        # Extract house information
-                        title_elem = article.find('p', {'data-cy': 'listing-item-title'})
-                        name = title_elem.text.strip() if title_elem else "N/A"
-                        
                         # Use the image URLs collected by Selenium
                         image_urls = selenium_image_urls[idx] if idx < len(selenium_image_urls) else []
                         self._log('debug', f"[IMAGE_DEBUG] Raw image URLs for {name}: {image_urls}")
@@ -667,6 +674,8 @@ class ImoVirtualScraper(BaseScraper):
                         self._log('error', f"Error processing house: {str(e)}")
                         continue
 
+                self.flush_listing_updates()
+
                 # Check if there's a next page
                 has_next_page = False
                 try:
@@ -684,6 +693,7 @@ class ImoVirtualScraper(BaseScraper):
                             self._log('info', f"Next page available after page {current_page}")
                         else:
                             self._log('info', f"No more pages after page {current_page}")
+                            self.mark_last_page(search_url)
                     else:
                         self._log('warning', "Pagination component not found")
                 except Exception as pagination_error:
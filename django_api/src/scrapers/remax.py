@@ -307,6 +307,8 @@ class RemaxScraper(BaseScraper):
                     self._log('error', f"Error processing house: {str(e)}", exc_info=True)
                     continue
 
+            self.flush_listing_updates()
+
             # Close driver after all processing is done
             driver.quit()
 
@@ -38,6 +38,7 @@ class SuperCasaScraper(BaseScraper):
             
             self._start_run()
             self.scrape()
+            self.flush_listing_updates()
             self._complete_run()
         except Exception as e:
             error_message = str(e)
@@ -119,6 +120,7 @@ class SuperCasaScraper(BaseScraper):
 
     def _process_page(self, url, page_num):
         """Process a single page of listings"""
+        search_url = url  # `url` is reused for the listings below
         if page_num == 1:
             current_url = url
         else:
@@ -359,8 +361,13 @@ class SuperCasaScraper(BaseScraper):
                     self._log('error', f"Error processing property: {str(e)}")
                     continue
 
+            self.flush_listing_updates()
+
             # Check if pagination exists and if there's a next page before returning
             has_next_page = self._check_pagination(self.driver, page_num)
+            if has_next_page is False and property_items:
+                # Only a page with listings and a pagination without a next link is the real last page
+                self.mark_last_page(search_url)
             
             # Only return True (continue to next page) if we found new listings AND pagination exists
             return found_new_listing and has_next_page
@@ -369,13 +376,16 @@ class SuperCasaScraper(BaseScraper):
             self._log('error', f"Error processing page {page_num}: {str(e)}", exc_info=True)
             return False
     def _check_pagination(self, driver, page_num):
-        """Check if pagination exists and if there's a next page available"""
+        """
+        Check if there's a next page: True, False on the last page, None if that can't be told
+        (no pagination element: a blocked, captcha or empty page looks the same as a single page)
+        """
         try:
             # Check if pagination element exists
             pagination = driver.find_elements(By.CLASS_NAME, "list-pagination")
             if not pagination:
-                self._log('info', "No pagination element found. This is the last page.")
-                return False
+                self._log('info', "No pagination element found. Stopping without marking the last page.")
+                return None
                 
             # Check if there's a link to the next page
             next_page_link = driver.find_elements(By.CLASS_NAME, "list-pagination-next")
@@ -387,12 +397,12 @@ class SuperCasaScraper(BaseScraper):
             next_page_url = f"/pagina-{page_num + 1}"
             pagination_links = driver.find_elements(By.CSS_SELECTOR, f".list-pagination-page[href*='{next_page_url}']")
             if not pagination_links:
-                self._log('info', f"No link to page {page_num + 1} found. This is the last page.")
-                return False
+                self._log('info', f"Next page link but no link to page {page_num + 1}. Stopping without marking the last page.")
+                return None
                 
             self._log('info', f"Pagination found with link to page {page_num + 1}")
             return True
             
         except Exception as e:
             self._log('warning', f"Error checking pagination: {str(e)}")
-            return False
+            return None
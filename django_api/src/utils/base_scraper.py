@@ -8,9 +8,7 @@ try:
         NTFY_TOPIC,
         NTFY_NOTIFICATION_ENABLED,
         NTFY_PRICE_THRESHOLD,
-        NTFY_FILTER_ROOM_RENTALS,
-        ROOM_RENTAL_TITLE_TERMS,
-        ROOM_RENTAL_DESCRIPTION_TERMS
+        NTFY_FILTER_ROOM_RENTALS
     )
     from src.messenger.ntfy_sender import NtfySender
 except ImportError:
@@ -28,14 +26,22 @@ except ImportError:
         NTFY_TOPIC,
         NTFY_NOTIFICATION_ENABLED,
         NTFY_PRICE_THRESHOLD,
-        NTFY_FILTER_ROOM_RENTALS,
-        ROOM_RENTAL_TITLE_TERMS,
-        ROOM_RENTAL_DESCRIPTION_TERMS
+        NTFY_FILTER_ROOM_RENTALS
     )
     from messenger.ntfy_sender import NtfySender
 import csv
 from houses.models import House, ScraperRun
+from houses.archive import is_archived_url
+from houses.dedup import assign_listing_group
+from houses.normalization import normalize_listing, parse_area
+from houses.classifier import is_room_rental, terms_version
+from houses.ingest import (
+    listing_fingerprint, load_listing_states, merge_fingerprint, flush_listing_changes, mark_listings_seen
+)
+from houses.live import notify_new_houses
+from houses.saved_searches import match_new_houses
 import uuid
+from django.db import transaction
 from django.utils import timezone
 from decimal import Decimal, InvalidOperation
 import time
@@ -72,6 +78,18 @@ class BaseScraper(ABC):
         self.main_run = None
         # Initialize existing URLs set
         self.existing_urls = set()
+        # Last known state of existing listings (url -> (house pk, fingerprint))
+        self.existing_listings = {}
+        # Changes and known listings seen on the current page, flushed in bulk by flush_listing_updates()
+        self.pending_changes = {}
+        self.seen_listings = set()
+        # Houses saved on the current page, matched against the saved searches and published to the
+        # live feed by flush_listing_updates()
+        self.new_house_pks = []
+        # Search URLs paged through to their last page on the current run (see mark_last_page()), and whether
+        # some sightings could not be recorded
+        self.walked_urls = set()
+        self.missed_sightings = False
 
 
 
@@ -127,6 +145,7 @@ class BaseScraper(ABC):
             # Create the ScraperRun object
             self.current_run = ScraperRun.objects.create(
                 scraper=self.source,
+                listing_type=self.listing_type,
                 status='initialized',
                 main_run=self.main_run
             )
@@ -134,6 +153,8 @@ class BaseScraper(ABC):
         
     def _start_run(self):
         """Mark the current run as started"""
+        self.walked_urls = set()
+        self.missed_sightings = False
         if self.current_run:
             with db_lock:
                 self.current_run.status = 'running'
@@ -144,6 +165,7 @@ class BaseScraper(ABC):
         if self.current_run:
             with db_lock:
                 self.current_run.status = 'completed'
+                self.current_run.saw_all_listings = self.saw_all_listings()
                 self.current_run.end_time = timezone.now()
                 self.current_run.save()
             
@@ -156,6 +178,20 @@ class BaseScraper(ABC):
                 self.current_run.end_time = timezone.now()
                 self.current_run.save()
 
+    def mark_last_page(self, url):
+        """Record that a search URL was paged through to its last page: every listing it shows was seen"""
+        self.walked_urls.add(url)
+
+    def saw_all_listings(self):
+        """Whether the current run paged every search URL to its last page.
+
+        Only then are the listings of the source the run didn't see offline, and expired after a while
+        (see houses.ingest.expire_stale_listings). Scrapers that stop paging early, on a page without new
+        listings or after the first pages, never mark their URLs.
+        """
+        urls = getattr(self, 'urls', None) or []
+        return bool(urls) and not self.missed_sightings and all(url in self.walked_urls for url in urls)
+
     def _clean_price(self, price_str):
         """Clean and convert price string to Decimal"""
         if not price_str:
@@ -195,21 +231,24 @@ class BaseScraper(ABC):
             self._log('warning', f"Error converting price '{price_str}': {str(e)}")
             return Decimal('0')
 
-    def _send_notification(self, name, zone, price, url, bedrooms='N/A', area='N/A', floor='N/A', description='N/A'):
+    def _clean_area(self, area_str):
+        """Read an area string like the typed area_m2 column (e.g. '85 m²' -> '85.00', '1.200 m²' -> '1200.00')
+
+        Values that can't be parsed are only stripped of their unit.
+        """
+        area = parse_area(area_str)
+        return str(area) if area is not None else str(area_str).replace('m²', '').strip()
+
+    def _send_notification(self, name, zone, price, url, bedrooms='N/A', area='N/A', floor='N/A', description='N/A',
+                           room_rental=False):
         """Send notification for houses under the price threshold"""
         try:
             if not NTFY_NOTIFICATION_ENABLED or self.ntfy_sender is None or price > self.price_threshold:
                 return
 
-            # Check if it's a room rental
-            if NTFY_FILTER_ROOM_RENTALS:
-                name_upper = name.upper()
-                if any(name_upper.startswith(term) for term in ROOM_RENTAL_TITLE_TERMS):
-                    return
-                if description != 'N/A':
-                    desc_upper = description.upper()
-                    if any(term in desc_upper for term in ROOM_RENTAL_DESCRIPTION_TERMS):
-                        return
+            # Skip room rentals (same classification as the API feed, computed at ingest)
+            if NTFY_FILTER_ROOM_RENTALS and room_rental:
+                return
 
             message = (
                 f"💰 *{price}€* - New Affordable House!\n\n"
@@ -263,28 +302,28 @@ class BaseScraper(ABC):
             image_urls = info_list[13] if len(info_list) > 13 and info_list[13] is not None else info_list[12] if len(info_list) > 12 and info_list[12] is not None else []
             # Clean price and area
             price = self._clean_price(price_str)
-            area = area.replace('m²', '').strip()
+            area = self._clean_area(area)
 
             # Generate house_id
             house_id = str(uuid.uuid4())[:20]
 
             # Normalize URL to handle /pt/ and /hpr/pt/ variations for Imovirtual
-            normalized_url = url
-            if 'imovirtual.com' in url:
-                normalized_url = url.replace('/hpr/pt/', '/pt/')
+            normalized_url = self._normalize_url(url)
 
             self._log('debug', f"[IMAGE_DEBUG] Image URLs to save: {image_urls}")
 
             # Use lock for database operations
             with db_lock:
-                # Check if house already exists by URL (using normalized URL)
-                if not House.objects.filter(url__iexact=normalized_url).exists():
+                # Check if house already exists by URL (using normalized URL), archived houses included
+                if not House.objects.filter(url__iexact=normalized_url).exists() and not is_archived_url(normalized_url):
                     # Update counters when we actually find and save a new house
                     if self.current_run:
                         self.current_run.new_houses += 1
                         self.current_run.save()
 
-                    # Create new house
+                    # Create new house, with the typed columns parsed once here
+                    typed_fields = normalize_listing(name, price, bedrooms, area, floor)
+                    room_rental = is_room_rental(name, description)
                     house = House(
                         name=name,
                         zone=zone,
@@ -300,23 +339,43 @@ class BaseScraper(ABC):
                         district_id=district_id,
                         source=source,
                         scraped_at=timezone.now(),
-                        house_id=house_id
+                        last_seen_at=timezone.now(),
+                        house_id=house_id,
+                        is_room_rental=room_rental,
+                        room_rental_version=terms_version(),
+                        **typed_fields
                     )
                     
                     self._log('debug', f"House object: {house}")
                     
-                    # Save the house
-                    house.save()
+                    # Save the house with its photos, so that the live feed never sees one without them
+                    with transaction.atomic():
+                        house.save()
 
-                    # Save Photo objects for each image URL
-                    for idx, img_url in enumerate(image_urls):
-                        if img_url:
-                            house.photos.create(image_url=img_url, order=idx)
+                        # Save Photo objects for each image URL
+                        for idx, img_url in enumerate(image_urls):
+                            if img_url:
+                                house.photos.create(image_url=img_url, order=idx)
+                    self.new_house_pks.append(house.pk)
+
+                    # Group with the same flat on other portals
+                    is_duplicate = False
+                    try:
+                        is_duplicate = assign_listing_group(house, image_urls)
+                        if is_duplicate:
+                            self._log('filtering', f"Duplicate of listing group {house.listing_group}: {name}")
+                    except Exception as e:
+                        self._log('warning', f"Error assigning listing group: {str(e)}")
+
+                    # Remember the state we just stored so later sightings can be compared against it
+                    self.existing_listings[normalized_url] = (
+                        house.pk, listing_fingerprint(name, price, area, bedrooms)
+                    )
                     
                     self._log('scraping', f"New house saved: {name} in {zone} - {price}€")
                     
-                    # Send notification if price is below threshold
-                    if price > 0 and price <= self.price_threshold:
+                    # Send notification if price is below threshold (once per flat, not once per portal)
+                    if price > 0 and price <= self.price_threshold and not is_duplicate:
                         self._send_notification(
                             name=name,
                             zone=zone,
@@ -325,15 +384,83 @@ class BaseScraper(ABC):
                             bedrooms=bedrooms,
                             area=area,
                             floor=floor,
-                            description=description
+                            description=description,
+                            room_rental=room_rental
                         )
                     
                     return True
-                return False
+
+            # Already known: record any change in price, area, bedrooms or title
+            self.track_existing_listing(normalized_url, name=name, price=price, area=area, bedrooms=bedrooms)
+            return False
             
         except Exception as e:
             self._log('error', f"Error saving to database: {str(e)}")
 
+    def track_existing_listing(self, url, name=None, price=None, area=None, bedrooms=None):
+        """Compare what the portal shows for a known listing against its last known state.
+
+        Changes are buffered and written in bulk by flush_listing_updates().
+        Fields the portal did not show (None or 'N/A') keep their last known value.
+
+        Returns:
+            bool: True if the listing changed since it was last seen
+        """
+        normalized_url = self._normalize_url(url)
+        state = self.existing_listings.get(normalized_url)
+        if state is None:
+            return False
+
+        def known(value):
+            return None if value is None or str(value).strip() in ('', 'N/A') else value
+
+        if known(price) is not None and not isinstance(price, Decimal):
+            price = self._clean_price(price)
+        if isinstance(price, Decimal) and price <= 0:
+            price = None
+        if known(area) is not None:
+            area = self._clean_area(area)
+
+        pk, last_state = state
+        self.seen_listings.add(pk)
+        scraped = listing_fingerprint(known(name), known(price), known(area), known(bedrooms))
+        current = merge_fingerprint(last_state, scraped)
+        if current == last_state:
+            return False
+
+        # Keep the state from before the first change on this page as the "previous" one
+        previous = self.pending_changes[pk][0] if pk in self.pending_changes else last_state
+        self.pending_changes[pk] = (previous, current)
+        self.existing_listings[normalized_url] = (pk, current)
+        self._log('processing', f"Listing changed: {normalized_url} ({last_state[0]}€ -> {current[0]}€)")
+        return True
+
+    def flush_listing_updates(self):
+        """Write the changes and sightings buffered for the current page in a single batch"""
+        if self.new_house_pks:
+            new_house_pks, self.new_house_pks = self.new_house_pks, []
+            try:
+                with db_lock:
+                    matched = match_new_houses(new_house_pks)
+                if matched:
+                    self._log('saving', f"Recorded {matched} saved search match(es)")
+            except Exception as e:
+                self._log('error', f"Error matching saved searches: {str(e)}")
+            # Subscribers of the live feed in this process get the page's new houses right away
+            notify_new_houses()
+        if not self.pending_changes and not self.seen_listings:
+            return
+        changes, self.pending_changes = self.pending_changes, {}
+        seen, self.seen_listings = self.seen_listings, set()
+        try:
+            with db_lock:
+                written = flush_listing_changes(changes)
+                marked = mark_listings_seen(seen)
+            self._log('saving', f"Recorded {written} changed listing(s), marked {marked} listing(s) as seen")
+        except Exception as e:
+            self.missed_sightings = True
+            self._log('error', f"Error recording listing changes: {str(e)}")
+
     def run(self):
         """Run the scraper - must be implemented by child classes"""
         try:
@@ -346,6 +473,7 @@ class BaseScraper(ABC):
             
             self._start_run()
             self.scrape()
+            self.flush_listing_updates()
             self._complete_run()
         except Exception as e:
             error_message = str(e)
@@ -355,24 +483,23 @@ class BaseScraper(ABC):
     def _load_existing_urls(self):
         """Load existing property URLs from the database to avoid duplicates"""
         self.existing_urls = set()
+        self.existing_listings = {}
         try:
-            # Get all URLs from the House model where source matches the scraper's source
-            urls = House.objects.filter(source=self.source).values_list('url', flat=True)
+            # Get the last known state of every house where source matches the scraper's source
+            states = load_listing_states(House.objects.filter(source=self.source))
             
             # Normalize URLs for Imovirtual
-            normalized_urls = []
-            for url in urls:
-                if 'imovirtual.com' in url:
-                    normalized_urls.append(url.replace('/hpr/pt/', '/pt/'))
-                else:
-                    normalized_urls.append(url)
-                    
-            self.existing_urls = set(normalized_urls)
+            self.existing_listings = {
+                self._normalize_url(url): state for url, state in states.items()
+            }
+            # Archived listings are not loaded, url_exists() looks the URLs of the run up in the archive
+            self.existing_urls = set(self.existing_listings)
             self._log('loading', f"Loaded {len(self.existing_urls)} existing property URLs from database")
         except Exception as e:
             self._log('warning', f"Error loading existing URLs: {str(e)}")
             # Continue with an empty set if there was an error
             self.existing_urls = set()
+            self.existing_listings = {}
 
     def url_exists(self, url):
         """Check if a URL already exists in the database and update counters
@@ -381,9 +508,26 @@ class BaseScraper(ABC):
         Returns:
             bool: True if the URL exists, False otherwise
         """
-        # Normalize URL to handle /pt/ and /hpr/pt/ variations for Imovirtual
-        normalized_url = url
-        if 'imovirtual.com' in url:
-            normalized_url = url.replace('/hpr/pt/', '/pt/')
+        normalized_url = self._normalize_url(url)
+        state = self.existing_listings.get(normalized_url)
+        if state is not None:
+            # Still online: last_seen_at is bumped for the whole page by flush_listing_updates()
+            self.seen_listings.add(state[0])
+        if normalized_url in self.existing_urls:
+            return True
+        # Archived listings must not be re-inserted (nor their detail pages fetched) either
+        try:
+            with db_lock:
+                archived = is_archived_url(normalized_url)
+        except Exception as e:
+            self._log('warning', f"Error checking the archive: {str(e)}")
+            return False
+        if archived:
+            self.existing_urls.add(normalized_url)
+        return archived
 
-        return normalized_url in self.existing_urls
+    def _normalize_url(self, url):
+        """Normalize URL to handle /pt/ and /hpr/pt/ variations for Imovirtual"""
+        if url and 'imovirtual.com' in url:
+            return url.replace('/hpr/pt/', '/pt/')
+        return url
@@ -1,5 +1,4 @@
 import logging
-from fuzzywuzzy import fuzz
 from unidecode import unidecode
 
 # Note: For simplification terms of our app, the district is always Lisboa
@@ -21,6 +20,7 @@ class LocationManager:
             self.counties = []
             self.districts = []
             self._initialize_location_data()
+            self.resolver = self._build_resolver()
             LocationManager._initialized = True
 
     def _initialize_location_data(self):
@@ -59,58 +59,36 @@ class LocationManager:
             self.counties = []
             self.districts = [{"id": None, "name": unidecode(DEFAULT_DISTRICT.lower())}]
 
+    def _build_resolver(self):
+        """Index of the loaded parishes and counties (see houses.location_resolver)"""
+        try:
+            from houses.location_resolver import LocationResolver
+            return LocationResolver(
+                [(p["id"], p["name"]) for p in self.parishes],
+                [(c["id"], c["name"]) for c in self.counties]
+            )
+        except ImportError as e:
+            self.logger.error(f"Error importing the location resolver: {str(e)}")
+            return None
+
     def extract_location(self, location_str):
         """
         Extract parish, county and district IDs from a location string
         Returns tuple (parish_id, county_id, district_id)
         Note: For simplification, district is always Lisboa
         """
+        district_id = self.districts[0]["id"] if self.districts else None
         try:
-            ## log the input location string
-            self.logger.info(f"Extracting location from string: '{location_str}'")
-            if not location_str or location_str.strip() in ["N/A", "-"]:
-                district_id = self.districts[0]["id"] if self.districts else None
+            if not location_str or location_str.strip() in ["N/A", "-"] or self.resolver is None:
                 return None, None, district_id
-                
-            # Normalize and split the input string
-            location_parts = [
-                part.strip() 
-                for part in unidecode(location_str.lower()).split(',')
-                if not part.strip().startswith('rua')
-            ]
-            
-            best_parish_id = None
-            best_county_id = None
-            
-            # Try to match each part from left to right
-            for part in location_parts:
-                # Try parish match first
-                if not best_parish_id:
-                    for parish in self.parishes:
-                        ratio = fuzz.partial_ratio(part, parish["name"])
-                        if ratio > 85:
-                            best_parish_id = parish["id"]
-                            break
-                            
-                # Try county match if no parish found yet
-                if not best_county_id:
-                    for county in self.counties:
-                        ratio = fuzz.partial_ratio(part, county["name"])
-                        if ratio > 85:
-                            best_county_id = county["id"]
-                            break
-                            
-                if best_parish_id and best_county_id:
-                    break
-            
-            district_id = self.districts[0]["id"] if self.districts else None
-            self.logger.debug(f"Location match for '{location_str}': Parish_ID='{best_parish_id}', County_ID='{best_county_id}', District_ID='{district_id}'")
-            
-            return best_parish_id, best_county_id, district_id
-            
+
+            parish_id, county_id = self.resolver.resolve(location_str)
+            self.logger.debug(f"Location match for '{location_str}': Parish_ID='{parish_id}', County_ID='{county_id}', District_ID='{district_id}'")
+
+            return parish_id, county_id, district_id
+
         except Exception as e:
             self.logger.error(f"Error extracting location data: {str(e)}", exc_info=True)
-            district_id = self.districts[0]["id"] if self.districts else None
             return None, None, district_id
 
     def get_location_data(self):
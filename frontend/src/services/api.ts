@@ -37,9 +37,9 @@ export interface ScraperStatusResponse {
 }
 
 export interface PaginatedResponse<T> {
-  count: number;
+  count?: number; // Only with ?count=true on the cursor-paginated houses feed
   next: string | null;
-  previous: string | null;
+  previous?: string | null;
   results: T[];
 }
 